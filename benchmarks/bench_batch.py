@@ -0,0 +1,91 @@
+"""
+Throughput of the batch commands against issuing the same commands one at a time.
+
+Each batch covers IDs that are close together, as in the import jobs that motivated it.
+
+Usage: python benchmarks/bench_batch.py [--books 200000] [--batch 1000] [--batches 50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import RedBlackTree
+
+
+def nearby_ids(rng, books, batch):
+    start = rng.randint(1, max(1, books - 4 * batch))
+    return rng.sample(range(start, start + 4 * batch), batch)
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Odd IDs are in the library; even IDs are left free for the insert batches
+    records = [(2 * book_id + 1, f"Title {book_id}", "Author") for book_id in range(args.books)]
+    batches = [nearby_ids(rng, 2 * args.books, args.batch) for _ in range(args.batches)]
+    operations = args.batch * args.batches
+
+    print(f"{args.books} books, {args.batches} batches of {args.batch} nearby IDs")
+    print(f"{'command':>12} {'single ops/s':>13} {'batch ops/s':>12}")
+
+    single_tree = RedBlackTree.from_sorted(records)
+    batch_tree = RedBlackTree.from_sorted(records)
+
+    def print_single():
+        for batch in batches:
+            for book_id in batch:
+                single_tree.PrintBook(book_id)
+
+    def print_batch():
+        for batch in batches:
+            batch_tree.PrintBookBatch(*batch)
+
+    def borrow_single():
+        for patron_id, batch in enumerate(batches):
+            for book_id in batch:
+                single_tree.BorrowBook(patron_id, book_id, 1)
+
+    def borrow_batch():
+        for patron_id, batch in enumerate(batches):
+            batch_tree.BorrowBookBatch(patron_id, 1, *batch)
+
+    def insert_single():
+        for batch in batches:
+            for book_id in batch:
+                if book_id % 2 == 0:
+                    single_tree.InsertBook(book_id, f"New {book_id}", "Author")
+
+    def insert_batch():
+        for batch in batches:
+            triples = []
+            for book_id in batch:
+                if book_id % 2 == 0:
+                    triples += [book_id, f"New {book_id}", "Author"]
+            batch_tree.InsertBookBatch(*triples)
+
+    for label, single, batch in (("PrintBook", print_single, print_batch),
+                                 ("BorrowBook", borrow_single, borrow_batch),
+                                 ("InsertBook", insert_single, insert_batch)):
+        single_seconds = timed(single)
+        batch_seconds = timed(batch)
+        print(f"{label:>12} {operations / single_seconds:>13.0f} {operations / batch_seconds:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark of FindClosestBook: the single-descent floor/ceiling search against the previous
+implementation, which recorded every visited book in a throwaway list and then descended
+a second time in InorderPredecessorSuccessor.
+
+Usage: python benchmarks/bench_closest.py [--books 1000000] [--queries 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import RedBlackTree
+
+
+def legacy_find_closest_book(tree, target_id):
+    closest_nodes = legacy_find_closest_book_helper(tree, tree.root, target_id)
+    if closest_nodes:
+        return "".join([str(book) for book in closest_nodes])
+    else:
+        return "No books in the Library.\n\n"
+
+
+def legacy_find_closest_book_helper(tree, node, target_id):
+    if node is not None:
+        closest_nodes = []
+        while node:
+            if int(node.book.BookId) == int(target_id):
+                return [node.book]
+            if int(node.book.BookId) < int(target_id):
+                closest_nodes.append(node.book)
+                node = node.right
+            else:
+                closest_nodes.append(node.book)
+                node = node.left
+
+        pred, succ = legacy_inorder_predecessor_successor(tree, target_id)
+        pred_distance = abs(int(pred.book.BookId) - int(target_id)) if pred else float('inf')
+        succ_distance = abs(int(succ.book.BookId) - int(target_id)) if succ else float('inf')
+        if pred_distance < succ_distance:
+            return [pred.book] if pred else []
+        elif succ_distance < pred_distance:
+            return [succ.book] if succ else []
+        else:
+            return sorted([pred.book, succ.book], key=lambda book: int(book.BookId) if book else float('inf'))
+    return []
+
+
+def legacy_inorder_predecessor_successor(tree, target_id):
+    pred = None
+    succ = None
+    current = tree.root
+    while current.book.BookId != 0:
+        if int(current.book.BookId) == int(target_id):
+            if current.left:
+                pred = current.left
+                while pred.right:
+                    pred = pred.right
+            if current.right:
+                succ = current.right
+                while succ.left:
+                    succ = succ.left
+            break
+        elif int(current.book.BookId) < int(target_id):
+            pred = current
+            current = current.right
+        else:
+            succ = current
+            current = current.left
+    return pred, succ
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=100000)
+    parser.add_argument("--k", type=int, default=10, help="k for the FindClosestBooks measurement")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Even IDs only, so odd targets fall between two books
+    tree = RedBlackTree.from_sorted((2 * book_id, f"Title {book_id}", "Author") for book_id in range(1, args.books + 1))
+    rng = random.Random(args.seed)
+    targets = [rng.randint(0, 2 * args.books + 2) for _ in range(args.queries)]
+
+    for target in targets[:1000]:
+        assert legacy_find_closest_book(tree, target) == tree.FindClosestBook(target)
+
+    print(f"{args.books} books, {args.queries} queries")
+    runs = (
+        ("legacy", lambda target: legacy_find_closest_book(tree, target)),
+        ("single descent", tree.FindClosestBook),
+        (f"k-nearest (k={args.k})", lambda target: tree.FindClosestBooks(target, args.k)),
+    )
+    for label, find in runs:
+        start = time.perf_counter()
+        for target in targets:
+            find(target)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>20}: {elapsed / args.queries * 1e6:7.2f} us/query")
+
+
+if __name__ == "__main__":
+    main()
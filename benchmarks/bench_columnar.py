@@ -0,0 +1,96 @@
+"""
+Benchmark of the columnar engine against the RedBlackTree engine on read-heavy command mixes.
+
+Both engines load the same books in random ID order and then replay each mix through their
+function maps:
+- point:   PrintBook of random books,
+- range:   PrintBooks over ranges of about --range-width IDs,
+- closest: FindClosestBook of random IDs between the books,
+- status:  CountAvailableBooks over ranges of about 100 times --range-width IDs,
+- mixed:   a blend of the above with --writes BorrowBook and ReturnBook commands.
+Reports the load time and the commands per second of every mix, and checks that both
+engines produced the same output.
+
+Usage: python benchmarks/bench_columnar.py [--books 200000] [--ops 100000] [--range-width 20] [--writes 0.1]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorColumnar import ColumnarLibrary
+from gatorLibrary import RedBlackTree, build_function_map
+
+MIXES = ("point", "range", "closest", "status", "mixed")
+
+
+def make_commands(mix, books, ops, width, writes, rng):
+    commands = []
+    for _ in range(ops):
+        kind = rng.choice(MIXES[:4]) if mix == "mixed" else mix
+        if mix == "mixed" and rng.random() < writes:
+            book_id = rng.randint(1, books) * 2
+            if rng.random() < 0.5:
+                commands.append(("BorrowBook", (rng.randint(1, 1000), book_id, rng.randint(1, 20))))
+            else:
+                commands.append(("ReturnBook", (rng.randint(1, 1000), book_id)))
+        elif kind == "point":
+            commands.append(("PrintBook", (rng.randint(1, books) * 2,)))
+        elif kind == "range":
+            low = rng.randint(1, books * 2)
+            commands.append(("PrintBooks", (low, low + width * 2)))
+        elif kind == "closest":
+            commands.append(("FindClosestBook", (rng.randint(1, books) * 2 + 1,)))
+        else:
+            low = rng.randint(1, books * 2)
+            commands.append(("CountAvailableBooks", (low, low + width * 200)))
+    return commands
+
+
+def replay(function_map, commands):
+    output = []
+    start = time.perf_counter()
+    for function, parameters in commands:
+        op = function_map[function](*parameters)
+        output.append(op if isinstance(op, str) else "".join(op))
+    return time.perf_counter() - start, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=200000)
+    parser.add_argument("--ops", type=int, default=100000, help="commands per mix")
+    parser.add_argument("--range-width", type=int, default=20, help="books per PrintBooks range")
+    parser.add_argument("--writes", type=float, default=0.1, help="share of BorrowBook and ReturnBook in the mixed mix")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Even IDs, so FindClosestBook of an odd ID always has to choose between two books
+    ids = [book_id * 2 for book_id in range(1, args.books + 1)]
+    rng.shuffle(ids)
+    clock = lambda: 0.0
+    engines = {}
+    for name, library in (("tree", RedBlackTree(clock=clock)), ("columnar", ColumnarLibrary(clock=clock))):
+        function_map = build_function_map(library) if name == "tree" else library.build_function_map()
+        start = time.perf_counter()
+        for book_id in ids:
+            function_map["InsertBook"](book_id, f"Title {book_id % 5000}", f"Author {book_id % 997}")
+        print(f"{name:>9} engine: loaded {args.books} books in {time.perf_counter() - start:.2f} s")
+        engines[name] = function_map
+
+    print(f"{'mix':>8} {'tree ops/s':>12} {'columnar ops/s':>15} {'speedup':>8}")
+    for mix in MIXES:
+        commands = make_commands(mix, args.books, args.ops, args.range_width, args.writes, random.Random(mix))
+        tree_time, tree_output = replay(engines["tree"], commands)
+        columnar_time, columnar_output = replay(engines["columnar"], commands)
+        if tree_output != columnar_output:
+            sys.exit(f"The engines disagree on the {mix} mix")
+        print(f"{mix:>8} {len(commands) / tree_time:>12.0f} {len(commands) / columnar_time:>15.0f} "
+              f"{tree_time / columnar_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
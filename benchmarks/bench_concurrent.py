@@ -0,0 +1,129 @@
+"""
+Benchmark of read throughput against reader thread count while a writer thread is active.
+
+Compares the snapshot reads of gatorConcurrent.ConcurrentLibrary with the alternative of one
+lock shared by readers and the writer around a plain RedBlackTree. Readers issue a mix of
+PrintBook, FindClosestBook and short PrintBooks ranges; the writer loops over BorrowBook,
+ReturnBook, DeleteBook of a random loaded book followed by InsertBook of the same ID, and
+InsertBook of new IDs above the loaded range. Both read and write rates are reported, since
+the point of the snapshot mode is that readers never hold the writer up.
+
+On an interpreter with the GIL the threads take turns holding it, so the numbers mostly show
+how interpreter time is shared between the writer and the readers; reads only run in
+parallel on a free-threaded build.
+
+Usage: python benchmarks/bench_concurrent.py [--books 100000] [--threads 1 2 4 8] [--seconds 2]
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorConcurrent import ConcurrentLibrary
+from gatorLibrary import RedBlackTree, build_function_map
+
+
+class LockedLibrary:
+    """
+    Every command, reads included, runs on the tree under one lock.
+    """
+
+    def __init__(self, tree):
+        self._lock = threading.Lock()
+        self._tree_map = build_function_map(tree)
+
+    def build_function_map(self):
+        def locked(perform):
+            def perform_locked(*parameters):
+                with self._lock:
+                    op = perform(*parameters)
+                    return op if isinstance(op, str) else "".join(op)
+            return perform_locked
+        return {function: locked(perform) for function, perform in self._tree_map.items()}
+
+
+def build_tree(count):
+    tree = RedBlackTree()
+    tree.BulkInsert((book_id, f"Title {book_id}", f"Author {book_id % 997}") for book_id in range(1, count + 1))
+    return tree
+
+
+def reader(function_map, books, seed, stop, counts):
+    rng = random.Random(seed)
+    print_book = function_map["PrintBook"]
+    closest = function_map["FindClosestBook"]
+    print_books = function_map["PrintBooks"]
+    done = 0
+    while not stop.is_set():
+        book_id = rng.randint(1, books)
+        choice = rng.random()
+        if choice < 0.8:
+            print_book(book_id)
+        elif choice < 0.95:
+            closest(book_id)
+        else:
+            print_books(book_id, book_id + 20)
+        done += 1
+    counts.append(done)
+
+
+def writer(function_map, books, new_ids, stop, counts):
+    rng = random.Random(0)
+    done = 0
+    while not stop.is_set():
+        book_id = rng.randint(1, books)
+        function_map["BorrowBook"](rng.randint(1, 1000), book_id, rng.randint(1, 20))
+        function_map["ReturnBook"](rng.randint(1, 1000), book_id)
+        # Put the deleted book straight back, so the readers keep finding the loaded range
+        book_id = rng.randint(1, books)
+        function_map["DeleteBook"](book_id)
+        function_map["InsertBook"](book_id, f"Title {book_id}", "Author")
+        new_id = next(new_ids)
+        function_map["InsertBook"](new_id, f"Title {new_id}", "Author")
+        done += 5
+    counts.append(done)
+
+
+def measure(function_map, books, new_ids, threads, seconds):
+    """
+    Return (reads per second, writes per second) with the given number of reader threads.
+    """
+    stop = threading.Event()
+    read_counts, write_counts = [], []
+    workers = [threading.Thread(target=writer, args=(function_map, books, new_ids, stop, write_counts))]
+    workers += [threading.Thread(target=reader, args=(function_map, books, seed, stop, read_counts))
+                for seed in range(1, threads + 1)]
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(read_counts) / seconds, sum(write_counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{args.books} books, {args.seconds:g} s per run, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'mode':>8} {'readers':>7} {'reads/s':>10} {'writes/s':>10}")
+    for label, library_class in (("locked", LockedLibrary), ("snapshot", ConcurrentLibrary)):
+        function_map = library_class(build_tree(args.books)).build_function_map()
+        new_ids = itertools.count(args.books + 1)
+        for threads in args.threads:
+            reads, writes = measure(function_map, args.books, new_ids, threads, args.seconds)
+            print(f"{label:>8} {threads:>7} {reads:>10.0f} {writes:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Memory benchmark: bytes per book for the Book and RBTreeNode layout.
+
+Builds the given number of books with their tree nodes and reports the traced allocation per
+book, next to the previous layout (per-instance __dict__, string colors and an empty
+reservation list on every book). Title and author strings are shared between books so the
+numbers measure the record layout only.
+
+Usage: python benchmarks/bench_memory.py [--books 1000000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import Book, RBTreeNode
+
+
+class LegacyBook:
+    def __init__(self, BookId=0, BookName="", AuthorName="", AvailabilityStatus=True, BorrowedBy=None):
+        self.BookId = int(BookId)
+        self.BookName = BookName
+        self.AuthorName = AuthorName
+        self.AvailabilityStatus = AvailabilityStatus
+        self.BorrowedBy = BorrowedBy
+        self.ReservationHeap = []
+
+
+class LegacyRBTreeNode:
+    def __init__(self, book):
+        self.book = book
+        self.color = "RED"
+        self.left = None
+        self.right = None
+        self.parent = None
+        self.colorChangingFunctionId = 0
+
+
+def bytes_per_book(book_class, node_class, count):
+    title = "Data Structures and Algorithms"
+    author = "Sartaj Sahni"
+    gc.collect()
+    tracemalloc.start()
+    nodes = [node_class(book_class(book_id, title, author)) for book_id in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The list holding the nodes is not part of the per-book cost
+    current -= sys.getsizeof(nodes)
+    del nodes
+    return current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=1000000)
+    args = parser.parse_args()
+
+    print(f"{args.books} books")
+    for label, book_class, node_class in (("legacy", LegacyBook, LegacyRBTreeNode), ("current", Book, RBTreeNode)):
+        print(f"{label:>8}: {bytes_per_book(book_class, node_class, args.books):7.1f} bytes per book")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark of PrintBooks range scans: the streaming iterator against the previous recursive path.
+
+The previous path collected the range with a recursive GetBooksInRange that built a new list
+at every level and then concatenated the output with += in a loop.
+
+Usage: python benchmarks/bench_range_scan.py [--books 100000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import RedBlackTree
+
+
+def legacy_get_books_in_range(tree, node, book_id1, book_id2):
+    books = []
+    if node is not None:
+        if int(book_id1) < int(node.book.BookId):
+            books.extend(legacy_get_books_in_range(tree, node.left, book_id1, book_id2))
+        if int(book_id1) <= int(node.book.BookId) <= int(book_id2):
+            books.append(node.book)
+        if int(book_id2) > node.book.BookId:
+            books.extend(legacy_get_books_in_range(tree, node.right, book_id1, book_id2))
+    return books
+
+
+def legacy_print_books(tree, book_id1, book_id2, output_file):
+    books = legacy_get_books_in_range(tree, tree.root, book_id1, book_id2)
+    opstring = ""
+    if books:
+        for book in books:
+            opstring += str(book)
+    else:
+        opstring = "No Books found in the given range."
+    output_file.write(opstring)
+
+
+def streaming_print_books(tree, book_id1, book_id2, output_file):
+    output_file.writelines(tree.StreamBooks(book_id1, book_id2))
+
+
+def build_tree(count):
+    tree = RedBlackTree()
+    for book_id in range(1, count + 1):
+        tree.InsertBook(book_id, f"Title {book_id}", f"Author {book_id % 997}")
+    return tree
+
+
+def measure(print_books, tree, count, repeat):
+    """
+    Return (best seconds, peak traced bytes) for printing the whole ID range.
+    """
+    best = float("inf")
+    with open(os.devnull, "w") as output_file:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            print_books(tree, 1, count, output_file)
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        print_books(tree, 1, count, output_file)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tree = build_tree(args.books)
+    print(f"range of {args.books} books")
+    for label, print_books in (("legacy", legacy_print_books), ("streaming", streaming_print_books)):
+        seconds, peak = measure(print_books, tree, args.books, args.repeat)
+        print(f"{label:>10}: {seconds * 1000:9.1f} ms  peak {peak / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
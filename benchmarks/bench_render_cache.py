@@ -0,0 +1,75 @@
+"""
+Benchmark of the rendered-output cache on a Zipf-skewed read-heavy workload.
+
+Builds a library in which every book has a short reservation queue, then runs PrintBook and
+FindClosestBook on Zipf-distributed popular books with a small share of BorrowBook and
+ReturnBook calls that invalidate cached entries. Reports commands per second and the cache
+hit rate for each capacity, with capacity 0 meaning no cache.
+
+Usage: python benchmarks/bench_render_cache.py [--books 100000] [--ops 500000]
+                                               [--capacities 0 256 4096 65536] [--writes 0.05]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import RedBlackTree, RenderCache, build_function_map
+from workload import zipf_sampler
+
+
+def build_tree(count, capacity):
+    tree = RedBlackTree(render_cache=RenderCache(capacity) if capacity else None)
+    tree.BulkInsert((book_id, f"Title {book_id}", f"Author {book_id % 997}") for book_id in range(1, count + 1))
+    for book_id in range(1, count + 1):
+        for patron_id in range(4):
+            tree.BorrowBook(patron_id, book_id, patron_id + 1)
+    return tree
+
+
+def make_commands(books, ops, writes, zipf, seed=0):
+    rng = random.Random(seed)
+    hot = zipf_sampler(rng, books, zipf)
+    commands = []
+    for book_id in hot(ops):
+        book_id += 1
+        choice = rng.random()
+        if choice < writes / 2:
+            commands.append(("BorrowBook", (rng.randint(10, 1000), book_id, rng.randint(1, 20))))
+        elif choice < writes:
+            commands.append(("ReturnBook", (rng.randint(10, 1000), book_id)))
+        elif choice < 0.8:
+            commands.append(("PrintBook", (book_id,)))
+        else:
+            commands.append(("FindClosestBook", (book_id,)))
+    return commands
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--ops", type=int, default=500000)
+    parser.add_argument("--capacities", type=int, nargs="+", default=[0, 256, 4096, 65536])
+    parser.add_argument("--writes", type=float, default=0.05, help="share of BorrowBook and ReturnBook commands")
+    parser.add_argument("--zipf", type=float, default=1.1)
+    args = parser.parse_args()
+
+    commands = make_commands(args.books, args.ops, args.writes, args.zipf)
+    print(f"{args.ops} commands on {args.books} books, {args.writes:.0%} writes, Zipf {args.zipf}")
+    for capacity in args.capacities:
+        tree = build_tree(args.books, capacity)
+        function_map = build_function_map(tree)
+        start = time.perf_counter()
+        for function, parameters in commands:
+            function_map[function](*parameters)
+        elapsed = time.perf_counter() - start
+        cache = tree.render_cache
+        hit_rate = f"{cache.hits / max(1, cache.hits + cache.misses):6.1%} hits" if cache is not None else "      no cache"
+        print(f"capacity {capacity:>7}: {len(commands) / elapsed:10.0f} commands/s  {hit_rate}")
+
+
+if __name__ == "__main__":
+    main()
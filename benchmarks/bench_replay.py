@@ -0,0 +1,98 @@
+"""
+Benchmark of gatorReplay.py against one python gatorLibrary.py process per command file.
+
+Saves a base catalog of --books books as a snapshot and writes --files branch command
+files of --ops commands each that borrow, return, print, search and insert on top of it.
+Then replays all of them three ways and reports the wall time of each:
+- one `python gatorLibrary.py <file> --restore <base>` process per file, one at a time,
+- gatorReplay with 1 worker, which forks from a driver that loaded the base once,
+- gatorReplay with --workers workers.
+The outputs of all three are checked to be identical.
+
+Usage: python benchmarks/bench_replay.py [--files 24] [--books 100000] [--ops 5000] [--workers N]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gatorLibrary import RedBlackTree
+from gatorReplay import replay_files
+from gatorSnapshot import save_snapshot
+
+
+def write_branch(filename, books, ops, seed):
+    rng = random.Random(seed)
+    next_id = books + 1
+    with open(filename, "w") as branch_file:
+        for _ in range(ops):
+            book_id = rng.randint(1, books)
+            choice = rng.random()
+            if choice < 0.3:
+                line = f"BorrowBook({rng.randint(1, 1000)}, {book_id}, {rng.randint(1, 20)})"
+            elif choice < 0.5:
+                line = f"ReturnBook({rng.randint(1, 1000)}, {book_id})"
+            elif choice < 0.7:
+                line = f"PrintBook({book_id})"
+            elif choice < 0.8:
+                line = f"PrintBooks({book_id}, {book_id + 10})"
+            elif choice < 0.9:
+                line = f"FindClosestBook({book_id})"
+            else:
+                line = f'InsertBook({next_id}, "Branch title {next_id}", "Branch author")'
+                next_id += 1
+            branch_file.write(line + "\n")
+        branch_file.write("ColorFlipCount()\nQuit()\n")
+
+
+def read_outputs(files):
+    outputs = []
+    for filename in files:
+        with open(f"{os.path.splitext(filename)[0]}_output_file.txt") as output_file:
+            outputs.append(output_file.read())
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=24)
+    parser.add_argument("--books", type=int, default=100000, help="books in the base catalog")
+    parser.add_argument("--ops", type=int, default=5000, help="commands per branch file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        base = os.path.join(directory, "base.snapshot")
+        tree = RedBlackTree()
+        tree.BulkInsert((book_id, f"Title {book_id}", f"Author {book_id % 997}") for book_id in range(1, args.books + 1))
+        save_snapshot(tree, base)
+        del tree
+        files = [os.path.join(directory, f"branch{index}.txt") for index in range(args.files)]
+        for index, filename in enumerate(files):
+            write_branch(filename, args.books, args.ops, index)
+        print(f"{args.files} branch files of {args.ops} commands on a base of {args.books} books")
+
+        start = time.perf_counter()
+        for filename in files:
+            subprocess.run([sys.executable, os.path.join(ROOT, "gatorLibrary.py"), filename, "--restore", base], check=True)
+        separate = time.perf_counter() - start
+        expected = read_outputs(files)
+        print(f"{'one process per file':>22}: {separate:8.2f} s")
+
+        for workers in (1, args.workers):
+            start = time.perf_counter()
+            results = list(replay_files(files, workers, base))
+            elapsed = time.perf_counter() - start
+            if any("error" in result for result in results) or read_outputs(files) != expected:
+                sys.exit(f"gatorReplay with {workers} workers did not reproduce the outputs")
+            print(f"{f'gatorReplay, {workers} workers':>22}: {elapsed:8.2f} s  ({separate / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
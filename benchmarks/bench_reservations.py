@@ -0,0 +1,89 @@
+"""
+Microbenchmark of reservation queue push and pop cost as the waitlist grows.
+
+Compares ReservationQueue against the previous list based heap, which removed the next
+reservation with list.pop(0) and never sifted down afterwards.
+
+Usage: python benchmarks/bench_reservations.py [--depths 10 100 1000 10000 100000] [--ops 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import ReservationQueue
+
+
+class LegacyReservationList:
+    """
+    The reservation list used before ReservationQueue: sift-up on push, pop(0) on removal.
+    """
+
+    def __init__(self):
+        self.heap = []
+
+    def push(self, patron_id, priority_number, time_of_reservation):
+        heap = self.heap
+        heap.append((patron_id, priority_number, time_of_reservation))
+        index = len(heap) - 1
+        while index > 0:
+            parent_index = (index - 1) // 2
+            if heap[index][1] < heap[parent_index][1]:
+                heap[index], heap[parent_index] = heap[parent_index], heap[index]
+                index = parent_index
+            else:
+                break
+
+    def pop(self):
+        return self.heap.pop(0)
+
+
+def fill(queue, depth, rng):
+    for patron_id in range(depth):
+        queue.push(patron_id, rng.randint(1, 20), float(patron_id))
+
+
+def measure(factory, depth, ops, seed):
+    """
+    Return (push_ns, pop_ns): the mean cost of one push and one pop at the given depth.
+    """
+    rng = random.Random(seed)
+    queue = factory()
+    fill(queue, depth, rng)
+    next_patron = depth
+    priorities = [rng.randint(1, 20) for _ in range(ops)]
+
+    push_total = 0.0
+    pop_total = 0.0
+    for priority_number in priorities:
+        start = time.perf_counter()
+        queue.pop()
+        pop_total += time.perf_counter() - start
+
+        start = time.perf_counter()
+        queue.push(next_patron, priority_number, float(next_patron))
+        push_total += time.perf_counter() - start
+        next_patron += 1
+    return push_total / ops * 1e9, pop_total / ops * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--depths", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--ops", type=int, default=2000, help="pop/push pairs measured per depth")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'depth':>8} {'queue push ns':>14} {'queue pop ns':>13} {'legacy push ns':>15} {'legacy pop ns':>14}")
+    for depth in args.depths:
+        ops = min(args.ops, depth)
+        push_ns, pop_ns = measure(ReservationQueue, depth, ops, args.seed)
+        legacy_push_ns, legacy_pop_ns = measure(LegacyReservationList, depth, ops, args.seed)
+        print(f"{depth:>8} {push_ns:>14.0f} {pop_ns:>13.0f} {legacy_push_ns:>15.0f} {legacy_pop_ns:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
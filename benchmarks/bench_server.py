@@ -0,0 +1,142 @@
+"""
+Load generator for gatorServer: latency percentiles and throughput at several connection counts.
+
+Starts a server in a subprocess (or connects to a running one with --port), loads it with
+books over one connection and then runs a mixed workload of PrintBook, BorrowBook,
+ReturnBook and FindClosestBook from each number of concurrent connections. Every connection
+keeps up to --depth commands in flight and measures each command from the moment it is sent
+until its response frame has been read.
+
+Usage: python benchmarks/bench_server.py [--books 10000] [--ops 20000] [--connections 1 4 16 64]
+                                         [--depth 8] [--batch-reads] [--port PORT]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def read_frame(reader):
+    length = int(await reader.readline())
+    return await reader.readexactly(length)
+
+
+async def load_books(host, port, count):
+    reader, writer = await asyncio.open_connection(host, port)
+    for start in range(1, count + 1, 1000):
+        for book_id in range(start, min(start + 1000, count + 1)):
+            writer.write(f'InsertBook({book_id}, "Title {book_id}", "Author {book_id % 97}", "Yes")\n'.encode())
+        await writer.drain()
+        for _ in range(start, min(start + 1000, count + 1)):
+            await read_frame(reader)
+    writer.close()
+    await writer.wait_closed()
+
+
+def make_command(rng, books):
+    book_id = rng.randint(1, books)
+    choice = rng.random()
+    if choice < 0.70:
+        return f"PrintBook({book_id})\n"
+    if choice < 0.80:
+        return f"BorrowBook({rng.randint(1, 1000)}, {book_id}, {rng.randint(1, 20)})\n"
+    if choice < 0.90:
+        return f"ReturnBook({rng.randint(1, 1000)}, {book_id})\n"
+    return f"FindClosestBook({book_id})\n"
+
+
+async def run_connection(host, port, books, ops, depth, seed, latencies):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    sent_at = []
+    window = asyncio.Semaphore(depth)
+
+    async def receive():
+        for index in range(ops):
+            await read_frame(reader)
+            latencies.append(time.perf_counter() - sent_at[index])
+            window.release()
+
+    receiver = asyncio.create_task(receive())
+    for _ in range(ops):
+        await window.acquire()
+        sent_at.append(time.perf_counter())
+        writer.write(make_command(rng, books).encode())
+    await writer.drain()
+    await receiver
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_level(host, port, books, ops, connections, depth):
+    """
+    Return (ops per second, sorted latencies) for ops commands spread over the connections.
+    """
+    latencies = []
+    per_connection = max(1, ops // connections)
+    start = time.perf_counter()
+    await asyncio.gather(*(run_connection(host, port, books, per_connection, depth, seed, latencies)
+                           for seed in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, latencies
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def bench(args, host, port):
+    await load_books(host, port, args.books)
+    print(f"{args.books} books, {args.ops} ops per level, depth {args.depth}"
+          f"{', batched reads' if args.batch_reads else ''}")
+    print(f"{'connections':>11} {'ops/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for connections in args.connections:
+        throughput, latencies = await run_level(host, port, args.books, args.ops, connections, args.depth)
+        print(f"{connections:>11} {throughput:>10.0f} {percentile(latencies, 0.50) * 1000:>8.3f}"
+              f" {percentile(latencies, 0.99) * 1000:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--depth", type=int, default=8, help="commands in flight per connection")
+    parser.add_argument("--batch-reads", action="store_true", help="start the server with --batch-reads")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="use the server already listening on this port")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if port is None:
+        port = free_port()
+        command = [sys.executable, os.path.join(ROOT, "gatorServer.py"), "--host", args.host, "--port", str(port)]
+        if args.batch_reads:
+            command.append("--batch-reads")
+        server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        # The server prints one line once it is listening
+        server.stdout.readline()
+    try:
+        asyncio.run(bench(args, args.host, port))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Scaling benchmark of the sharded library from 1 to N worker processes.
+
+Runs the same command stream, BookId range inserts followed by a random mix of PrintBook,
+BorrowBook, ReturnBook and InsertBook with an occasional PrintBooks or FindClosestBook
+barrier, on a single in-process RedBlackTree and on gatorShard.ShardedLibrary with each
+worker count.
+
+Usage: python benchmarks/bench_shard.py [--books 200000] [--ops 400000] [--workers 1 2 4 8]
+                                        [--barrier-every 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import RedBlackTree, build_function_map
+from gatorShard import ShardedLibrary, even_boundaries
+
+
+def make_commands(books, ops, barrier_every, seed=0):
+    rng = random.Random(seed)
+    ids = list(range(1, books + 1))
+    rng.shuffle(ids)
+    commands = [("InsertBook", (book_id, f"Title {book_id}", f"Author {book_id % 997}")) for book_id in ids]
+    next_id = books + 1
+    for index in range(1, ops + 1):
+        book_id = rng.randint(1, books)
+        if index % barrier_every == 0:
+            commands.append(("PrintBooks", (book_id, book_id + 10)) if index % (2 * barrier_every) else ("FindClosestBook", (book_id,)))
+            continue
+        choice = rng.random()
+        if choice < 0.5:
+            commands.append(("PrintBook", (book_id,)))
+        elif choice < 0.7:
+            commands.append(("BorrowBook", (rng.randint(1, 1000), book_id, rng.randint(1, 20))))
+        elif choice < 0.9:
+            commands.append(("ReturnBook", (rng.randint(1, 1000), book_id)))
+        else:
+            commands.append(("InsertBook", (next_id, f"Title {next_id}", "Author")))
+            next_id += 1
+    return commands
+
+
+def run_single(commands):
+    function_map = build_function_map(RedBlackTree())
+    start = time.perf_counter()
+    for function, parameters in commands:
+        op = function_map[function](*parameters)
+        if not isinstance(op, str):
+            "".join(op)
+    return time.perf_counter() - start
+
+
+def run_sharded(commands, workers, max_book_id):
+    library = ShardedLibrary(even_boundaries(workers, max_book_id))
+    try:
+        start = time.perf_counter()
+        for _ in library.execute(commands):
+            pass
+        return time.perf_counter() - start
+    finally:
+        library.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=200000)
+    parser.add_argument("--ops", type=int, default=400000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--barrier-every", type=int, default=10000, help="commands between cross-shard commands")
+    args = parser.parse_args()
+
+    commands = make_commands(args.books, args.ops, args.barrier_every)
+    print(f"{len(commands)} commands on {args.books} books, {os.cpu_count()} CPUs")
+    seconds = run_single(commands)
+    print(f"{'single':>8}: {len(commands) / seconds:10.0f} commands/s")
+    for workers in args.workers:
+        seconds = run_sharded(commands, workers, args.books)
+        print(f"{workers:>8}: {len(commands) / seconds:10.0f} commands/s")
+
+
+if __name__ == "__main__":
+    main()
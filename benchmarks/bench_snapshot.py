@@ -0,0 +1,67 @@
+"""
+Benchmark of restoring the library from a snapshot against replaying its command history.
+
+Usage: python benchmarks/bench_snapshot.py [--books 200000] [--borrows 50000]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import RedBlackTree, build_function_map, execute_commands
+from gatorSnapshot import load_snapshot, save_snapshot
+
+
+def history(books, borrows, seed):
+    """
+    Return a command history that inserts books in random order and then borrows some of them.
+    """
+    rng = random.Random(seed)
+    book_ids = list(range(1, books + 1))
+    rng.shuffle(book_ids)
+    lines = [f'InsertBook({book_id}, "Title {book_id}", "Author {book_id % 997}", "Yes")\n' for book_id in book_ids]
+    for _ in range(borrows):
+        lines.append(f"BorrowBook({rng.randint(1, 5000)}, {rng.randint(1, books)}, {rng.randint(1, 20)})\n")
+    return "".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=200000)
+    parser.add_argument("--borrows", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    commands = history(args.books, args.borrows, args.seed)
+    tree = RedBlackTree()
+    start = time.perf_counter()
+    execute_commands(build_function_map(tree), io.StringIO(commands), io.StringIO())
+    replay = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "library.snap")
+        start = time.perf_counter()
+        save_snapshot(tree, filename)
+        save = time.perf_counter() - start
+        size = os.path.getsize(filename)
+
+        results = []
+        for label, use_mmap in (("restore (mmap)", True), ("restore (read)", False)):
+            start = time.perf_counter()
+            load_snapshot(filename, use_mmap=use_mmap)
+            results.append((label, time.perf_counter() - start))
+
+    print(f"{args.books} books, {args.borrows} borrows, snapshot {size / 1e6:.1f} MB")
+    print(f"{'replay':>16}: {replay:8.3f} s")
+    print(f"{'save':>16}: {save:8.3f} s")
+    for label, seconds in results:
+        print(f"{label:>16}: {seconds:8.3f} s  ({replay / seconds:.1f}x faster than replay)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark of the timing wheel against a binary heap scheduler with lazy cancellation.
+
+Schedules one due date per loan, spread over a loan period, cancels the share of them that
+are returned on time, and advances the clock in steps until every remaining timer has
+fired. Reports scheduling, cancelling and firing throughput for both schedulers.
+
+Usage: python benchmarks/bench_timers.py [--timers 500000] [--cancel 0.8] [--period 1209600] [--step 3600]
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorTimers import TimingWheel
+
+
+class HeapScheduler:
+    """
+    Min-heap of (deadline, sequence, action) entries; cancelled entries stay in the heap and
+    are skipped when they reach the top.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.sequence = 0
+        self.cancelled = set()
+
+    def schedule(self, deadline, action):
+        entry = (deadline, self.sequence, action)
+        self.sequence += 1
+        heapq.heappush(self.heap, entry)
+        return entry
+
+    def cancel(self, entry):
+        self.cancelled.add(entry[1])
+
+    def advance(self, now):
+        heap = self.heap
+        fired = 0
+        while heap and heap[0][0] <= now:
+            _, sequence, action = heapq.heappop(heap)
+            if sequence in self.cancelled:
+                self.cancelled.discard(sequence)
+                continue
+            action()
+            fired += 1
+        return fired
+
+
+def run(scheduler, deadlines, cancelled, end, step):
+    action = lambda: None
+    start = time.perf_counter()
+    handles = [scheduler.schedule(deadline, action) for deadline in deadlines]
+    scheduled = time.perf_counter()
+    for index in cancelled:
+        scheduler.cancel(handles[index])
+    cancelled_at = time.perf_counter()
+    fired = 0
+    now = 0.0
+    while now < end:
+        now += step
+        fired += scheduler.advance(now)
+    finished = time.perf_counter()
+    return fired, scheduled - start, cancelled_at - scheduled, finished - cancelled_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--timers", type=int, default=500000)
+    parser.add_argument("--cancel", type=float, default=0.8, help="share of timers cancelled before they fire")
+    parser.add_argument("--period", type=float, default=14 * 86400, help="loan period in seconds")
+    parser.add_argument("--step", type=float, default=3600, help="seconds the clock advances per step")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    deadlines = [rng.random() * args.period + args.period for _ in range(args.timers)]
+    cancelled = rng.sample(range(args.timers), int(args.timers * args.cancel))
+    print(f"{args.timers} timers over {args.period / 86400:g} days, {args.cancel:.0%} cancelled, "
+          f"{args.step:g} s steps")
+    for name, scheduler in (("timing wheel", TimingWheel(0.0)), ("binary heap", HeapScheduler())):
+        fired, schedule_time, cancel_time, fire_time = run(scheduler, deadlines, cancelled, 2 * args.period, args.step)
+        print(f"{name:>12}: schedule {args.timers / schedule_time:10.0f}/s  cancel {len(cancelled) / cancel_time:10.0f}/s  "
+              f"fire {fired / fire_time:10.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
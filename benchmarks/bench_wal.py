@@ -0,0 +1,83 @@
+"""
+Throughput of logged commands under different write-ahead log fsync policies.
+
+Each policy replays the same mix of InsertBook, BorrowBook and ReturnBook commands through
+logged_function_map into a fresh tree and log.
+
+Usage: python benchmarks/bench_wal.py [--ops 20000] [--directory DIR]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import RedBlackTree, build_function_map
+from gatorWal import WriteAheadLog, logged_function_map
+
+# (label, sync_every, sync_interval in seconds)
+POLICIES = (
+    ("fsync every op", 1, None),
+    ("group of 10", 10, None),
+    ("group of 100", 100, None),
+    ("group of 1000", 1000, None),
+    ("every 5 ms", 0, 0.005),
+    ("every 50 ms", 0, 0.05),
+    ("no log", None, None),
+)
+
+
+def workload(ops, seed):
+    rng = random.Random(seed)
+    books = max(1, ops // 2)
+    commands = [("InsertBook", (str(book_id), f"Title {book_id}", "Author")) for book_id in range(1, books + 1)]
+    while len(commands) < ops:
+        book_id = str(rng.randint(1, books))
+        patron_id = str(rng.randint(1, 1000))
+        if rng.random() < 0.6:
+            commands.append(("BorrowBook", (patron_id, book_id, str(rng.randint(1, 20)))))
+        else:
+            commands.append(("ReturnBook", (patron_id, book_id)))
+    return commands
+
+
+def run(commands, directory, sync_every, sync_interval):
+    tree = RedBlackTree()
+    function_map = build_function_map(tree)
+    wal = None
+    if sync_every is not None:
+        filename = os.path.join(directory, f"bench-{sync_every}-{sync_interval}.log")
+        if os.path.exists(filename):
+            os.remove(filename)
+        wal = WriteAheadLog(filename, sync_every, sync_interval)
+        function_map = logged_function_map(function_map, wal)
+    start = time.perf_counter()
+    for function, parameters in commands:
+        function_map[function](*parameters)
+    if wal is not None:
+        wal.close()
+    elapsed = time.perf_counter() - start
+    return elapsed, wal.commits if wal is not None else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--directory", help="where to put the logs (default: a temporary directory)")
+    args = parser.parse_args()
+
+    commands = workload(args.ops, args.seed)
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        print(f"{len(commands)} commands")
+        print(f"{'policy':>16} {'ops/s':>10} {'fsyncs':>8}")
+        for label, sync_every, sync_interval in POLICIES:
+            elapsed, commits = run(commands, directory, sync_every, sync_interval)
+            print(f"{label:>16} {len(commands) / elapsed:>10.0f} {commits:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark runner: replays generated workloads and compares them against a saved baseline.
+
+Every workload from benchmarks/workload.py is written to a command file and replayed with
+execute_commands on a fresh RedBlackTree in a child process of its own, so the peak RSS
+reported for it is that of the replay alone. The runner records commands per second, peak
+RSS and the final color flip count of every workload, and can save the results as a JSON
+baseline or compare them against one. A workload that fails is reported with its error
+instead of numbers.
+
+Usage: python benchmarks/run_workloads.py [--profiles insert zipf-borrow ...] [--books 10000]
+                                          [--ops 100000] [--order random] [--repeat 3]
+                                          [--save BASELINE] [--compare BASELINE] [--tolerance 0.1]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workload import PROFILES, write_workload
+
+
+def replay(filename):
+    """
+    Child process: replay one command file and return its measurements.
+    """
+    import resource
+
+    from gatorLibrary import RedBlackTree, build_function_map, execute_commands
+
+    tree = RedBlackTree()
+    with open(filename, "r") as input_file, open(os.devnull, "w") as output_file:
+        start = time.perf_counter()
+        executed = execute_commands(build_function_map(tree), input_file, output_file)
+        elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_bytes = peak if sys.platform == "darwin" else peak * 1024
+    return {"commands": executed, "seconds": elapsed, "ops_per_second": executed / elapsed if elapsed else 0.0,
+            "peak_rss_mb": peak_bytes / (1 << 20), "color_flip_count": tree.color_flip_count}
+
+
+def run_workload(filename, repeat):
+    """
+    Replay a command file repeat times, each in a new process, and keep the fastest run.
+    """
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--replay", filename],
+                                   capture_output=True, text=True)
+        if completed.returncode != 0:
+            lines = completed.stderr.strip().splitlines()
+            return {"error": lines[-1] if lines else f"exit status {completed.returncode}"}
+        result = json.loads(completed.stdout)
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print every workload next to its baseline and return the number of regressions: a
+    throughput drop or peak RSS growth beyond tolerance, a changed color flip count or a new
+    failure.
+    """
+    regressions = 0
+    print(f"\n{'workload':>14} {'ops/s':>10} {'baseline':>10} {'change':>8} {'RSS MB':>8} {'baseline':>9}  notes")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:>14}  not in the baseline")
+            continue
+        notes = []
+        if "error" in result:
+            if "error" not in old:
+                regressions += 1
+                notes.append("now fails")
+            print(f"{name:>14}  {result['error']}  {' '.join(notes)}")
+            continue
+        if "error" in old:
+            print(f"{name:>14} {result['ops_per_second']:>10.0f}  baseline failed: {old['error']}")
+            continue
+        change = result["ops_per_second"] / old["ops_per_second"] - 1
+        if change < -tolerance:
+            regressions += 1
+            notes.append("slower")
+        if result["peak_rss_mb"] > old["peak_rss_mb"] * (1 + tolerance):
+            regressions += 1
+            notes.append("more memory")
+        if result["color_flip_count"] != old["color_flip_count"]:
+            regressions += 1
+            notes.append(f"flips {old['color_flip_count']} -> {result['color_flip_count']}")
+        print(f"{name:>14} {result['ops_per_second']:>10.0f} {old['ops_per_second']:>10.0f} {change:>+8.1%} "
+              f"{result['peak_rss_mb']:>8.1f} {old['peak_rss_mb']:>9.1f}  {' '.join(notes)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=list(PROFILES))
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--ops", type=int, default=100000)
+    parser.add_argument("--order", choices=("sequential", "random"), default="random")
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per workload; the fastest is kept")
+    parser.add_argument("--save", metavar="BASELINE", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare the results with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative slowdown or RSS growth")
+    parser.add_argument("--replay", metavar="FILE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.replay:
+        print(json.dumps(replay(args.replay)))
+        return
+
+    results = {}
+    print(f"{'workload':>14} {'commands':>9} {'ops/s':>10} {'RSS MB':>8} {'flips':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in args.profiles:
+            filename = os.path.join(directory, f"{profile}.txt")
+            write_workload(filename, profile, books=args.books, ops=args.ops, order=args.order,
+                           zipf=args.zipf, seed=args.seed)
+            result = results[profile] = run_workload(filename, args.repeat)
+            if "error" in result:
+                print(f"{profile:>14}  failed: {result['error']}")
+            else:
+                print(f"{profile:>14} {result['commands']:>9} {result['ops_per_second']:>10.0f} "
+                      f"{result['peak_rss_mb']:>8.1f} {result['color_flip_count']:>9}")
+
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Synthetic workload generator: writes GatorLibrary command files with configurable mixes.
+
+Every workload first inserts --books books, in sequential or random ID order, and then runs
+--ops commands of its profile:
+- insert:       no further commands, the load itself is the workload.
+- zipf-borrow:  BorrowBook and ReturnBook on Zipf-skewed hot books, with PrintBook lookups.
+- reservations: many patrons borrowing a handful of books, so reservation queues grow deep,
+                followed by returns that drain them.
+- range:        PrintBooks over short and long ranges, FindClosestBook and PrintBook.
+- delete:       DeleteBook of random books, interleaved with inserts of new IDs.
+- mixed:        a blend of all of the above.
+
+Usage: python benchmarks/workload.py PROFILE [--books 10000] [--ops 100000] [--order random]
+                                             [--zipf 1.1] [--seed 0] [-o FILE]
+"""
+import argparse
+import itertools
+import random
+import sys
+
+PROFILES = ("insert", "zipf-borrow", "reservations", "range", "delete", "mixed")
+
+
+def zipf_sampler(rng, count, exponent):
+    """
+    Return a function that draws k items of range(count) with Zipf-distributed popularity.
+    The most popular items are spread over the range rather than being the smallest ones.
+    """
+    ranks = list(range(count))
+    rng.shuffle(ranks)
+    cumulative = list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+    return lambda k: rng.choices(ranks, cum_weights=cumulative, k=k)
+
+
+def insert_book(book_id):
+    return f'InsertBook({book_id}, "Title {book_id}", "Author {book_id % 997}")'
+
+
+def generate(profile, books=10000, ops=100000, order="random", zipf=1.1, seed=0):
+    """
+    Yield the command lines of a workload, ending with Quit().
+
+    Parameters:
+    - profile: One of PROFILES.
+    - books: The number of books inserted before the profile's commands.
+    - ops: The number of commands after the inserts.
+    - order: "sequential" or "random" order of the initial inserts.
+    - zipf: The Zipf exponent of book popularity for borrows.
+    - seed: The random seed; the same arguments always give the same workload.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile {profile}, expected one of {', '.join(PROFILES)}")
+    rng = random.Random(seed)
+    ids = list(range(1, books + 1))
+    if order == "random":
+        rng.shuffle(ids)
+    elif order != "sequential":
+        raise ValueError("order must be sequential or random")
+    for book_id in ids:
+        yield insert_book(book_id)
+
+    hot = zipf_sampler(rng, books, zipf)
+    next_id = itertools.count(books + 1)
+    live = list(range(1, books + 1))
+
+    def borrow():
+        book_id = hot(1)[0] + 1
+        if rng.random() < 0.6:
+            return f"BorrowBook({rng.randint(1, 10000)}, {book_id}, {rng.randint(1, 20)})"
+        return f"ReturnBook({rng.randint(1, 10000)}, {book_id})"
+
+    def reservation():
+        book_id = rng.randint(1, min(books, 16))
+        if rng.random() < 0.8:
+            return f"BorrowBook({rng.randint(1, 100000)}, {book_id}, {rng.randint(1, 20)})"
+        return f"ReturnBook({rng.randint(1, 100000)}, {book_id})"
+
+    def range_scan():
+        book_id = rng.randint(1, books)
+        choice = rng.random()
+        if choice < 0.4:
+            return f"PrintBooks({book_id}, {book_id + rng.choice((10, 100, 1000))})"
+        if choice < 0.7:
+            return f"FindClosestBook({book_id + rng.choice((0, books))})"
+        return f"PrintBook({book_id})"
+
+    def delete():
+        if live and rng.random() < 0.6:
+            index = rng.randrange(len(live))
+            live[index], live[-1] = live[-1], live[index]
+            return f"DeleteBook({live.pop()})"
+        book_id = next(next_id)
+        live.append(book_id)
+        return insert_book(book_id)
+
+    if profile == "insert":
+        steps = []
+    elif profile == "mixed":
+        steps = [borrow, reservation, range_scan, delete]
+    else:
+        steps = [{"zipf-borrow": borrow, "reservations": reservation, "range": range_scan, "delete": delete}[profile]]
+    if steps:
+        for index in range(ops):
+            if profile == "zipf-borrow" and index % 4 == 3:
+                yield f"PrintBook({hot(1)[0] + 1})"
+            elif profile == "reservations" and index >= ops * 3 // 4:
+                # Drain the queues that were built up
+                yield f"ReturnBook(0, {rng.randint(1, min(books, 16))})"
+            else:
+                yield rng.choice(steps)()
+    yield "ColorFlipCount()"
+    yield "Quit()"
+
+
+def write_workload(filename, profile, **options):
+    """
+    Write a workload to filename and return the number of commands written.
+    """
+    count = 0
+    with open(filename, "w") as workload_file:
+        for line in generate(profile, **options):
+            workload_file.write(line)
+            workload_file.write("\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("profile", choices=PROFILES)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--ops", type=int, default=100000)
+    parser.add_argument("--order", choices=("sequential", "random"), default="random", help="order of the initial inserts")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of book popularity for borrows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="command file to write (default stdout)")
+    args = parser.parse_args()
+
+    options = dict(books=args.books, ops=args.ops, order=args.order, zipf=args.zipf, seed=args.seed)
+    if args.output:
+        write_workload(args.output, args.profile, **options)
+    else:
+        for line in generate(args.profile, **options):
+            sys.stdout.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Columnar storage engine: the library as sorted parallel arrays instead of linked tree nodes.
+
+Book IDs are kept in a sorted array('q'). Row i of every other column belongs to ids[i]:
+- available: a bytearray of 1 (available) and 0 (borrowed),
+- borrowers: the patron ID as given to BorrowBook, or None,
+- titles and authors: array('q') indexes into a StringTable that stores every distinct
+  name once.
+Reservation queues are rare and live in a dict from book ID to ReservationQueue.
+
+Lookups are a bisect over the ID column, PrintBooks renders the slice between two
+bisections, and CountAvailableBooks counts a slice of the availability column in C.
+Inserts and deletes shift the columns, which is O(n) but done by memmove. The color flip
+count belongs to a red-black tree, so a key-only RedBlackTree runs alongside the columns
+and reproduces it.
+
+The engine runs PrintBook, PrintBooks, InsertBook, BorrowBook, ReturnBook, DeleteBook,
+FindClosestBook, CountAvailableBooks, ColorFlipCount and Quit with the same output as
+RedBlackTree. Book IDs must be unique. Select it with
+python gatorLibrary.py <input_file.txt> --engine columnar.
+"""
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from gatorLibrary import RBTreeNode, RedBlackTree, ReservationQueue
+
+
+class StringTable:
+    """
+    Interned strings: each distinct string is stored once and referred to by its index.
+    Strings are never removed, since titles and authors repeat far more than they disappear.
+    """
+    __slots__ = ("strings", "_index")
+
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, string):
+        index = self._index.get(string)
+        if index is None:
+            index = self._index[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+
+class BookKey:
+    """
+    The only part of a book the flip counting tree looks at.
+    """
+    __slots__ = ("BookId",)
+
+    def __init__(self, book_id):
+        self.BookId = book_id
+
+
+class FlipCounter:
+    """
+    Key-only RedBlackTree that performs the same inserts and deletes as the library, so its
+    color flip count is the one RedBlackTree would report.
+    """
+
+    def __init__(self):
+        self.tree = RedBlackTree()
+        self.nodes = {}
+
+    def insert(self, book_id):
+        tree = self.tree
+        node = self.nodes[book_id] = RBTreeNode(BookKey(book_id))
+        tree.currentFunctionId += 1
+        tree.Insert(node)
+        tree.CommitColorChanges()
+
+    def delete(self, book_id):
+        tree = self.tree
+        tree.currentFunctionId += 1
+        tree.Delete(self.nodes.pop(book_id))
+        tree.CommitColorChanges()
+
+    @property
+    def color_flip_count(self):
+        return self.tree.color_flip_count
+
+
+class ColumnarLibrary:
+    def __init__(self, clock=None):
+        """
+        Parameters:
+        - clock: The function that returns the current time in seconds, time.time when None.
+        """
+        self.ids = array("q")
+        self.available = bytearray()
+        self.borrowers = []
+        self.titles = array("q")
+        self.authors = array("q")
+        self.strings = StringTable()
+        self.reservations = {}
+        self.flips = FlipCounter()
+        self.clock = clock if clock is not None else time.time
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _find(self, book_id):
+        """
+        Return the row of a book, or -1 if it is not in the library.
+        """
+        ids = self.ids
+        index = bisect_left(ids, book_id)
+        if index < len(ids) and ids[index] == book_id:
+            return index
+        return -1
+
+    def _render(self, index):
+        """
+        Return the PrintBook output of a row, as Book.__str__ formats it.
+        """
+        book_id = self.ids[index]
+        strings = self.strings.strings
+        available = self.available[index]
+        queue = self.reservations.get(book_id)
+        return f"BookID = {book_id}\nTitle = \"{strings[self.titles[index]]}\"\nAuthor = \"{strings[self.authors[index]]}\"\n" \
+               f"Availability = \"{'Yes' if available else 'No'}\"\n" \
+               f"BorrowedBy = {self.borrowers[index] if not available else 'None'}\n" \
+               f"Reservations = {queue.patrons() if queue is not None else []}\n\n"
+
+    def InsertBook(self, book_id, book_name, author_name, availability_status=True, borrowed_by=None):
+        book_id = int(book_id)
+        index = bisect_left(self.ids, book_id)
+        if index < len(self.ids) and self.ids[index] == book_id:
+            raise ValueError(f"Book {book_id} is already in the library; the columnar engine needs unique IDs")
+        self.ids.insert(index, book_id)
+        self.available.insert(index, 1 if availability_status else 0)
+        # Only a book inserted as unavailable keeps its borrower, as Book.__str__ shows
+        self.borrowers.insert(index, borrowed_by if availability_status is False else None)
+        self.titles.insert(index, self.strings.intern(book_name))
+        self.authors.insert(index, self.strings.intern(author_name))
+        self.flips.insert(book_id)
+        return ""
+
+    def DeleteBook(self, book_id):
+        index = self._find(int(book_id))
+        if index < 0:
+            return f"Book {book_id} not found in the Library\n\n"
+        deleted_id = self.ids[index]
+        queue = self.reservations.pop(deleted_id, None)
+        reservation = [str(patron_id) for patron_id in queue.patrons()] if queue is not None else []
+        del self.ids[index]
+        del self.available[index]
+        del self.borrowers[index]
+        del self.titles[index]
+        del self.authors[index]
+        self.flips.delete(deleted_id)
+        if len(reservation)>1:
+            return f"Book {book_id} is no longer available. Reservations made by Patrons {', '.join(reservation)} have been cancelled!\n\n"
+        elif len(reservation)==1:
+            return f"Book {book_id} is no longer available. Reservation made by Patron {reservation[0]} has been cancelled!\n\n"
+        else:
+            return f"Book {book_id} is no longer available.\n\n"
+
+    def PrintBook(self, book_id):
+        index = self._find(int(book_id))
+        if index < 0 or self.ids[index] == 0:
+            return f"Book {book_id} not found in the Library\n\n"
+        return self._render(index)
+
+    def PrintBooks(self, book_id1, book_id2):
+        return "".join(self.StreamBooks(book_id1, book_id2))
+
+    def StreamBooks(self, book_id1, book_id2):
+        """
+        Yield the PrintBooks output one book at a time, for the rows between two bisections of
+        the ID column.
+        """
+        low = bisect_left(self.ids, int(book_id1))
+        high = bisect_right(self.ids, int(book_id2))
+        if low >= high:
+            yield "No Books found in the given range."
+            return
+        render = self._render
+        for index in range(low, high):
+            yield render(index)
+
+    def CountAvailableBooks(self, book_id1, book_id2):
+        """
+        This function counts the available books with an ID in [book_id1, book_id2] by
+        counting the ones in that slice of the availability column.
+        """
+        low = bisect_left(self.ids, int(book_id1))
+        high = max(low, bisect_right(self.ids, int(book_id2)))
+        return f"{self.available.count(1, low, high)} of {high - low} books in the given range are available\n\n"
+
+    def BorrowBook(self, patron_id, book_id, patron_priority):
+        index = self._find(int(book_id))
+        if index < 0:
+            return f"Book {book_id} not found in the Library\n\n"
+        if self.available[index]:
+            self.available[index] = 0
+            self.borrowers[index] = patron_id
+            return f"Book {book_id} Borrowed by Patron {patron_id}\n\n"
+        queue = self.reservations.get(self.ids[index])
+        if queue is None:
+            queue = self.reservations[self.ids[index]] = ReservationQueue()
+        queue.push(int(patron_id), int(patron_priority), self.clock())
+        return f"Book {book_id} Reserved by Patron {patron_id}\n\n"
+
+    def ReturnBook(self, patron_id, book_id):
+        index = self._find(int(book_id))
+        if index < 0 or self.available[index]:
+            return f"Book {book_id} not found in the Library or not borrowed by Patron {patron_id}\n\n"
+        opmssg = f"Book {book_id} Returned by Patron {patron_id}\n\n"
+        queue = self.reservations.get(self.ids[index])
+        if queue:
+            reservation = queue.pop()
+            self.borrowers[index] = reservation[0]
+            opmssg += f"Book {book_id} Allotted to Patron {reservation[0]}\n\n"
+        else:
+            self.available[index] = 1
+            self.borrowers[index] = None
+        return opmssg
+
+    def FindClosestBook(self, target_id):
+        target_id = int(target_id)
+        ids = self.ids
+        if not ids:
+            return "No books in the Library.\n\n"
+        ceiling = bisect_left(ids, target_id)
+        if ceiling < len(ids) and ids[ceiling] == target_id:
+            return self._render(ceiling)
+        floor = ceiling - 1
+        if ceiling == len(ids):
+            return self._render(floor)
+        if floor < 0:
+            return self._render(ceiling)
+        floor_distance = target_id - ids[floor]
+        ceiling_distance = ids[ceiling] - target_id
+        if floor_distance < ceiling_distance:
+            return self._render(floor)
+        elif ceiling_distance < floor_distance:
+            return self._render(ceiling)
+        else:
+            return self._render(floor) + self._render(ceiling)
+
+    def ColorFlipCount(self):
+        return f"Color Flip Count: {self.flips.color_flip_count}\n\n"
+
+    def Quit(self):
+        return "Program Terminated!!"
+
+    def build_function_map(self):
+        """
+        Map the command names of the input file format to the methods of this library.
+        """
+        return {
+            "PrintBook": self.PrintBook,
+            "PrintBooks": self.StreamBooks,
+            "InsertBook": self.InsertBook,
+            "BorrowBook": self.BorrowBook,
+            "ReturnBook": self.ReturnBook,
+            "DeleteBook": self.DeleteBook,
+            "FindClosestBook": self.FindClosestBook,
+            "CountAvailableBooks": self.CountAvailableBooks,
+            "ColorFlipCount": self.ColorFlipCount,
+            "Quit": self.Quit,
+        }
@@ -0,0 +1,293 @@
+"""
+Concurrency mode: snapshot-isolated reads alongside a single writer.
+
+The RedBlackTree rotates and recolors nodes in place, so it is not safe to read from another
+thread while a change is running. ConcurrentLibrary keeps the tree for the writer and, after
+every change, publishes an immutable LibraryView of the library: the rendered text of every
+book, held in a B-tree of tuples. Publishing copies only the path from the root to the
+leaves that hold a changed book, so a change costs O(NODE_SIZE * height) on top of the tree
+operation, and every unchanged node is shared with the previous view.
+
+PrintBook, PrintBooks, FindClosestBook and ColorFlipCount read whichever view was published
+last with one attribute load and never take a lock, so readers see a consistent state and
+never block the writer. Every other command runs on the tree under the writer lock. Book IDs
+are assumed to be unique, as the input format requires.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+
+from gatorLibrary import RedBlackTree, build_function_map
+
+# Target number of entries per node of a view
+NODE_SIZE = 64
+
+# For each command that changes books, the IDs of the books a call changes
+CHANGED_BOOKS = {
+    "InsertBook": lambda parameters: parameters[:1],
+    "InsertBookBatch": lambda parameters: parameters[::3],
+    "DeleteBook": lambda parameters: parameters[:1],
+    "BorrowBook": lambda parameters: parameters[1:2],
+    "BorrowBookBatch": lambda parameters: parameters[2:],
+    "ReturnBook": lambda parameters: parameters[1:2],
+    "AddCopies": lambda parameters: parameters[:1],
+}
+
+
+def split_node(keys, values, node_size):
+    """
+    Return the nodes that replace a changed node: none if it is empty, the node itself if it
+    holds at most twice node_size entries and pieces of node_size entries otherwise.
+    """
+    if not keys:
+        return []
+    if len(keys) <= 2 * node_size:
+        return [(tuple(keys), tuple(values))]
+    return [(tuple(keys[start:start + node_size]), tuple(values[start:start + node_size]))
+            for start in range(0, len(keys), node_size)]
+
+
+class LibraryView:
+    """
+    An immutable snapshot of the library that any number of threads can read.
+
+    Every node is a (keys, values) pair of tuples. In a leaf the keys are book IDs and the
+    values their rendered text; in an inner node the keys are the first book ID under each
+    child and the values the children. All leaves are at depth height.
+    """
+    __slots__ = ("root", "height", "count", "color_flip_count")
+
+    def __init__(self, root, height, count, color_flip_count):
+        self.root = root
+        self.height = height
+        self.count = count
+        self.color_flip_count = color_flip_count
+
+    @classmethod
+    def from_tree(cls, tree, node_size=NODE_SIZE):
+        """
+        Build the view of every book in the tree.
+        """
+        keys, texts = [], []
+        for book in tree.IterBooks():
+            keys.append(book.BookId)
+            texts.append(str(book))
+        count = len(keys)
+        nodes = [(tuple(keys[start:start + node_size]), tuple(texts[start:start + node_size]))
+                 for start in range(0, count, node_size)]
+        height = 0
+        while len(nodes) > 1:
+            nodes = [(tuple(node[0][0] for node in nodes[start:start + node_size]), tuple(nodes[start:start + node_size]))
+                     for start in range(0, len(nodes), node_size)]
+            height += 1
+        return cls(nodes[0] if nodes else ((), ()), height, count, tree.color_flip_count)
+
+    def _leaf_path(self, book_id):
+        """
+        Return the leaf that holds book_id, or would hold it.
+        """
+        node = self.root
+        for _ in range(self.height):
+            node = node[1][max(bisect_right(node[0], book_id) - 1, 0)]
+        return node
+
+    def _leaves_from(self, node, height, book_id):
+        """
+        Iterate over the leaves under node in ID order, starting with the one that holds
+        book_id, or would hold it.
+        """
+        if height == 0:
+            yield node
+            return
+        children = node[1]
+        index = max(bisect_right(node[0], book_id) - 1, 0)
+        yield from self._leaves_from(children[index], height - 1, book_id)
+        for child in children[index + 1:]:
+            yield from self._leaves_from(child, height - 1, book_id)
+
+    def find(self, book_id):
+        """
+        Return the rendered book with the given int ID, or None.
+        """
+        keys, texts = self._leaf_path(book_id)
+        index = bisect_left(keys, book_id)
+        if index < len(keys) and keys[index] == book_id:
+            return texts[index]
+        return None
+
+    def iter_range(self, book_id1, book_id2):
+        """
+        Iterate over the rendered books with an ID in [book_id1, book_id2], in ID order.
+        """
+        for keys, texts in self._leaves_from(self.root, self.height, book_id1):
+            start = bisect_left(keys, book_id1)
+            end = bisect_right(keys, book_id2, start)
+            yield from texts[start:end]
+            if end < len(keys):
+                return
+
+    def floor_ceiling(self, target_id):
+        """
+        Return the (ID, rendered book) pairs of the floor and the ceiling of target_id, with
+        None for a side that has no book.
+        """
+        keys, texts = self._leaf_path(target_id)
+        index = bisect_left(keys, target_id)
+        if index < len(keys) and keys[index] == target_id:
+            pair = (target_id, texts[index])
+            return pair, pair
+        # The first key of a leaf is never above the IDs routed to it, so the floor is
+        # either in this leaf or missing
+        floor = (keys[index - 1], texts[index - 1]) if index else None
+        ceiling = None
+        for keys, texts in self._leaves_from(self.root, self.height, target_id):
+            index = bisect_left(keys, target_id)
+            if index < len(keys):
+                ceiling = (keys[index], texts[index])
+                break
+        return floor, ceiling
+
+
+class ConcurrentLibrary:
+    """
+    A RedBlackTree behind a single writer lock, with lock-free snapshot reads.
+    """
+
+    def __init__(self, tree=None, node_size=NODE_SIZE):
+        if node_size < 2:
+            raise ValueError("node_size must be at least 2")
+        self.tree = tree if tree is not None else RedBlackTree()
+        self.node_size = node_size
+        self.view = LibraryView.from_tree(self.tree, node_size)
+        self._write_lock = threading.Lock()
+        self._tree_map = build_function_map(self.tree)
+
+    def PrintBook(self, book_id):
+        text = self.view.find(int(book_id))
+        if text is None:
+            return f"Book {book_id} not found in the Library\n\n"
+        return text
+
+    def PrintBooks(self, book_id1, book_id2):
+        """
+        Return the same output as RedBlackTree.PrintBooks, read from the current view.
+        """
+        return "".join(self.view.iter_range(int(book_id1), int(book_id2))) or "No Books found in the given range."
+
+    def FindClosestBook(self, target_id):
+        """
+        Return the same output as RedBlackTree.FindClosestBook, read from the current view.
+        """
+        target_id = int(target_id)
+        floor, ceiling = self.view.floor_ceiling(target_id)
+        if floor is None and ceiling is None:
+            return "No books in the Library.\n\n"
+        if floor is ceiling or ceiling is None:
+            return floor[1]
+        if floor is None:
+            return ceiling[1]
+        floor_distance = target_id - floor[0]
+        ceiling_distance = ceiling[0] - target_id
+        if floor_distance < ceiling_distance:
+            return floor[1]
+        elif ceiling_distance < floor_distance:
+            return ceiling[1]
+        else:
+            return floor[1] + ceiling[1]
+
+    def ColorFlipCount(self):
+        return f"Color Flip Count: {self.view.color_flip_count}\n\n"
+
+    def Perform(self, function, parameters):
+        """
+        Run a command on the tree under the writer lock and publish a new view if it changed
+        any book.
+
+        Returns:
+        - output: The complete output of the command.
+        """
+        changed = CHANGED_BOOKS.get(function)
+        with self._write_lock:
+            op = self._tree_map[function](*parameters)
+            if not isinstance(op, str):
+                op = "".join(op)
+            if changed is not None:
+                self._publish({int(book_id) for book_id in changed(parameters)})
+        return op
+
+    def _publish(self, book_ids):
+        """
+        Publish a view in which the given books are re-rendered from the tree, inserted or
+        removed.
+        """
+        tree = self.tree
+        NULL = tree.NULL
+        changes = []
+        for book_id in sorted(book_ids):
+            node = tree.SearchBookNode(tree.root, book_id)
+            changes.append((book_id, None if node is NULL else str(node.book)))
+        view = self.view
+        nodes, delta = self._update(view.root, view.height, changes)
+        height = view.height
+        while len(nodes) > 1:
+            nodes = split_node([node[0][0] for node in nodes], nodes, self.node_size)
+            height += 1
+        if not nodes:
+            root, height = ((), ()), 0
+        else:
+            root = nodes[0]
+        while height and len(root[1]) == 1:
+            root = root[1][0]
+            height -= 1
+        self.view = LibraryView(root, height, view.count + delta, tree.color_flip_count)
+
+    def _update(self, node, height, changes):
+        """
+        Apply sorted (book ID, rendered book or None) changes to a copy of the subtree at node.
+
+        Returns:
+        - nodes: The nodes that replace node, see split_node.
+        - delta: The change in the number of books.
+        """
+        keys = list(node[0])
+        values = list(node[1])
+        delta = 0
+        if height == 0:
+            for book_id, text in changes:
+                index = bisect_left(keys, book_id)
+                present = index < len(keys) and keys[index] == book_id
+                if text is None:
+                    if present:
+                        del keys[index]
+                        del values[index]
+                        delta -= 1
+                elif present:
+                    values[index] = text
+                else:
+                    keys.insert(index, book_id)
+                    values.insert(index, text)
+                    delta += 1
+        else:
+            groups = {}
+            for change in changes:
+                groups.setdefault(max(bisect_right(node[0], change[0]) - 1, 0), []).append(change)
+            # Children are replaced from the back so the indexes of earlier ones stay valid
+            for index in sorted(groups, reverse=True):
+                children, child_delta = self._update(values[index], height - 1, groups[index])
+                keys[index:index + 1] = [child[0][0] for child in children]
+                values[index:index + 1] = children
+                delta += child_delta
+        return split_node(keys, values, self.node_size), delta
+
+    def build_function_map(self):
+        """
+        Map the command names to callables that are safe to call from any thread.
+        """
+        function_map = {function: (lambda *parameters, function=function: self.Perform(function, parameters))
+                        for function in self._tree_map}
+        function_map.update({
+            "PrintBook": self.PrintBook,
+            "PrintBooks": self.PrintBooks,
+            "FindClosestBook": self.FindClosestBook,
+            "ColorFlipCount": self.ColorFlipCount,
+        })
+        return function_map
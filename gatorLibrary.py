@@ -1,7 +1,25 @@
+import argparse
+import re
+import signal
 import sys
 import time
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque, namedtuple
+from heapq import heapify, heappop, heappush
+
+# Node colors are stored as integers so the fixup loops compare small ints instead of strings.
+BLACK = 0
+RED = 1
+COLOR_NAMES = ("BLACK", "RED")
+
+# Matches one command line: the function name and everything between the outer parentheses.
+COMMAND_PATTERN = re.compile(r'\s*(\w+)\s*\((.*)\)\s*$', re.S)
+# Matches one argument: a run of characters that are not commas or quotes, or quoted strings.
+ARGUMENT_PATTERN = re.compile(r'(?:[^,"]|"[^"]*")*')
 
 class Book:
+    __slots__ = ("BookId", "BookName", "AuthorName", "AvailabilityStatus", "BorrowedBy", "ReservationHeap", "Copies")
+
     def __init__(self, BookId=0, BookName="", AuthorName="", AvailabilityStatus=True, BorrowedBy=None):
         """
         Initialize a Book object with the given attributes.
@@ -18,22 +36,44 @@ class Book:
         self.AuthorName = AuthorName
         self.AvailabilityStatus = AvailabilityStatus
         self.BorrowedBy = BorrowedBy
-        self.ReservationHeap = []
+        # Most books are never reserved, so the queue is created by the first reservation
+        self.ReservationHeap = None
+        # A CopyInventory once the title has more than one copy, see RedBlackTree.AddCopies.
+        # AvailabilityStatus then tells whether any copy is free and BorrowedBy is unused.
+        self.Copies = None
 
     def __str__(self):
         """
         Return a string representation of the Book object.
         """
+        if self.Copies is not None:
+            return f"BookID = {self.BookId}\nTitle = \"{self.BookName}\"\nAuthor = \"{self.AuthorName}\"\n" \
+                   f"Availability = \"{'Yes' if self.AvailabilityStatus else 'No'}\"\n" \
+                   f"Copies = {self.Copies.count} ({len(self.Copies.free)} available)\n" \
+                   f"BorrowedBy = {self.Copies.borrowers()}\n" \
+                   f"Reservations = {self.get_reservation_list()}\n\n"
         return f"BookID = {self.BookId}\nTitle = \"{self.BookName}\"\nAuthor = \"{self.AuthorName}\"\n" \
                f"Availability = \"{'Yes' if self.AvailabilityStatus else 'No'}\"\n" \
                f"BorrowedBy = {self.BorrowedBy if self.AvailabilityStatus is False else 'None'}\n" \
                f"Reservations = {self.get_reservation_list()}\n\n"
 
+    def get_borrowers(self):
+        """
+        Return the IDs of the patrons who have borrowed a copy of the book.
+        """
+        if self.Copies is not None:
+            return list(self.Copies.loans)
+        if self.AvailabilityStatus is False and self.BorrowedBy is not None:
+            return [self.BorrowedBy]
+        return []
+
     def get_reservation_list(self):
         """
         Return a list of patron IDs who have reserved the book.
         """
-        return [reservation[0] for reservation in self.ReservationHeap]
+        if self.ReservationHeap is None:
+            return []
+        return self.ReservationHeap.patrons()
 
     def add_reservation(self, patron_id, priority_number, time_of_reservation):
         """
@@ -44,81 +84,581 @@ class Book:
         - priority_number (int): The priority number of the reservation.
         - time_of_reservation (datetime): The time of the reservation.
         """
-        reservation = (patron_id, priority_number, time_of_reservation)
-        self.ReservationHeap.append(reservation)
-        self._heapify_up()
+        if self.ReservationHeap is None:
+            self.ReservationHeap = ReservationQueue()
+        self.ReservationHeap.push(patron_id, priority_number, time_of_reservation)
+
+
+class ReservationQueue:
+    """
+    Binary min-heap of reservations ordered by priority number, then by time of reservation.
+
+    Lower priority numbers are served first and ties go to the earlier reservation, with an
+    insertion sequence number as the final tiebreak so equal timestamps stay first come, first
+    served. A patron holds at most one reservation per book.
+
+    The heap is kept by heapq. Cancelling or reprioritizing a reservation does not search the
+    heap: a dict from patron ID to the patron's live entry makes the old entry stale, stale
+    entries are skipped when they reach the top, and the heap is rebuilt without them once
+    they outnumber the live ones.
+    """
+
+    __slots__ = ("_heap", "_live", "_stale", "_sequence")
+
+    def __init__(self):
+        self._heap = []
+        self._live = {}
+        self._stale = 0
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._live)
+
+    def __bool__(self):
+        return bool(self._live)
+
+    def __contains__(self, patron_id):
+        return patron_id in self._live
+
+    def __iter__(self):
+        """
+        Yield (patron_id, priority_number, time_of_reservation) tuples in the order the
+        reservations will be served.
+        """
+        for priority_number, time_of_reservation, _, patron_id in sorted(self._live.values()):
+            yield patron_id, priority_number, time_of_reservation
 
-    def _heapify_up(self):
+    def entries(self):
         """
-        Perform heapify up operation to maintain the heap property of the reservation heap.
+        Return the live entries as (priority_number, time_of_reservation, sequence, patron_id)
+        tuples in the order they will be served, which is also a valid heap, together with the
+        next sequence number. See from_entries.
         """
-        index = len(self.ReservationHeap) - 1
-        while index > 0:
-            parent_index = (index - 1) // 2
-            if self._compare_reservations(index, parent_index) < 0:
-                self._swap(index, parent_index)
-                index = parent_index
-            else:
-                break
+        return [tuple(entry) for entry in sorted(self._live.values())], self._sequence
+
+    @classmethod
+    def from_entries(cls, entries, next_sequence):
+        """
+        Rebuild a queue from entries in heap order, such as the output of entries(), without
+        re-sifting.
+        """
+        queue = cls()
+        queue._heap = [list(entry) for entry in entries]
+        queue._live = {entry[3]: entry for entry in queue._heap}
+        queue._sequence = next_sequence
+        return queue
+
+    def patrons(self):
+        """
+        Return the patron IDs in the order their reservations will be served.
+        """
+        return [entry[3] for entry in sorted(self._live.values())]
 
-    def _compare_reservations(self, index1, index2):
+    def push(self, patron_id, priority_number, time_of_reservation):
         """
-        Compare two reservations based on priority number and time of reservation.
+        Add a reservation in O(log n). A patron who already holds a reservation keeps their
+        original place in time and only has their priority number updated.
         
         Parameters:
-        - index1 (int): The index of the first reservation in the heap.
-        - index2 (int): The index of the second reservation in the heap.
+        - patron_id: The ID of the patron making the reservation.
+        - priority_number (int): The priority number of the reservation.
+        - time_of_reservation (float): The time of the reservation.
+        """
+        if patron_id in self._live:
+            self.reprioritize(patron_id, priority_number)
+            return
+        entry = [priority_number, time_of_reservation, self._sequence, patron_id]
+        self._sequence += 1
+        self._live[patron_id] = entry
+        heappush(self._heap, entry)
+
+    def peek(self):
+        """
+        Return the highest priority reservation as (patron_id, priority_number, time_of_reservation)
+        in O(1) amortized, or None if the queue is empty.
+        """
+        if not self._live:
+            return None
+        heap = self._heap
+        live = self._live
+        while live.get(heap[0][3]) is not heap[0]:
+            heappop(heap)
+            self._stale -= 1
+        priority_number, time_of_reservation, _, patron_id = heap[0]
+        return patron_id, priority_number, time_of_reservation
+
+    def pop(self):
+        """
+        Remove and return the highest priority reservation in O(log n) amortized.
+        
+        Returns:
+        - reservation: A (patron_id, priority_number, time_of_reservation) tuple.
+        """
+        live = self._live
+        if not live:
+            raise IndexError("pop from an empty reservation queue")
+        heap = self._heap
+        entry = heappop(heap)
+        current = live.pop(entry[3], None)
+        while current is not entry:
+            # A stale entry: put back the patron's live entry, if any, and try the next one
+            if current is not None:
+                live[entry[3]] = current
+            self._stale -= 1
+            entry = heappop(heap)
+            current = live.pop(entry[3], None)
+        return entry[3], entry[0], entry[1]
+
+    def cancel(self, patron_id):
+        """
+        Remove the reservation held by the given patron in O(1) amortized.
         
         Returns:
-        - int: -1 if the first reservation has higher priority, 1 if the second reservation has higher priority, 0 if they have the same priority.
+        - reservation: The removed (patron_id, priority_number, time_of_reservation) tuple, or None
+          if the patron holds no reservation.
         """
-        patron_id1, priority_number1, time_of_reservation1 = self.ReservationHeap[index1]
-        patron_id2, priority_number2, time_of_reservation2 = self.ReservationHeap[index2]
+        entry = self._live.pop(patron_id, None)
+        if entry is None:
+            return None
+        self._retire()
+        priority_number, time_of_reservation, _, patron_id = entry
+        return patron_id, priority_number, time_of_reservation
+
+    def reprioritize(self, patron_id, priority_number):
+        """
+        Change the priority number of the reservation held by the given patron in O(log n)
+        amortized. The reservation keeps its time and sequence number.
+        
+        Returns:
+        - bool: True if the patron holds a reservation, False otherwise.
+        """
+        entry = self._live.get(patron_id)
+        if entry is None:
+            return False
+        if entry[0] != priority_number:
+            entry = self._live[patron_id] = [priority_number, entry[1], entry[2], patron_id]
+            heappush(self._heap, entry)
+            self._retire()
+        return True
+
+    def _retire(self):
+        """
+        Count one more stale entry, and rebuild the heap from the live entries once the stale
+        ones outnumber them.
+        """
+        self._stale += 1
+        if self._stale > len(self._live):
+            self._heap = list(self._live.values())
+            heapify(self._heap)
+            self._stale = 0
+
+class CopyInventory:
+    """
+    The physical copies of a title that has more than one, numbered from 1.
 
-        if priority_number1 < priority_number2 or (priority_number1 == priority_number2 and time_of_reservation1 > time_of_reservation2):
-            return -1
-        elif priority_number1 > priority_number2 or (priority_number1 == priority_number2 and time_of_reservation1 < time_of_reservation2):
-            return 1
+    The numbers of the copies on the shelf form a stack, so any free copy is lent in O(1), and
+    the borrowed copies are kept per patron, so a return finds the patron's copy in O(1). One
+    reservation queue, the book's ReservationHeap, serves all copies.
+    """
+
+    __slots__ = ("count", "free", "loans")
+
+    def __init__(self, count=1, borrowed_by=None):
+        """
+        Parameters:
+        - count (int): The number of copies.
+        - borrowed_by: The patron holding copy 1, if it is borrowed.
+        """
+        self.count = count
+        self.loans = {}
+        self.free = list(range(count, 1, -1))
+        if borrowed_by is None:
+            self.free.append(1)
         else:
-            return 0
+            self.loans[int(borrowed_by)] = [1]
 
-    def _swap(self, index1, index2):
+    @classmethod
+    def from_entries(cls, count, loans, free):
         """
-        Swap two reservations in the reservation heap.
+        Rebuild an inventory from its (patron_id, copy) loans and its free copy stack.
+        """
+        inventory = cls.__new__(cls)
+        inventory.count = count
+        inventory.loans = {}
+        inventory.free = list(free)
+        for patron_id, copy in loans:
+            inventory.lend(patron_id, copy)
+        return inventory
+
+    def add(self, count):
+        """
+        Add count new copies to the shelf.
+        """
+        self.free.extend(range(self.count + count, self.count, -1))
+        self.count += count
+
+    def lend(self, patron_id, copy=None):
+        """
+        Lend a copy to a patron: the given copy, or otherwise a free one, and return its number.
+        """
+        if copy is None:
+            copy = self.free.pop()
+        copies = self.loans.get(patron_id)
+        if copies is None:
+            self.loans[patron_id] = [copy]
+        else:
+            copies.append(copy)
+        return copy
+
+    def release(self, patron_id):
+        """
+        Take back one copy from a patron without putting it on the shelf.
         
-        Parameters:
-        - index1 (int): The index of the first reservation.
-        - index2 (int): The index of the second reservation.
+        Returns:
+        - copy: The number of the copy, or None if the patron holds no copy.
+        """
+        copies = self.loans.get(patron_id)
+        if not copies:
+            return None
+        copy = copies.pop()
+        if not copies:
+            del self.loans[patron_id]
+        return copy
+
+    def borrowers(self):
+        """
+        Return the IDs of the patrons holding copies in increasing order, once per copy held.
+        """
+        return sorted(patron_id for patron_id, copies in self.loans.items() for _ in copies)
+
+
+def normalize_name(name):
+    """
+    Return the form of a title or author name that the name indexes compare: surrounding
+    whitespace removed and case folded. The result is interned, so the books of one author
+    share a single key string.
+    """
+    return sys.intern(name.strip().casefold())
+
+
+class NameIndex:
+    """
+    Ordered secondary index from a normalized name (a title or an author) to books.
+
+    Entries are (normalized name, book ID, book) tuples kept in a list of sorted
+    blocks with the largest entry of each block in a separate list, as in a B+ tree with
+    one level of leaves. Finding a name is a bisect over the block maxima and one within a
+    block, so an exact or prefix query with k results takes O(log n + k), and adding or
+    removing a book moves at most one block.
+    """
+
+    BLOCK_SIZE = 512
+
+    def __init__(self):
+        self._blocks = []
+        self._maxes = []
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _entry(name, book):
+        # Book IDs are unique, so comparisons never reach the Book itself
+        return (normalize_name(name), book.BookId, book)
+
+    def build(self, pairs):
+        """
+        Replace the contents of the index with the given (name, book) pairs in O(n log n).
+        """
+        entries = sorted(self._entry(name, book) for name, book in pairs)
+        size = self.BLOCK_SIZE
+        self._blocks = [entries[start:start + size] for start in range(0, len(entries), size)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._size = len(entries)
+
+    def add(self, name, book):
+        """
+        Add a book under the given name.
+        """
+        entry = self._entry(name, book)
+        self._size += 1
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._maxes.append(entry)
+            return
+        index = bisect_left(self._maxes, entry)
+        if index == len(self._maxes):
+            index -= 1
+        block = self._blocks[index]
+        insort(block, entry)
+        self._maxes[index] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            half = len(block) >> 1
+            self._blocks[index:index + 1] = [block[:half], block[half:]]
+            self._maxes[index:index + 1] = [block[half - 1], block[-1]]
+
+    def discard(self, name, book):
+        """
+        Remove a book from under the given name, if it is there.
+        """
+        entry = self._entry(name, book)
+        index = bisect_left(self._maxes, entry)
+        if index == len(self._maxes):
+            return
+        block = self._blocks[index]
+        position = bisect_left(block, entry)
+        if position == len(block) or block[position] != entry:
+            return
+        del block[position]
+        self._size -= 1
+        if block:
+            self._maxes[index] = block[-1]
+        else:
+            del self._blocks[index]
+            del self._maxes[index]
+
+    def _iter_from(self, lower):
+        """
+        Yield the entries greater than or equal to lower, in order.
+        """
+        index = bisect_left(self._maxes, lower)
+        if index == len(self._maxes):
+            return
+        position = bisect_left(self._blocks[index], lower)
+        for block in self._blocks[index:]:
+            for entry_index in range(position, len(block)):
+                yield block[entry_index]
+            position = 0
+
+    def find(self, name):
+        """
+        Yield the books filed under exactly the given name, in ID order.
+        """
+        key = normalize_name(name)
+        for entry in self._iter_from((key,)):
+            if entry[0] != key:
+                return
+            yield entry[2]
+
+    def find_prefix(self, prefix):
+        """
+        Yield the books whose name starts with the given prefix, ordered by name and then ID.
+        """
+        key = normalize_name(prefix)
+        for entry in self._iter_from((key,)):
+            if not entry[0].startswith(key):
+                return
+            yield entry[2]
+
+
+class PatronIndex:
+    """
+    Index from patron ID to the IDs of the books the patron has borrowed and reserved, so a
+    patron's holdings are found in O(1) instead of by scanning every book. Patron IDs are
+    compared as integers, as reservations store them.
+    """
+
+    def __init__(self):
+        self._loans = {}
+        self._reservations = {}
+
+    @staticmethod
+    def _add(table, patron_id, book_id):
+        patron_id = int(patron_id)
+        books = table.get(patron_id)
+        if books is None:
+            table[patron_id] = books = set()
+        books.add(book_id)
+
+    @staticmethod
+    def _remove(table, patron_id, book_id):
+        patron_id = int(patron_id)
+        books = table.get(patron_id)
+        if books is not None:
+            books.discard(book_id)
+            if not books:
+                del table[patron_id]
+
+    def add_loan(self, patron_id, book_id):
+        self._add(self._loans, patron_id, book_id)
+
+    def remove_loan(self, patron_id, book_id):
+        if patron_id is not None:
+            self._remove(self._loans, patron_id, book_id)
+
+    def add_reservation(self, patron_id, book_id):
+        self._add(self._reservations, patron_id, book_id)
+
+    def remove_reservation(self, patron_id, book_id):
+        self._remove(self._reservations, patron_id, book_id)
+
+    def loans(self, patron_id):
+        """
+        Return the set of book IDs the patron has borrowed.
         """
-        self.ReservationHeap[index1], self.ReservationHeap[index2] = self.ReservationHeap[index2], self.ReservationHeap[index1]
+        return self._loans.get(int(patron_id), frozenset())
+
+    def reservations(self, patron_id):
+        """
+        Return the set of book IDs the patron has reserved.
+        """
+        return self._reservations.get(int(patron_id), frozenset())
+
+    def add_book(self, book):
+        """
+        Record the loans and reservations of a book that enters the library.
+        """
+        for patron_id in book.get_borrowers():
+            self.add_loan(patron_id, book.BookId)
+        for patron_id in book.get_reservation_list():
+            self.add_reservation(patron_id, book.BookId)
+
+    def remove_book(self, book):
+        """
+        Drop the loans and cancel the reservations of a book that leaves the library.
+        """
+        for patron_id in book.get_borrowers():
+            self.remove_loan(patron_id, book.BookId)
+        for patron_id in book.get_reservation_list():
+            self.remove_reservation(patron_id, book.BookId)
+
+
+class RenderCache:
+    """
+    Bounded LRU cache of the rendered output of books, keyed by BookId.
+    
+    The tree drops a book's entry whenever the book is borrowed, returned, reserved or
+    deleted, so a hit is always equal to str(book). Each entry also keeps the book it was
+    rendered from and is only used for that same book.
+    """
+    __slots__ = ("capacity", "hits", "misses", "_entries")
+
+    def __init__(self, capacity=4096):
+        if capacity < 1:
+            raise ValueError("The render cache capacity must be at least 1")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def render(self, book):
+        """
+        Return str(book), from the cache if possible.
+        """
+        entries = self._entries
+        entry = entries.get(book.BookId)
+        if entry is not None and entry[0] is book:
+            self.hits += 1
+            entries.move_to_end(book.BookId)
+            return entry[1]
+        self.misses += 1
+        text = str(book)
+        entries[book.BookId] = (book, text)
+        entries.move_to_end(book.BookId)
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+        return text
+
+    def invalidate(self, book_id):
+        self._entries.pop(book_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+# One color change: the book ID of the node, the operation it happened in, the old and new
+# colors, and its contribution to the color flip count (+1, or -1 when it undoes an earlier
+# change made by the same operation).
+ColorFlipRecord = namedtuple("ColorFlipRecord", ["book_id", "function_id", "old_color", "new_color", "delta"])
+
+
+class RingBufferTraceSink:
+    """
+    Trace sink that keeps the most recent color flip records in memory.
+    """
+
+    def __init__(self, capacity=4096):
+        self.records = deque(maxlen=capacity)
+
+    def record(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+
+class FileTraceSink:
+    """
+    Trace sink that writes color flip records to a file as tab separated lines.
+    """
+
+    def __init__(self, filename):
+        self._file = open(filename, "w")
+        self._file.write("book_id\tfunction_id\told_color\tnew_color\tdelta\n")
+
+    def record(self, record):
+        self._file.write(f"{record.book_id}\t{record.function_id}\t{COLOR_NAMES[record.old_color]}\t"
+                         f"{COLOR_NAMES[record.new_color]}\t{record.delta:+d}\n")
+
+    def close(self):
+        self._file.close()
+
 
 class RBTreeNode:
+    __slots__ = ("book", "color", "left", "right", "parent", "size")
+
     def __init__(self, book):
         self.book = book
-        self.color = "RED"
+        self.color = RED
         self.left = None
         self.right = None
         self.parent = None
-        self.colorChangingFunctionId=0
-        
+        # Number of nodes in the subtree rooted here, for order statistics
+        self.size = 1
+
 
 class RedBlackTree:
-    def __init__(self):
+    def __init__(self, trace=None, metrics=None, render_cache=None, clock=None):
         """
         Initializes a Red-Black Tree with a NULL node as the root and sets the initial values for color_flip_count and currentFunctionId.
+        
+        Parameters:
+        - trace: An optional sink that receives a ColorFlipRecord for every color change. Tracing is off when None.
+        - metrics: An optional gatorMetrics.Metrics that counts rotations, fixup iterations and search depths. Off when None.
+        - render_cache: An optional RenderCache for the rendered output of books. Off when None.
+        - clock: The function that returns the current time in seconds, time.time when None.
         """
         self.NULL = RBTreeNode(Book())
-        self.NULL.color = "BLACK"
+        self.NULL.color = BLACK
+        self.NULL.size = 0
         self.NULL.left = None
         self.NULL.right = None
         self.root = self.NULL
         self.color_flip_count = 0
         self.currentFunctionId = 0
+        # Original color of every node recolored by the running operation, see ChangeNodeColor
+        self.changed_colors = {}
+        self.trace = trace
+        self.metrics = metrics
+        self.render_cache = render_cache
+        self.clock = clock if clock is not None else time.time
+        # An optional gatorTimers.LibraryTimers that tracks loan due dates and reservation expiry
+        self.timers = None
+        # NameIndex of titles and of authors, None until the first query that needs it
+        self.title_index = None
+        self.author_index = None
+        self.patron_index = PatronIndex()
 
     def LeftRotate(self, x):
         """
         Performs a left rotation on the given node x in the Red-Black Tree.
         """
+        if self.metrics is not None:
+            self.metrics.left_rotations += 1
         y = x.right
         x.right = y.left
 
@@ -137,10 +677,15 @@ class RedBlackTree:
         y.left = x
         x.parent = y
 
+        y.size = x.size
+        x.size = x.left.size + x.right.size + 1
+
     def RightRotate(self, x):
         """
         Performs a right rotation on the given node x in the Red-Black Tree.
         """
+        if self.metrics is not None:
+            self.metrics.right_rotations += 1
         y = x.left
         x.left = y.right
 
@@ -159,20 +704,37 @@ class RedBlackTree:
         y.right = x
         x.parent = y
 
-    def Insert(self, z):
+        y.size = x.size
+        x.size = x.left.size + x.right.size + 1
+
+    def Insert(self, z, start=None):
         """
         Inserts a new node z into the Red-Black Tree and maintains the Red-Black Tree properties.
+        
+        Parameters:
+        - z: The node to insert.
+        - start: Optional node to begin the search at instead of the root. The caller must
+          make sure z belongs in the subtree of start (see ClimbToward).
         """
         z.parent = None
         z.left = self.NULL
         z.right = self.NULL
-        z.color = "RED"    
+        z.color = RED    
+        z.size = 1
 
         y = None
         x = self.root
-
+        if start is not None:
+            x = start
+            ancestor = start.parent
+            while ancestor is not None:
+                ancestor.size += 1
+                ancestor = ancestor.parent
+
+        # Every node on the search path gains z as a descendant
         while x != self.NULL:
             y = x
+            x.size += 1
             if z.book.BookId < x.book.BookId:
                 x = x.left
             else:
@@ -188,7 +750,7 @@ class RedBlackTree:
             y.right = z
 
         if z.parent is None:                         
-            z.color = "BLACK"
+            z.color = BLACK
             return
         
         if z.parent.parent is None :                  
@@ -196,42 +758,60 @@ class RedBlackTree:
         
         self.InsertFixup(z)
 
+    def ClimbToward(self, finger, book_id):
+        """
+        Return the lowest ancestor of finger (or finger itself) whose subtree must contain
+        book_id, given that book_id is not smaller than the ID of finger. Batches that visit
+        IDs in increasing order use it to start each search from the previous node instead of
+        the root, which costs O(log d) for IDs d positions apart.
+        """
+        node = finger
+        parent = node.parent
+        # A left child covers every ID up to its parent's; a right child's bound is further up
+        while parent is not None and not (node is parent.left and book_id < parent.book.BookId):
+            node = parent
+            parent = node.parent
+        return node
+
     def InsertFixup(self, z):
         """
         Fixes the Red-Black Tree properties after an insertion of a new node z.
         """
-        while z.parent.color == "RED":
+        metrics = self.metrics
+        while z.parent.color == RED:
+            if metrics is not None:
+                metrics.insert_fixup_iterations += 1
             if z.parent == z.parent.parent.right:
                 lg = z.parent.parent.left
-                if lg.color == "RED":
-                    self.ChangeNodeColor(lg,"BLACK")
-                    self.ChangeNodeColor(z.parent,"BLACK")
-                    self.ChangeNodeColor(z.parent.parent,"RED")
+                if lg.color == RED:
+                    self.ChangeNodeColor(lg,BLACK)
+                    self.ChangeNodeColor(z.parent,BLACK)
+                    self.ChangeNodeColor(z.parent.parent,RED)
                     z = z.parent.parent
                 else:
                     if z == z.parent.left:
                         z = z.parent
                         self.RightRotate(z)
-                    self.ChangeNodeColor(z.parent,"BLACK")
-                    self.ChangeNodeColor(z.parent.parent,"RED")
+                    self.ChangeNodeColor(z.parent,BLACK)
+                    self.ChangeNodeColor(z.parent.parent,RED)
                     self.LeftRotate(z.parent.parent)
             else:
                 rg = z.parent.parent.right
-                if rg.color == 'RED':
-                    self.ChangeNodeColor(rg,"BLACK")
-                    self.ChangeNodeColor(z.parent,"BLACK")
-                    self.ChangeNodeColor(z.parent.parent,"RED")
+                if rg.color == RED:
+                    self.ChangeNodeColor(rg,BLACK)
+                    self.ChangeNodeColor(z.parent,BLACK)
+                    self.ChangeNodeColor(z.parent.parent,RED)
                     z = z.parent.parent
                 else:
                     if z == z.parent.right:
                         z = z.parent
                         self.LeftRotate(z)
-                    self.ChangeNodeColor(z.parent,"BLACK")
-                    self.ChangeNodeColor(z.parent.parent,"RED")
+                    self.ChangeNodeColor(z.parent,BLACK)
+                    self.ChangeNodeColor(z.parent.parent,RED)
                     self.RightRotate(z.parent.parent)
             if z == self.root:
                 break
-        self.ChangeNodeColor(self.root,"BLACK")
+        self.ChangeNodeColor(self.root,BLACK)
         
     def Transplant(self, u, v):
         """
@@ -250,57 +830,68 @@ class RedBlackTree:
         """
         Fixes the Red-Black Tree properties after a deletion of a node x.
         """
-        while x != self.root and x.color == "BLACK":
+        metrics = self.metrics
+        while x != self.root and x.color == BLACK:
+            if metrics is not None:
+                metrics.delete_fixup_iterations += 1
             if x == x.parent.left:
                 w = x.parent.right
-                if w.color == "RED":
-                    self.ChangeNodeColor(w,"BLACK")
-                    self.ChangeNodeColor(x.parent,"RED")
+                if w.color == RED:
+                    self.ChangeNodeColor(w,BLACK)
+                    self.ChangeNodeColor(x.parent,RED)
                     self.LeftRotate(x.parent)
                     w = x.parent.right
 
-                if w.left.color == "BLACK" and w.right.color == "BLACK":
-                    self.ChangeNodeColor(w,"RED")
+                if w.left.color == BLACK and w.right.color == BLACK:
+                    self.ChangeNodeColor(w,RED)
                     x = x.parent
                 else:
-                    if w.right.color == "BLACK":
-                        self.ChangeNodeColor(w,"BLACK")
-                        self.ChangeNodeColor(w,"RED")
+                    if w.right.color == BLACK:
+                        self.ChangeNodeColor(w.left,BLACK)
+                        self.ChangeNodeColor(w,RED)
                         self.RightRotate(w)
                         w = x.parent.right
 
                     self.ChangeNodeColor(w,x.parent.color)
-                    self.ChangeNodeColor(x.parent,"BLACK")
-                    self.ChangeNodeColor(w.right,"BLACK")
+                    self.ChangeNodeColor(x.parent,BLACK)
+                    self.ChangeNodeColor(w.right,BLACK)
                     self.LeftRotate(x.parent)
                     x = self.root
             else:
                 w = x.parent.left
-                if w.color == "RED":
-                    self.ChangeNodeColor(w.color,"BLACK")
-                    self.ChangeNodeColor(x.parent,"RED")
+                if w.color == RED:
+                    self.ChangeNodeColor(w,BLACK)
+                    self.ChangeNodeColor(x.parent,RED)
                     self.RightRotate(x.parent)
                     w = x.parent.left
 
-                if w.right.color == "BLACK" and w.left.color == "BLACK":
-                    self.ChangeNodeColor(w,"RED")
+                if w.right.color == BLACK and w.left.color == BLACK:
+                    self.ChangeNodeColor(w,RED)
                     x = x.parent
                 else:
-                    if w.left.color == "BLACK":
-                        self.ChangeNodeColor(w.right,"BLACK")
-                        self.ChangeNodeColor(w,"RED")
+                    if w.left.color == BLACK:
+                        self.ChangeNodeColor(w.right,BLACK)
+                        self.ChangeNodeColor(w,RED)
                         self.LeftRotate(w)
                         w = x.parent.left
 
                     self.ChangeNodeColor(w,x.parent.color)
-                    self.ChangeNodeColor(x.parent,"BLACK")
-                    self.ChangeNodeColor(w.left,"BLACK")
+                    self.ChangeNodeColor(x.parent,BLACK)
+                    self.ChangeNodeColor(w.left,BLACK)
                     self.RightRotate(x.parent)
                     x = self.root
 
-        self.ChangeNodeColor(x,"BLACK")
+        self.ChangeNodeColor(x,BLACK)
 
     def Delete(self, z):
+        # The node that leaves its position is z itself, or the maximum of its left subtree
+        # when z has two children, so every ancestor of that position loses one descendant
+        removed = z if z.left == self.NULL or z.right == self.NULL else self.TreeMaximum(z.left)
+        ancestor = removed.parent
+        while ancestor is not None:
+            ancestor.size -= 1
+            ancestor = ancestor.parent
+
         y = z
         y_original_color = y.color
 
@@ -324,9 +915,10 @@ class RedBlackTree:
             self.Transplant(z, y)
             y.right = z.right
             y.right.parent = y
+            y.size = z.size
             self.ChangeNodeColor(y, z.color)
 
-        if y_original_color == "BLACK":
+        if y_original_color == BLACK:
             self.DeleteFixup(x)
 
     def TreeMaximum(self, x):
@@ -334,63 +926,667 @@ class RedBlackTree:
             x = x.right
         return x
 
+    def CheckInvariants(self):
+        """
+        Check in O(n) that the tree is a valid red-black tree: the root and the NULL node are
+        black, no red node has a red child, every path from the root to a leaf has the same
+        number of black nodes, book IDs are in search tree order, every child points back to
+        its parent, subtree sizes add up, and no operation left uncommitted color changes.
+        Walks the tree with an explicit stack, so any depth can be checked.
+
+        Returns:
+        - count: The number of books in the tree.
+
+        Raises:
+        - AssertionError: Describing the first violation found.
+        """
+        NULL = self.NULL
+        if NULL.color != BLACK or NULL.size != 0 or NULL.book.BookId != 0:
+            raise AssertionError("The NULL node must be black, have size 0 and book ID 0")
+        if self.changed_colors:
+            raise AssertionError(f"{len(self.changed_colors)} color changes were not committed")
+        root = self.root
+        if root is NULL:
+            return 0
+        if root.parent is not None:
+            raise AssertionError(f"The root {root.book.BookId} has a parent")
+        if root.color != BLACK:
+            raise AssertionError(f"The root {root.book.BookId} is red")
+
+        count = 0
+        leaf_black_height = None
+        # (node, lowest allowed ID, highest allowed ID, black nodes above node)
+        stack = [(root, None, None, 0)]
+        while stack:
+            node, low, high, black_above = stack.pop()
+            count += 1
+            book_id = node.book.BookId
+            if (low is not None and book_id < low) or (high is not None and book_id > high):
+                raise AssertionError(f"Book {book_id} is out of order, it must be within [{low}, {high}]")
+            if node.size != node.left.size + node.right.size + 1:
+                raise AssertionError(f"Book {book_id} has size {node.size}, its subtree holds "
+                                     f"{node.left.size + node.right.size + 1} books")
+            black_height = black_above + (node.color == BLACK)
+            for child, child_low, child_high in ((node.left, low, book_id), (node.right, book_id, high)):
+                if child is NULL:
+                    if leaf_black_height is None:
+                        leaf_black_height = black_height
+                    elif black_height != leaf_black_height:
+                        raise AssertionError(f"A path through book {book_id} has {black_height} black nodes, "
+                                             f"another has {leaf_black_height}")
+                    continue
+                if child.parent is not node:
+                    raise AssertionError(f"Book {child.book.BookId} does not point back to its parent {book_id}")
+                if node.color == RED and child.color == RED:
+                    raise AssertionError(f"Red book {book_id} has the red child {child.book.BookId}")
+                stack.append((child, child_low, child_high, black_height))
+        if count != root.size:
+            raise AssertionError(f"The root has size {root.size} but the tree holds {count} books")
+        return count
+
+    @classmethod
+    def from_sorted(cls, records, presorted=True, trace=None):
+        """
+        Build a Red-Black Tree from book records in O(n). See LoadSorted.
+        
+        Parameters:
+        - records: An iterable of Book objects or (book_id, book_name, author_name, ...) tuples.
+        - presorted: Whether the records are already in increasing BookId order.
+        - trace: An optional color flip trace sink.
+        
+        Returns:
+        - tree: The new RedBlackTree.
+        """
+        tree = cls(trace)
+        tree.LoadSorted(records, presorted)
+        return tree
+
+    def LoadSorted(self, records, presorted=True):
+        """
+        Load book records into this empty tree in O(n), without going through Insert.
+
+        The nodes are linked into a tree that splits every range at its midpoint, so all NULL
+        children lie on the last two levels. Nodes on an incomplete bottom level are colored
+        red and every other node black, which gives every path the same black height. These
+        are initial colors, like the red of a freshly inserted node, so bulk loading does not
+        change color_flip_count.
+        
+        Parameters:
+        - records: An iterable of Book objects or (book_id, book_name, author_name, ...) tuples.
+        - presorted: Whether the records are already in increasing BookId order. When False
+          they are sorted first, which costs O(n log n). The title and author indexes are
+          not built here but on the first query that needs them.
+        """
+        if self.root is not self.NULL:
+            raise ValueError("LoadSorted requires an empty tree")
+        books = [record if isinstance(record, Book) else Book(*record) for record in records]
+        if not presorted:
+            books.sort(key=lambda book: book.BookId)
+        for index in range(1, len(books)):
+            if books[index - 1].BookId >= books[index].BookId:
+                raise ValueError(f"Book IDs must be unique and increasing, got {books[index - 1].BookId} before {books[index].BookId}")
+
+        count = len(books)
+        if count == 0:
+            return
+        # The bottom level is incomplete unless count + 1 is a power of two
+        red_depth = count.bit_length() - 1 if (count + 1) & count else -1
+        self.root = self._BuildBalanced(books, 0, count - 1, 0, red_depth)
+        self.root.parent = None
+        self._BuildIndexes(books)
+
+    def IterShape(self):
+        """
+        Iterate in ID order over (book, depth, color) for every node, which describes the exact
+        shape and coloring of the tree. See LoadShaped.
+        """
+        NULL = self.NULL
+        stack = []
+        node = self.root
+        depth = 0
+        while stack or node is not NULL:
+            while node is not NULL:
+                stack.append((node, depth))
+                node = node.left
+                depth += 1
+            node, depth = stack.pop()
+            yield node.book, depth, node.color
+            node = node.right
+            depth += 1
+
+    def LoadShaped(self, records):
+        """
+        Load (book, depth, color) records in ID order, as produced by IterShape, into this empty
+        tree in O(n). The tree gets exactly the shape and colors the records describe, so later
+        operations rotate and recolor as they would have in the original tree. The title and
+        author indexes are built on the first query that needs them.
+        
+        Parameters:
+        - records: An iterable of (book, depth, color) tuples in increasing BookId order.
+        """
+        if self.root is not self.NULL:
+            raise ValueError("LoadShaped requires an empty tree")
+        NULL = self.NULL
+        # Right spine of the tree built so far, with depths increasing from the bottom of the stack
+        stack = []
+        books = []
+        levels = []
+        previous_id = None
+        for book, depth, color in records:
+            if previous_id is not None and previous_id >= book.BookId:
+                raise ValueError(f"Book IDs must be unique and increasing, got {previous_id} before {book.BookId}")
+            previous_id = book.BookId
+            books.append(book)
+            node = RBTreeNode(book)
+            node.color = color
+            node.left = NULL
+            node.right = NULL
+            # Deeper nodes on the spine belong to the left subtree of the new node
+            child = None
+            while stack and stack[-1][1] > depth:
+                child = stack.pop()
+            if child is not None:
+                if child[1] != depth + 1:
+                    raise ValueError(f"Inconsistent depth for book {child[0].book.BookId}")
+                node.left = child[0]
+                child[0].parent = node
+            # The new node hangs to the right of the spine until a shallower node claims it
+            if stack:
+                parent = stack[-1][0]
+                parent.right = node
+                node.parent = parent
+            stack.append((node, depth))
+            while len(levels) <= depth:
+                levels.append([])
+            levels[depth].append(node)
+        if stack:
+            if stack[0][1] != 0:
+                raise ValueError("Records do not describe a single tree")
+            self.root = stack[0][0]
+            self.root.parent = None
+        # Subtree sizes, deepest level first so children are done before their parents
+        for level in reversed(levels):
+            for node in level:
+                node.size = node.left.size + node.right.size + 1
+        self._BuildIndexes(books)
+
+    def _BuildBalanced(self, books, low, high, depth, red_depth):
+        """
+        Build the subtree for books[low..high] and return its root.
+        """
+        mid = (low + high) >> 1
+        node = RBTreeNode(books[mid])
+        node.color = RED if depth == red_depth and depth > 0 else BLACK
+        node.size = high - low + 1
+        if low < mid:
+            node.left = self._BuildBalanced(books, low, mid - 1, depth + 1, red_depth)
+            node.left.parent = node
+        else:
+            node.left = self.NULL
+        if mid < high:
+            node.right = self._BuildBalanced(books, mid + 1, high, depth + 1, red_depth)
+            node.right.parent = node
+        else:
+            node.right = self.NULL
+        return node
+
+    def _BuildIndexes(self, books):
+        """
+        Rebuild the patron index from a list of books. The name indexes are dropped and built
+        again on the next query that needs them.
+        """
+        self.title_index = None
+        self.author_index = None
+        self.patron_index = PatronIndex()
+        for book in books:
+            self.patron_index.add_book(book)
+
     def InsertBook(self, book_id, book_name, author_name, availability_status=True, borrowed_by=None, reservation_heap=None):
         book = Book(book_id, book_name, author_name, availability_status, borrowed_by)
+        self._AddBook(book)
+        return ""
+
+    def _AddBook(self, book, start=None):
+        """
+        Insert a book as one operation and add it to the secondary indexes.
+        
+        Returns:
+        - z: The new node.
+        """
         z = RBTreeNode(book)
         self.currentFunctionId+=1
-        self.Insert(z)
+        self.Insert(z, start)
+        self.CommitColorChanges()
+        if self.title_index is not None:
+            self.title_index.add(book.BookName, book)
+        if self.author_index is not None:
+            self.author_index.add(book.AuthorName, book)
+        self.patron_index.add_book(book)
+        return z
+
+    def BulkInsert(self, records):
+        """
+        Insert an unsorted batch of book records. The batch is sorted by ID and each search
+        starts from the node inserted before it (see ClimbToward) instead of from the root.
+        Every book is still inserted and rebalanced as its own operation, so the color flip
+        count is the one of inserting the batch in ID order.
+        
+        Parameters:
+        - records: An iterable of Book objects or (book_id, book_name, author_name, ...) tuples.
+        """
+        books = [record if isinstance(record, Book) else Book(*record) for record in records]
+        books.sort(key=lambda book: book.BookId)
+        finger = None
+        for book in books:
+            start = self.ClimbToward(finger, book.BookId) if finger is not None else None
+            finger = self._AddBook(book, start)
+
+    def InsertBookBatch(self, *parameters):
+        """
+        This function inserts several books given as consecutive (book_id, book_name,
+        author_name) triples, in ID order. See BulkInsert.
+        """
+        if len(parameters) % 3:
+            raise ValueError("InsertBookBatch takes (book_id, book_name, author_name) triples")
+        self.BulkInsert(parameters[index:index + 3] for index in range(0, len(parameters), 3))
         return ""
 
+    def SearchBookNodes(self, book_ids):
+        """
+        Find the nodes of many books at once. The IDs are searched in increasing order and
+        each search starts from where the previous one ended, so nearby IDs share most of
+        their path.
+        
+        Parameters:
+        - book_ids: An iterable of book IDs.
+        
+        Returns:
+        - nodes: A dict from each int book ID to its node, or to the NULL node if it is missing.
+        """
+        NULL = self.NULL
+        nodes = {}
+        finger = None
+        for book_id in sorted({int(book_id) for book_id in book_ids}):
+            node = self.root if finger is None else self.ClimbToward(finger, book_id)
+            while node is not NULL:
+                finger = node
+                node_id = node.book.BookId
+                if book_id == node_id:
+                    break
+                node = node.left if book_id < node_id else node.right
+            nodes[book_id] = node
+        return nodes
+
+    def MultiGet(self, book_ids):
+        """
+        Return the books with the given IDs, in the given order, with None for missing IDs.
+        """
+        book_ids = [int(book_id) for book_id in book_ids]
+        nodes = self.SearchBookNodes(book_ids)
+        NULL = self.NULL
+        return [None if nodes[book_id] is NULL else nodes[book_id].book for book_id in book_ids]
+
+    def PrintBookBatch(self, *book_ids):
+        """
+        This function returns the PrintBook output of every given book ID, in the given order.
+        """
+        nodes = self.SearchBookNodes(book_ids)
+        NULL = self.NULL
+        render = self.Renderer()
+        output = []
+        for book_id in book_ids:
+            node = nodes[int(book_id)]
+            output.append(render(node.book) if node is not NULL else f"Book {book_id} not found in the Library\n\n")
+        return "".join(output)
+
+    def MultiBorrow(self, requests):
+        """
+        Perform many BorrowBook requests with shared searches. Borrowing never moves a node,
+        so all books are looked up first and the requests then run in the given order, with
+        the same results as running them one at a time.
+        
+        Parameters:
+        - requests: A list of (patron_id, book_id, patron_priority) tuples.
+        
+        Returns:
+        - opmssgs: The BorrowBook message of every request.
+        """
+        nodes = self.SearchBookNodes(book_id for _, book_id, _ in requests)
+        return [self._BorrowFromNode(nodes[int(book_id)], patron_id, book_id, patron_priority)
+                for patron_id, book_id, patron_priority in requests]
+
+    def BorrowBookBatch(self, patron_id, patron_priority, *book_ids):
+        """
+        This function lets one patron borrow (or reserve) several books, in the given order.
+        """
+        return "".join(self.MultiBorrow([(patron_id, book_id, patron_priority) for book_id in book_ids]))
+
     def DeleteBook(self, book_id):
         z = self.SearchBookNode(self.root, book_id)
+        if z is self.NULL:
+            return f"Book {book_id} not found in the Library\n\n"
         reservation = [str(x) for x in z.book.get_reservation_list()]
-        if z is not None and z.book.BookId !=0:
-            self.currentFunctionId+=1
-            self.Delete(z)
-            if len(reservation)>1:
-                return f"Book {book_id} is no longer available. Reservations made by Patrons {', '.join(reservation)} have been cancelled!\n\n"
-            elif len(reservation)==1:
-                return f"Book {book_id} is no longer available. Reservation made by Patron {reservation[0]} has been cancelled!\n\n"
-            else:
-                return f"Book {book_id} is no longer available.\n\n"
+        self.currentFunctionId+=1
+        self.InvalidateRendered(z.book)
+        self.Delete(z)
+        self.CommitColorChanges()
+        if self.title_index is not None:
+            self.title_index.discard(z.book.BookName, z.book)
+        if self.author_index is not None:
+            self.author_index.discard(z.book.AuthorName, z.book)
+        self.patron_index.remove_book(z.book)
+        if self.timers is not None:
+            self.timers.book_removed(z.book)
+        if len(reservation)>1:
+            return f"Book {book_id} is no longer available. Reservations made by Patrons {', '.join(reservation)} have been cancelled!\n\n"
+        elif len(reservation)==1:
+            return f"Book {book_id} is no longer available. Reservation made by Patron {reservation[0]} has been cancelled!\n\n"
         else:
-            return f"Book {book_id} not found in the Library\n\n"
+            return f"Book {book_id} is no longer available.\n\n"
 
     def SearchBookNode(self, node, book_id):
-        while node != self.NULL and int(book_id) != int(node.book.BookId):
-            if int(book_id) < int(node.book.BookId):
-                node = node.left
-            else:
-                node = node.right
+        book_id = int(book_id)
+        if self.metrics is not None:
+            return self._SearchBookNodeMeasured(node, book_id)
+        NULL = self.NULL
+        while node is not NULL:
+            node_id = node.book.BookId
+            if book_id == node_id:
+                break
+            node = node.left if book_id < node_id else node.right
+        return node
+
+    def _SearchBookNodeMeasured(self, node, book_id):
+        """
+        SearchBookNode that records the depth at which the search ended in the metrics.
+        """
+        NULL = self.NULL
+        depth = 0
+        while node is not NULL:
+            node_id = node.book.BookId
+            if book_id == node_id:
+                break
+            node = node.left if book_id < node_id else node.right
+            depth += 1
+        self.metrics.record_search_depth(depth)
         return node
 
+    def Renderer(self):
+        """
+        Return the function that renders a book for output: str, or the render cache's
+        render when a cache is attached.
+        """
+        return str if self.render_cache is None else self.render_cache.render
+
+    def InvalidateRendered(self, book):
+        """
+        Drop the cached output of a book whose availability, borrower or reservations changed.
+        """
+        if self.render_cache is not None:
+            self.render_cache.invalidate(book.BookId)
+
     def PrintBook(self, book_id):
         node = self.SearchBookNode(self.root, book_id)
         if (node is not None) and (node.book.BookId != 0):
-            return str(node.book)
+            return self.Renderer()(node.book)
         else:
             return f"Book {book_id} not found in the Library\n\n"
 
     def PrintBooks(self, book_id1, book_id2):
-        books = self.GetBooksInRange(self.root, book_id1, book_id2)
-        opstring= ""
-        if books:
-            for book in books:
-                opstring+=str(book)
-        else:
-            opstring ="No Books found in the given range."
-        return opstring
+        """
+        Return the details of every book with an ID in [book_id1, book_id2], in ID order.
+        """
+        return "".join(self.StreamBooks(book_id1, book_id2))
+
+    def StreamBooks(self, book_id1, book_id2):
+        """
+        Yield the PrintBooks output one book at a time so callers can write it straight to the
+        output file without building the whole string.
+        
+        Parameters:
+        - book_id1: The lower bound of the range (inclusive).
+        - book_id2: The upper bound of the range (inclusive).
+        """
+        found = False
+        render = self.Renderer()
+        for book in self.IterBooksInRange(book_id1, book_id2):
+            found = True
+            yield render(book)
+        if not found:
+            yield "No Books found in the given range."
 
     def GetBooksInRange(self, node, book_id1, book_id2):
-            books = []
-            if node is not None:
-                if int(book_id1) < int(node.book.BookId):
-                    books.extend(self.GetBooksInRange(node.left, book_id1, book_id2))
-                if int(book_id1) <= int(node.book.BookId) <= int(book_id2):
-                    books.append(node.book)
-                if int(book_id2) > node.book.BookId:
-                    books.extend(self.GetBooksInRange(node.right, book_id1, book_id2))
-            return books
+        """
+        Return a list of the books in the subtree rooted at node with an ID in [book_id1, book_id2].
+        """
+        return list(self.IterBooksInRange(book_id1, book_id2, node))
+
+    def IterBooks(self):
+        """
+        Iterate over every book in the tree in ID order, using O(tree height) memory.
+        """
+        NULL = self.NULL
+        stack = []
+        node = self.root
+        while stack or node is not NULL:
+            while node is not NULL:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.book
+            node = node.right
+
+    def IterBooksInRange(self, book_id1, book_id2, node=None):
+        """
+        Iterate in ID order over the books with an ID in [book_id1, book_id2].
+
+        Seeks to the lower bound with a single descent and then walks in-order successors
+        using an explicit stack, so memory stays O(tree height) and no recursion is involved.
+        
+        Parameters:
+        - book_id1: The lower bound of the range (inclusive).
+        - book_id2: The upper bound of the range (inclusive).
+        - node: The root of the subtree to scan (defaults to the root of the tree).
+        """
+        low = int(book_id1)
+        high = int(book_id2)
+        NULL = self.NULL
+        if node is None:
+            node = self.root
+        stack = []
+        while node is not NULL:
+            if node.book.BookId < low:
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+        while stack:
+            node = stack.pop()
+            if node.book.BookId > high:
+                return
+            yield node.book
+            node = node.right
+            while node is not NULL:
+                stack.append(node)
+                node = node.left
+
+    def FindBooksByTitle(self, title):
+        """
+        Return the details of every book with exactly the given title (ignoring case and
+        surrounding spaces), in ID order.
+        """
+        return self._PrintFound(self.TitleIndex().find(title), f"No Books found with title {title.strip()}.\n\n")
+
+    def FindBooksByAuthor(self, author):
+        """
+        Return the details of every book by exactly the given author (ignoring case and
+        surrounding spaces), in ID order.
+        """
+        return self._PrintFound(self.AuthorIndex().find(author), f"No Books found by author {author.strip()}.\n\n")
+
+    def FindBooksByTitlePrefix(self, prefix):
+        """
+        Return the details of every book whose title starts with the given prefix, ordered by
+        title and then ID.
+        """
+        return self._PrintFound(self.TitleIndex().find_prefix(prefix), f"No Books found with a title starting with {prefix.strip()}.\n\n")
+
+    def FindBooksByAuthorPrefix(self, prefix):
+        """
+        Return the details of every book whose author starts with the given prefix, ordered by
+        author and then ID.
+        """
+        return self._PrintFound(self.AuthorIndex().find_prefix(prefix), f"No Books found by an author starting with {prefix.strip()}.\n\n")
+
+    def TitleIndex(self):
+        """
+        Return the title index, building it from the books in the tree on first use.
+        """
+        if self.title_index is None:
+            index = NameIndex()
+            index.build((book.BookName, book) for book in self.IterBooks())
+            self.title_index = index
+        return self.title_index
+
+    def AuthorIndex(self):
+        """
+        Return the author index, building it from the books in the tree on first use.
+        """
+        if self.author_index is None:
+            index = NameIndex()
+            index.build((book.AuthorName, book) for book in self.IterBooks())
+            self.author_index = index
+        return self.author_index
+
+    def _PrintFound(self, books, not_found):
+        """
+        Return the details of the given books, or the not_found message if there are none.
+        """
+        opstring = "".join(map(self.Renderer(), books))
+        return opstring if opstring else not_found
+
+
+    def CountBooksBelow(self, book_id):
+        """
+        Return the number of books with an ID smaller than book_id in O(log n).
+        """
+        book_id = int(book_id)
+        NULL = self.NULL
+        count = 0
+        node = self.root
+        while node is not NULL:
+            if node.book.BookId < book_id:
+                count += node.left.size + 1
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def SelectNode(self, rank):
+        """
+        Return the node holding the book of the given 1-based rank in ID order, or the NULL
+        node if there is no such book, in O(log n).
+        """
+        NULL = self.NULL
+        node = self.root
+        while node is not NULL:
+            left_size = node.left.size
+            if rank <= left_size:
+                node = node.left
+            elif rank == left_size + 1:
+                return node
+            else:
+                rank -= left_size + 1
+                node = node.right
+        return NULL
+
+    def IterBooksFromRank(self, rank):
+        """
+        Iterate in ID order over the books from the given 1-based rank onwards. Finding the
+        first book takes O(log n), and each following book O(1) amortized.
+        """
+        NULL = self.NULL
+        stack = []
+        node = self.root
+        while node is not NULL:
+            left_size = node.left.size
+            if rank <= left_size:
+                stack.append(node)
+                node = node.left
+            elif rank == left_size + 1:
+                stack.append(node)
+                break
+            else:
+                rank -= left_size + 1
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node.book
+            node = node.right
+            while node is not NULL:
+                stack.append(node)
+                node = node.left
+
+    def BookRank(self, book_id):
+        """
+        This function returns the 1-based position of a book in ID order.
+        
+        Parameters:
+        - book_id: The ID of the book.
+        """
+        node = self.SearchBookNode(self.root, book_id)
+        if node is self.NULL:
+            return f"Book {book_id} not found in the Library\n\n"
+        return f"Book {book_id} has Rank {self.CountBooksBelow(book_id) + 1}\n\n"
+
+    def SelectBook(self, rank):
+        """
+        This function returns the details of the book at the given 1-based position in ID order.
+        
+        Parameters:
+        - rank: The position of the book.
+        """
+        node = self.SelectNode(int(rank))
+        if node is self.NULL:
+            return f"No Book with Rank {rank}\n\n"
+        return self.Renderer()(node.book)
+
+    def CountBooksInRange(self, book_id1, book_id2):
+        """
+        This function returns the number of books with an ID in [book_id1, book_id2], in O(log n).
+        """
+        count = max(0, self.CountBooksBelow(int(book_id2) + 1) - self.CountBooksBelow(book_id1))
+        return f"Books in range [{book_id1}, {book_id2}] = {count}\n\n"
+
+    def PrintBooksPage(self, book_id1, book_id2, offset, limit):
+        """
+        This function returns one page of the PrintBooks output: at most limit books, skipping
+        the first offset books with an ID in [book_id1, book_id2]. The page is found in
+        O(log n) and costs O(limit) to print, however large offset is.
+        """
+        offset = int(offset)
+        if offset < 0 or int(limit) < 0:
+            raise ValueError("PrintBooksPage needs a non-negative offset and limit")
+        start = self.CountBooksBelow(book_id1) + offset
+        end = self.CountBooksBelow(int(book_id2) + 1)
+        count = min(int(limit), end - start)
+        if count <= 0:
+            return "No Books found in the given range."
+        books = self.IterBooksFromRank(start + 1)
+        render = self.Renderer()
+        return "".join(render(next(books)) for _ in range(count))
+
+
+    def CountAvailableBooks(self, book_id1, book_id2):
+        """
+        This function counts the available books with an ID in [book_id1, book_id2].
+        """
+        available = total = 0
+        for book in self.IterBooksInRange(book_id1, book_id2):
+            total += 1
+            if book.AvailabilityStatus:
+                available += 1
+        return f"{available} of {total} books in the given range are available\n\n"
 
 
     def BorrowBook(self, patron_id, book_id, patron_priority):
@@ -406,13 +1602,35 @@ class RedBlackTree:
         - opmssg: A string indicating the status of the borrowing operation.
         """
         book_node = self.SearchBookNode(self.root, book_id)
-        if book_node is not None:
-            if book_node.book.AvailabilityStatus:
-                book_node.book.AvailabilityStatus = False
-                book_node.book.BorrowedBy = patron_id
+        return self._BorrowFromNode(book_node, patron_id, book_id, patron_priority)
+
+    def _BorrowFromNode(self, book_node, patron_id, book_id, patron_priority):
+        """
+        Perform BorrowBook on a node that has already been looked up.
+        """
+        if book_node is not self.NULL:
+            book = book_node.book
+            # Convert first, so a bad patron ID or priority raises before any state changes
+            patron_number = int(patron_id)
+            if not book.AvailabilityStatus:
+                patron_priority = int(patron_priority)
+            self.InvalidateRendered(book)
+            if book.AvailabilityStatus:
+                if book.Copies is not None:
+                    book.Copies.lend(patron_number)
+                    book.AvailabilityStatus = bool(book.Copies.free)
+                else:
+                    book.AvailabilityStatus = False
+                    book.BorrowedBy = patron_id
+                self.patron_index.add_loan(patron_id, book.BookId)
+                if self.timers is not None:
+                    self.timers.loan_started(book, patron_id)
                 return f"Book {book_id} Borrowed by Patron {patron_id}\n\n"
             else:
-                book_node.book.add_reservation(int(patron_id), int(patron_priority), time.time())
+                book.add_reservation(patron_number, patron_priority, self.clock())
+                self.patron_index.add_reservation(patron_id, book.BookId)
+                if self.timers is not None:
+                    self.timers.hold_placed(book, patron_id)
                 return f"Book {book_id} Reserved by Patron {patron_id}\n\n"
         else:
             return f"Book {book_id} not found in the Library\n\n"
@@ -430,23 +1648,136 @@ class RedBlackTree:
         - opmssg: A string indicating the status of the returning operation.
         """
         book_node = self.SearchBookNode(self.root, book_id)
-        if book_node is not None and not book_node.book.AvailabilityStatus:
-            book_node.book.AvailabilityStatus = True
-            book_node.book.BorrowedBy = None
+        if book_node is not self.NULL and book_node.book.Copies is not None:
+            return self._ReturnCopy(book_node.book, patron_id, book_id)
+        if book_node is not self.NULL and not book_node.book.AvailabilityStatus:
+            book = book_node.book
+            self.InvalidateRendered(book)
+            self.patron_index.remove_loan(book.BorrowedBy, book.BookId)
+            if self.timers is not None and book.BorrowedBy is not None:
+                self.timers.loan_ended(book, book.BorrowedBy)
+            book.AvailabilityStatus = True
+            book.BorrowedBy = None
             opmssg = f"Book {book_id} Returned by Patron {patron_id}\n\n"
-            if book_node.book.ReservationHeap:
-                reservation = book_node.book.ReservationHeap.pop(0)
-                book_node.book.BorrowedBy = reservation[0]
+            if book.ReservationHeap:
+                reservation = book.ReservationHeap.pop()
+                book.BorrowedBy = reservation[0]
+                self.patron_index.remove_reservation(reservation[0], book.BookId)
+                self.patron_index.add_loan(reservation[0], book.BookId)
+                if self.timers is not None:
+                    self.timers.hold_ended(book, reservation[0])
+                    self.timers.loan_started(book, reservation[0])
                 opmssg += f"Book {book_id} Allotted to Patron {reservation[0]}\n\n"
-                book_node.book.AvailabilityStatus = False
+                book.AvailabilityStatus = False
             return opmssg
         else:
             return f"Book {book_id} not found in the Library or not borrowed by Patron {patron_id}\n\n"
 
 
+    def _ReturnCopy(self, book, patron_id, book_id):
+        """
+        Perform ReturnBook on a title with several copies. The returned copy goes straight to
+        the highest priority reservation, if there is one, and back on the shelf otherwise.
+        """
+        copies = book.Copies
+        copy = copies.release(int(patron_id))
+        if copy is None:
+            return f"Book {book_id} not found in the Library or not borrowed by Patron {patron_id}\n\n"
+        self.InvalidateRendered(book)
+        if int(patron_id) not in copies.loans:
+            self.patron_index.remove_loan(patron_id, book.BookId)
+        if self.timers is not None:
+            self.timers.loan_ended(book, patron_id)
+        opmssg = f"Book {book_id} Returned by Patron {patron_id}\n\n"
+        if book.ReservationHeap:
+            opmssg += self._AllotCopy(book, book_id, copy)
+        else:
+            copies.free.append(copy)
+            book.AvailabilityStatus = True
+        return opmssg
+
+    def _AllotCopy(self, book, book_id, copy=None):
+        """
+        Lend a copy of a title with several copies to its highest priority reservation: the
+        given copy, or otherwise a free one.
+        """
+        patron_id = book.ReservationHeap.pop()[0]
+        book.Copies.lend(patron_id, copy)
+        book.AvailabilityStatus = bool(book.Copies.free)
+        self.patron_index.remove_reservation(patron_id, book.BookId)
+        self.patron_index.add_loan(patron_id, book.BookId)
+        if self.timers is not None:
+            self.timers.hold_ended(book, patron_id)
+            self.timers.loan_started(book, patron_id)
+        return f"Book {book_id} Allotted to Patron {patron_id}\n\n"
+
+    def AddCopies(self, book_id, count):
+        """
+        This function adds copies of a book to the library. A book that had one copy becomes
+        a title with several copies, its current loan becoming the loan of copy 1. The new
+        copies are allotted to the highest priority reservations first.
+        
+        Parameters:
+        - book_id: The ID of the book.
+        - count: The number of copies to add.
+        
+        Returns:
+        - opmssg: A string with the new number of copies and the allotments made.
+        """
+        count = int(count)
+        if count < 1:
+            raise ValueError("AddCopies needs a positive number of copies")
+        book_node = self.SearchBookNode(self.root, book_id)
+        if book_node is self.NULL:
+            return f"Book {book_id} not found in the Library\n\n"
+        book = book_node.book
+        self.InvalidateRendered(book)
+        if book.Copies is None:
+            book.Copies = CopyInventory(1, None if book.AvailabilityStatus else book.BorrowedBy)
+            book.BorrowedBy = None
+        book.Copies.add(count)
+        book.AvailabilityStatus = True
+        opmssg = f"Book {book_id} now has {book.Copies.count} copies\n\n"
+        while book.Copies.free and book.ReservationHeap:
+            opmssg += self._AllotCopy(book, book_id)
+        return opmssg
+
+
+    def CancelReservation(self, book, patron_id):
+        """
+        Cancel a patron's reservation of a book, moving the patrons behind it up the queue.
+        
+        Returns:
+        - cancelled: True if the patron had a reservation.
+        """
+        if book.ReservationHeap is None or book.ReservationHeap.cancel(int(patron_id)) is None:
+            return False
+        self.InvalidateRendered(book)
+        self.patron_index.remove_reservation(patron_id, book.BookId)
+        if self.timers is not None:
+            self.timers.hold_ended(book, patron_id)
+        return True
+
+
+    def PrintPatron(self, patron_id):
+        """
+        This function lists the books a patron has borrowed and the books they have reserved.
+        
+        Parameters:
+        - patron_id: The ID of the patron.
+        
+        Returns:
+        - opmssg: The borrowed and reserved book IDs of the patron, in ID order.
+        """
+        loans = sorted(self.patron_index.loans(patron_id))
+        reservations = sorted(self.patron_index.reservations(patron_id))
+        return f"Patron {patron_id}\nBorrowed = {loans}\nReservations = {reservations}\n\n"
+
+
     def FindClosestBook(self, target_id):
         """
         This function finds the closest book(s) to a given target book ID in the Red-Black Tree.
+        When two books are equally close, both are returned in ID order.
         
         Parameters:
         - target_id: The target book ID.
@@ -454,91 +1785,135 @@ class RedBlackTree:
         Returns:
         - closest_nodes: A string representation of the closest book(s) to the target book ID.
         """
-        closest_nodes = self.FindClosestBookHelper(self.root, target_id)
-        if closest_nodes:
-            return "".join([str(book) for book in closest_nodes])
-        else:
+        target_id = int(target_id)
+        floor, ceiling = self.FloorCeilingNodes(target_id)
+        NULL = self.NULL
+        render = self.Renderer()
+        if floor is NULL and ceiling is NULL:
             return "No books in the Library.\n\n"
+        if floor is ceiling or ceiling is NULL:
+            return render(floor.book)
+        if floor is NULL:
+            return render(ceiling.book)
+        floor_distance = target_id - floor.book.BookId
+        ceiling_distance = ceiling.book.BookId - target_id
+        if floor_distance < ceiling_distance:
+            return render(floor.book)
+        elif ceiling_distance < floor_distance:
+            return render(ceiling.book)
+        else:
+            return render(floor.book) + render(ceiling.book)
 
 
-    def FindClosestBookHelper(self, node, target_id):
+    def FloorCeilingNodes(self, target_id):
         """
-        This helper function recursively finds the closest book(s) to a given target book ID in the Red-Black Tree.
+        This function finds, in a single descent from the root, the nodes with the largest ID
+        not above target_id and the smallest ID not below it.
         
         Parameters:
-        - node: The current node being traversed in the Red-Black Tree.
-        - target_id: The target book ID.
+        - target_id: The target book ID, as an int.
         
         Returns:
-        - closest_nodes: A list of the closest book(s) to the target book ID.
-        """
-        if node is not None:
-            closest_nodes = []
-            # Traverse the tree to find the closest nodes
-            while node:
-                if int(node.book.BookId) == int(target_id):
-                    return [node.book]
-
-                if int(node.book.BookId) < int(target_id):
-                    closest_nodes.append(node.book)
-                    node = node.right
-                else:
-                    closest_nodes.append(node.book)
-                    node = node.left
-
-            # Find the inorder predecessor and successor
-            pred, succ = self.InorderPredecessorSuccessor(target_id)
-
-            # Calculate distances to the target ID
-            pred_distance = abs(int(pred.book.BookId) - int(target_id)) if pred else float('inf')
-            succ_distance = abs(int(succ.book.BookId) - int(target_id)) if succ else float('inf')
-
-            # Compare distances and return the closest nodes
-            if pred_distance < succ_distance:
-                return [pred.book] if pred else []
-            elif succ_distance < pred_distance:
-                return [succ.book] if succ else []
+        - floor: The floor node, or the NULL node if every book has a larger ID.
+        - ceiling: The ceiling node, or the NULL node if every book has a smaller ID. Both are
+          the same node when a book has exactly target_id.
+        """
+        NULL = self.NULL
+        floor = NULL
+        ceiling = NULL
+        node = self.root
+        while node is not NULL:
+            book_id = node.book.BookId
+            if book_id < target_id:
+                floor = node
+                node = node.right
+            elif book_id > target_id:
+                ceiling = node
+                node = node.left
             else:
-                return sorted([pred.book, succ.book], key=lambda book: int(book.BookId) if book else float('inf'))
-        return []
+                return node, node
+        return floor, ceiling
 
 
-    def InorderPredecessorSuccessor(self, target_id):
+    def FindClosestBooks(self, target_id, k):
         """
-        This function finds the inorder predecessor and successor of a given target book ID in the Red-Black Tree.
+        This function finds the k books whose IDs are closest to target_id by walking outwards
+        from the target in both directions, in O(log n + k). Ties in distance go to the
+        smaller ID.
         
         Parameters:
         - target_id: The target book ID.
+        - k: The number of books to return.
         
         Returns:
-        - pred: The inorder predecessor of the target book ID.
-        - succ: The inorder successor of the target book ID.
+        - opstring: The details of the closest books, in ID order.
         """
-        pred = None
-        succ = None
-        current = self.root
-
-        while current.book.BookId != 0:
-            if int(current.book.BookId) == int(target_id):
-                if current.left:
-                    pred = current.left
-                    while pred.right:
-                        pred = pred.right
+        target_id = int(target_id)
+        k = int(k)
+        if k < 1:
+            raise ValueError("FindClosestBooks needs k of at least 1")
+        below = self.IterBooksBefore(target_id)
+        above = self.IterBooksFrom(target_id)
+        lower = next(below, None)
+        upper = next(above, None)
+        smaller = []
+        larger = []
+        while len(smaller) + len(larger) < k and (lower is not None or upper is not None):
+            if upper is None or (lower is not None and target_id - lower.BookId <= upper.BookId - target_id):
+                smaller.append(lower)
+                lower = next(below, None)
+            else:
+                larger.append(upper)
+                upper = next(above, None)
+        if not smaller and not larger:
+            return "No books in the Library.\n\n"
+        smaller.reverse()
+        render = self.Renderer()
+        return "".join(map(render, smaller)) + "".join(map(render, larger))
 
-                if current.right:
-                    succ = current.right
-                    while succ.left:
-                        succ = succ.left
 
-                break
-            elif int(current.book.BookId) < int(target_id):
-                pred = current
-                current = current.right
+    def IterBooksFrom(self, book_id):
+        """
+        Iterate in increasing ID order over the books with an ID of at least book_id.
+        """
+        NULL = self.NULL
+        stack = []
+        node = self.root
+        while node is not NULL:
+            if node.book.BookId < book_id:
+                node = node.right
             else:
-                succ = current
-                current = current.left
+                stack.append(node)
+                node = node.left
+        while stack:
+            node = stack.pop()
+            yield node.book
+            node = node.right
+            while node is not NULL:
+                stack.append(node)
+                node = node.left
 
-        return pred, succ
+
+    def IterBooksBefore(self, book_id):
+        """
+        Iterate in decreasing ID order over the books with an ID below book_id.
+        """
+        NULL = self.NULL
+        stack = []
+        node = self.root
+        while node is not NULL:
+            if node.book.BookId >= book_id:
+                node = node.left
+            else:
+                stack.append(node)
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node.book
+            node = node.left
+            while node is not NULL:
+                stack.append(node)
+                node = node.right
 
 
     def ColorFlipCount(self):
@@ -553,23 +1928,34 @@ class RedBlackTree:
 
     def ChangeNodeColor(self, node, new_color):
         """
-        This function changes the color of a given node in the Red-Black Tree.
+        This function changes the color of a given node in the Red-Black Tree. The first
+        change of a node within an operation records its original color in changed_colors;
+        CommitColorChanges turns the recorded changes into flips when the operation ends.
         
         Parameters:
         - node: The node whose color needs to be changed.
         - new_color: The new color of the node.
         """
-        if node.color != new_color:
-            if node.colorChangingFunctionId != self.currentFunctionId:
-                print(node.book.BookId, self.currentFunctionId, node.colorChangingFunctionId, node.color, "-->", new_color, " +1")
-                self.color_flip_count += 1  # Increment color flip count
-                node.colorChangingFunctionId = self.currentFunctionId
-            else:
-                print(node.book.BookId, self.currentFunctionId, node.colorChangingFunctionId, node.color, "-->", new_color, " -1")
-                self.color_flip_count -= 1
-                node.colorChangingFunctionId = 0
-
-        node.color = new_color
+        old_color = node.color
+        if old_color != new_color:
+            changed_colors = self.changed_colors
+            if node not in changed_colors:
+                changed_colors[node] = old_color
+            if self.trace is not None:
+                # A change back to the color the node had before the operation undoes a flip
+                delta = 1 if new_color != changed_colors[node] else -1
+                self.trace.record(ColorFlipRecord(node.book.BookId, self.currentFunctionId, old_color, new_color, delta))
+            node.color = new_color
+
+    def CommitColorChanges(self):
+        """
+        End the running operation: add one flip for every node whose color differs from the
+        color it had when the operation started, however often it changed in between.
+        """
+        changed_colors = self.changed_colors
+        if changed_colors:
+            self.color_flip_count += sum(1 for node, color in changed_colors.items() if node.color != color)
+            changed_colors.clear()
 
 
     def Quit(self):
@@ -582,54 +1968,256 @@ class RedBlackTree:
         return "Program Terminated!!"
 
 
-def main():
-    # Check if a filename is provided as a command line argument
-    if len(sys.argv) != 2:
-        print("Usage: python script.py <filename>")
-        sys.exit(1)
+def parse_command(line):
+    """
+    Split one command line such as InsertBook(6, "Database Management Systems", "Raghu Ramakrishnan")
+    into its function name and parameters.
 
-    # Get the filename from the command line argument
-    input_filename = sys.argv[1]
-    # Compute the filename of outputfile
-    output_filename = f"{input_filename.split('.')[0]}_output_file.txt"
+    Commas inside double quotes belong to the argument, quotes are removed and the remaining
+    text of each argument is kept as written, including its leading space.
     
-    # Create an instance of RedBlackTree
-    rb_tree = RedBlackTree()
+    Parameters:
+    - line: The command line.
     
-    # Map function names to corresponding methods in RedBlackTree class
-    function_map = {
+    Returns:
+    - (function, parameters): The function name and a list of parameter strings, or None for a
+      blank line.
+    """
+    match = COMMAND_PATTERN.match(line)
+    if match is None:
+        if line.strip():
+            raise ValueError(f"Malformed command: {line.strip()}")
+        return None
+    function, body = match.groups()
+    if not body:
+        return function, []
+    if '"' not in body:
+        return function, body.split(",")
+
+    parameters = []
+    position = 0
+    end = len(body)
+    while True:
+        argument = ARGUMENT_PATTERN.match(body, position)
+        parameters.append(argument.group().replace('"', ''))
+        position = argument.end()
+        if position >= end:
+            break
+        if body[position] != ",":
+            raise ValueError(f"Unterminated quote in command: {line.strip()}")
+        position += 1
+        if position == end:
+            parameters.append("")
+            break
+    return function, parameters
+
+
+def execute_commands(function_map, input_file, output_file, chunk_size=1 << 20, buffer_size=1 << 16):
+    """
+    Execute every command in input_file and write the outputs to output_file.
+
+    Input is read in chunks of roughly chunk_size characters and outputs are collected in a
+    buffer that is written once it holds buffer_size characters, so a long replay makes few
+    read and write calls. Execution stops after Quit.
+    
+    Parameters:
+    - function_map: A mapping from function names to the callables that perform them.
+    - input_file: The file object to read commands from.
+    - output_file: The file object to write outputs to.
+    - chunk_size: The approximate number of characters to read at a time.
+    - buffer_size: The number of output characters to collect before writing.
+    
+    Returns:
+    - executed: The number of commands executed.
+    """
+    pending = []
+    pending_size = 0
+    executed = 0
+    # Whatever is pending is written even when a command raises, so the output keeps
+    # everything printed before it
+    try:
+        while True:
+            lines = input_file.readlines(chunk_size)
+            if not lines:
+                break
+            for line in lines:
+                parsed = parse_command(line)
+                if parsed is None:
+                    continue
+                function, parameters = parsed
+                try:
+                    perform = function_map[function]
+                except KeyError:
+                    raise ValueError(f"Unknown command: {function}") from None
+                op = perform(*parameters)
+                executed += 1
+
+                # Streaming commands yield their output in pieces
+                if isinstance(op, str):
+                    pending.append(op)
+                    pending_size += len(op)
+                else:
+                    for piece in op:
+                        pending.append(piece)
+                        pending_size += len(piece)
+                        if pending_size >= buffer_size:
+                            output_file.write("".join(pending))
+                            pending.clear()
+                            pending_size = 0
+
+                # Check if the program should terminate
+                if op == "Program Terminated!!":
+                    return executed
+
+                if pending_size >= buffer_size:
+                    output_file.write("".join(pending))
+                    pending.clear()
+                    pending_size = 0
+    finally:
+        output_file.write("".join(pending))
+    return executed
+
+
+# Commands that change the library state, and therefore go to the write-ahead log
+MUTATING_COMMANDS = frozenset(("InsertBook", "InsertBookBatch", "DeleteBook", "BorrowBook", "BorrowBookBatch", "ReturnBook",
+                               "AddCopies"))
+
+
+def build_function_map(rb_tree):
+    """
+    Map the command names of the input file format to the methods of rb_tree that perform them.
+    """
+    return {
         "PrintBook": rb_tree.PrintBook,
-        "PrintBooks": rb_tree.PrintBooks,
+        "PrintBookBatch": rb_tree.PrintBookBatch,
+        "PrintBooks": rb_tree.StreamBooks,
         "InsertBook": rb_tree.InsertBook,
+        "InsertBookBatch": rb_tree.InsertBookBatch,
         "BorrowBook": rb_tree.BorrowBook,
+        "BorrowBookBatch": rb_tree.BorrowBookBatch,
         "ReturnBook": rb_tree.ReturnBook,
+        "AddCopies": rb_tree.AddCopies,
         "DeleteBook": rb_tree.DeleteBook,
         "FindClosestBook": rb_tree.FindClosestBook,
+        "FindClosestBooks": rb_tree.FindClosestBooks,
+        "FindBooksByTitle": rb_tree.FindBooksByTitle,
+        "FindBooksByAuthor": rb_tree.FindBooksByAuthor,
+        "FindBooksByTitlePrefix": rb_tree.FindBooksByTitlePrefix,
+        "FindBooksByAuthorPrefix": rb_tree.FindBooksByAuthorPrefix,
+        "PrintPatron": rb_tree.PrintPatron,
+        "BookRank": rb_tree.BookRank,
+        "SelectBook": rb_tree.SelectBook,
+        "CountBooksInRange": rb_tree.CountBooksInRange,
+        "CountAvailableBooks": rb_tree.CountAvailableBooks,
+        "PrintBooksPage": rb_tree.PrintBooksPage,
         "ColorFlipCount": rb_tree.ColorFlipCount,
         "Quit": rb_tree.Quit
     }
 
+
+def main():
+    parser = argparse.ArgumentParser(description="GatorLibrary: run the commands in an input file.")
+    parser.add_argument("filename", help="the input file of commands")
+    parser.add_argument("--stats", action="store_true", help="report commands per second on stderr")
+    parser.add_argument("--trace", metavar="FILE", help="write every node color change to FILE")
+    parser.add_argument("--restore", metavar="SNAPSHOT", help="start from the library state saved in SNAPSHOT")
+    parser.add_argument("--snapshot", metavar="SNAPSHOT", help="save the library state to SNAPSHOT after the run")
+    parser.add_argument("--wal", metavar="LOG", help="recover from and append every change to the write-ahead log LOG")
+    parser.add_argument("--checkpoint", metavar="SNAPSHOT", help="checkpoint the write-ahead log to SNAPSHOT after the run")
+    parser.add_argument("--wal-sync-every", type=int, default=1, metavar="N", help="fsync the log every N changes (default 1)")
+    parser.add_argument("--wal-sync-ms", type=float, metavar="T", help="fsync the log at most T milliseconds after a change")
+    parser.add_argument("--render-cache", type=int, default=0, metavar="N", help="cache the rendered output of up to N books (default off)")
+    parser.add_argument("--metrics", metavar="FILE", help="write command latencies and tree metrics to FILE at exit and on SIGUSR1")
+    parser.add_argument("--metrics-format", choices=("json", "prometheus"), default="json", help="format of the --metrics dump (default json)")
+    parser.add_argument("--clock", choices=("system", "manual"), default="system",
+                        help="time source; the manual clock starts at 0 and only moves with AdvanceClock(seconds)")
+    parser.add_argument("--loan-period", type=float, metavar="SECONDS", help="report loans as overdue SECONDS after they start")
+    parser.add_argument("--hold-period", type=float, metavar="SECONDS", help="cancel reservations not filled within SECONDS")
+    parser.add_argument("--engine", choices=("tree", "columnar"), default="tree",
+                        help="storage engine: the red-black tree, or sorted arrays (gatorColumnar.py) for the core commands")
+    args = parser.parse_args()
+    timed = args.clock == "manual" or args.loan_period is not None or args.hold_period is not None
+    if args.wal and args.restore:
+        parser.error("--restore cannot be combined with --wal, which recovers from its checkpoint")
+    if args.wal and timed:
+        parser.error("--clock, --loan-period and --hold-period cannot be combined with --wal, which does not log time")
+    if args.checkpoint and not args.wal:
+        parser.error("--checkpoint requires --wal")
+    if args.engine == "columnar" and (args.trace or args.restore or args.snapshot or args.wal or args.metrics
+                                      or args.render_cache or timed):
+        parser.error("--engine columnar can only be combined with --stats")
+
+    # Get the filename from the command line argument
+    input_filename = args.filename
+    # Compute the filename of outputfile
+    output_filename = f"{input_filename.split('.')[0]}_output_file.txt"
+    
+    # Create an instance of RedBlackTree
+    trace = FileTraceSink(args.trace) if args.trace else None
+    wal = None
+    if args.engine == "columnar":
+        from gatorColumnar import ColumnarLibrary
+        rb_tree = ColumnarLibrary()
+    elif args.wal:
+        from gatorWal import WriteAheadLog, recover
+        rb_tree, lsn = recover(args.wal, args.checkpoint, trace)
+        sync_interval = args.wal_sync_ms / 1000 if args.wal_sync_ms is not None else None
+        wal = WriteAheadLog(args.wal, args.wal_sync_every, sync_interval, first_lsn=lsn + 1)
+    elif args.restore:
+        from gatorSnapshot import load_snapshot
+        rb_tree = load_snapshot(args.restore, trace=trace)
+    else:
+        rb_tree = RedBlackTree(trace)
+    if args.render_cache > 0:
+        rb_tree.render_cache = RenderCache(args.render_cache)
+    
+    # Map function names to corresponding methods in RedBlackTree class
+    function_map = rb_tree.build_function_map() if args.engine == "columnar" else build_function_map(rb_tree)
+    if timed:
+        from gatorTimers import LibraryTimers, ManualClock
+        if args.clock == "manual":
+            rb_tree.clock = ManualClock()
+        rb_tree.timers = LibraryTimers(rb_tree, args.loan_period, args.hold_period)
+        function_map = rb_tree.timers.scheduled_function_map(function_map)
+    if wal is not None:
+        from gatorWal import logged_function_map
+        function_map = logged_function_map(function_map, wal)
+    metrics = None
+    if args.metrics:
+        from gatorMetrics import Metrics
+        metrics = rb_tree.metrics = Metrics()
+        function_map = metrics.timed_function_map(function_map)
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: metrics.request_dump(rb_tree, args.metrics, args.metrics_format))
+
     # Open input and output files
     with open(input_filename, 'r') as input_file, open(output_filename, 'w') as output_file:
-        # Read input commands line by line
-        for command in input_file:
-            # Extract function name and parameters from the command
-            function = command.strip().split("(")[0]
-            parameters = command.strip().split("(")[1].replace('"', '')[:-1].strip(")").split(",")
-            
-            # Handle the case when there are no parameters
-            if parameters == ['']:
-                parameters = []
-            
-            # Perform the required function
-            op = function_map[function](*parameters)
-            
-            # Write function output to file
-            output_file.write(f"{op}")
-            
-            # Check if the program should terminate
-            if op == "Program Terminated!!":
-                break
+        start = time.perf_counter()
+        executed = execute_commands(function_map, input_file, output_file)
+        elapsed = time.perf_counter() - start
+
+    if trace is not None:
+        trace.close()
+
+    if metrics is not None:
+        metrics.dump(rb_tree, args.metrics, args.metrics_format)
+
+    if wal is not None:
+        if args.checkpoint:
+            from gatorWal import checkpoint
+            checkpoint(rb_tree, wal, args.checkpoint)
+        wal.close()
+
+    if args.snapshot:
+        from gatorSnapshot import save_snapshot
+        save_snapshot(rb_tree, args.snapshot)
+
+    if args.stats:
+        rate = executed / elapsed if elapsed > 0 else float('inf')
+        print(f"Executed {executed} commands in {elapsed:.3f} s ({rate:.0f} commands/s)", file=sys.stderr)
+        if args.render_cache > 0:
+            cache = rb_tree.render_cache
+            print(f"Render cache: {cache.hits} hits, {cache.misses} misses", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,267 @@
+"""
+Optional instrumentation of a replay: per-command latency histograms and tree-shape metrics.
+
+A Metrics object is attached to a RedBlackTree through its metrics attribute. While it is
+None, which is the default, the tree only pays one attribute check per rotation, per fixup
+loop iteration and per SearchBookNode call. When attached, the tree counts
+- rotations by LeftRotate and RightRotate,
+- iterations of the InsertFixup and DeleteFixup loops,
+- the depth at which every SearchBookNode search ended,
+and timed_function_map wraps the dispatch table so that every command records its count,
+total time and latency histogram. The current tree height, book count and reservation queue
+depths are read from the tree when the metrics are exported, as JSON or as Prometheus text,
+either by dump or, between two commands, after request_dump.
+"""
+import json
+import time
+
+# Sub-buckets per power of two in a LatencyHistogram, as a power of two
+SUB_BUCKET_BITS = 3
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of non-negative integer values: exact below 2 ** (SUB_BUCKET_BITS + 1)
+    and above that 2 ** SUB_BUCKET_BITS buckets per power of two, so every bucket is within
+    1 / 2 ** SUB_BUCKET_BITS of the values it holds.
+    """
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def bucket_of(value):
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        if shift <= 0:
+            return value
+        return ((shift + 1) << SUB_BUCKET_BITS) + (value >> shift) - (1 << SUB_BUCKET_BITS)
+
+    @staticmethod
+    def bucket_bounds(bucket):
+        """
+        Return the smallest and largest value that fall in a bucket.
+        """
+        first = 2 << SUB_BUCKET_BITS
+        if bucket < first:
+            return bucket, bucket
+        shift = (bucket >> SUB_BUCKET_BITS) - 1
+        low = ((bucket & ((1 << SUB_BUCKET_BITS) - 1)) + (1 << SUB_BUCKET_BITS)) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value):
+        bucket = self.bucket_of(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """
+        Return the upper bound of the bucket that holds the given fraction of the values.
+        """
+        if not self.count:
+            return 0
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.bucket_bounds(bucket)[1], self.max)
+        return self.max
+
+    def buckets(self):
+        """
+        Return the (upper bound, count) of every non-empty bucket in increasing order.
+        """
+        return [(self.bucket_bounds(bucket)[1], self.counts[bucket]) for bucket in sorted(self.counts)]
+
+
+class CommandStats:
+    """
+    Count, total time and latency histogram of one command, in nanoseconds.
+    """
+    __slots__ = ("count", "total_ns", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.histogram = LatencyHistogram()
+
+    def record(self, elapsed_ns):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.histogram.record(elapsed_ns)
+
+
+class Metrics:
+    """
+    Counters filled in by an instrumented RedBlackTree and by timed_function_map.
+    """
+
+    def __init__(self):
+        self.left_rotations = 0
+        self.right_rotations = 0
+        self.insert_fixup_iterations = 0
+        self.delete_fixup_iterations = 0
+        self.searches = 0
+        # Number of searches that ended at each depth, the root being depth 0
+        self.search_depths = []
+        self.commands = {}
+        self._requested_dump = None
+
+    def request_dump(self, tree, filename, format="json"):
+        """
+        Ask for a dump once the running command has finished and the tree is consistent
+        again. Safe to call from a signal handler.
+        """
+        self._requested_dump = (tree, filename, format)
+
+    def _dump_if_requested(self):
+        requested = self._requested_dump
+        if requested is not None:
+            self._requested_dump = None
+            self.dump(*requested)
+
+    def record_search_depth(self, depth):
+        self.searches += 1
+        depths = self.search_depths
+        if depth >= len(depths):
+            depths.extend([0] * (depth + 1 - len(depths)))
+        depths[depth] += 1
+
+    def timed_function_map(self, function_map):
+        """
+        Return a copy of function_map in which every command records its latency. The time
+        of a command that streams its output includes consuming the stream.
+        """
+        def timed(function, perform):
+            stats = self.commands.setdefault(function, CommandStats())
+            clock = time.perf_counter_ns
+
+            def perform_timed(*parameters):
+                start = clock()
+                op = perform(*parameters)
+                if isinstance(op, str):
+                    stats.record(clock() - start)
+                    if self._requested_dump is not None:
+                        self._dump_if_requested()
+                    return op
+                return timed_stream(op, clock() - start)
+
+            def timed_stream(op, elapsed):
+                resumed = clock()
+                for chunk in op:
+                    elapsed += clock() - resumed
+                    yield chunk
+                    resumed = clock()
+                stats.record(elapsed + clock() - resumed)
+                if self._requested_dump is not None:
+                    self._dump_if_requested()
+
+            return perform_timed
+
+        return {function: timed(function, perform) for function, perform in function_map.items()}
+
+    def tree_shape(self, tree):
+        """
+        Return the current height, book count and reservation queue depth counts of the tree.
+        """
+        height = 0
+        queue_depths = {}
+        for book, depth, _ in tree.IterShape():
+            if depth + 1 > height:
+                height = depth + 1
+            waiting = len(book.ReservationHeap) if book.ReservationHeap is not None else 0
+            queue_depths[waiting] = queue_depths.get(waiting, 0) + 1
+        return {"height": height, "books": tree.root.size,
+                "reservation_queue_depths": dict(sorted(queue_depths.items()))}
+
+    def to_dict(self, tree):
+        commands = {}
+        for function, stats in sorted(self.commands.items()):
+            if not stats.count:
+                continue
+            histogram = stats.histogram
+            commands[function] = {
+                "count": stats.count,
+                "total_seconds": stats.total_ns / 1e9,
+                "p50_ns": histogram.percentile(0.50),
+                "p99_ns": histogram.percentile(0.99),
+                "max_ns": histogram.max,
+                "buckets_ns": dict(histogram.buckets()),
+            }
+        return {
+            "commands": commands,
+            "tree": {
+                "left_rotations": self.left_rotations,
+                "right_rotations": self.right_rotations,
+                "insert_fixup_iterations": self.insert_fixup_iterations,
+                "delete_fixup_iterations": self.delete_fixup_iterations,
+                "searches": self.searches,
+                "search_depths": self.search_depths,
+                "color_flip_count": tree.color_flip_count,
+                **self.tree_shape(tree),
+            },
+        }
+
+    def to_json(self, tree):
+        return json.dumps(self.to_dict(tree), indent=2) + "\n"
+
+    def to_prometheus(self, tree):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        metrics = self.to_dict(tree)
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP gatorlibrary_{name} {help_text}")
+            lines.append(f"# TYPE gatorlibrary_{name} {kind}")
+
+        family("command_duration_seconds", "histogram", "Latency of each command.")
+        for function, stats in metrics["commands"].items():
+            cumulative = 0
+            for upper, count in stats["buckets_ns"].items():
+                cumulative += count
+                lines.append(f'gatorlibrary_command_duration_seconds_bucket{{command="{function}",le="{upper / 1e9:.9g}"}} {cumulative}')
+            lines.append(f'gatorlibrary_command_duration_seconds_bucket{{command="{function}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'gatorlibrary_command_duration_seconds_sum{{command="{function}"}} {stats["total_seconds"]:.9g}')
+            lines.append(f'gatorlibrary_command_duration_seconds_count{{command="{function}"}} {stats["count"]}')
+        tree = metrics["tree"]
+        family("rotations_total", "counter", "Tree rotations by direction.")
+        lines.append(f'gatorlibrary_rotations_total{{direction="left"}} {tree["left_rotations"]}')
+        lines.append(f'gatorlibrary_rotations_total{{direction="right"}} {tree["right_rotations"]}')
+        family("fixup_iterations_total", "counter", "Iterations of the rebalancing loops.")
+        lines.append(f'gatorlibrary_fixup_iterations_total{{fixup="insert"}} {tree["insert_fixup_iterations"]}')
+        lines.append(f'gatorlibrary_fixup_iterations_total{{fixup="delete"}} {tree["delete_fixup_iterations"]}')
+        family("search_depth", "histogram", "Depth at which each SearchBookNode ended.")
+        cumulative = 0
+        for depth, count in enumerate(tree["search_depths"]):
+            cumulative += count
+            lines.append(f'gatorlibrary_search_depth_bucket{{le="{depth}"}} {cumulative}')
+        lines.append(f'gatorlibrary_search_depth_bucket{{le="+Inf"}} {tree["searches"]}')
+        lines.append(f"gatorlibrary_search_depth_sum {sum(depth * count for depth, count in enumerate(tree['search_depths']))}")
+        lines.append(f"gatorlibrary_search_depth_count {tree['searches']}")
+        family("color_flips_total", "counter", "Color flip count of the tree.")
+        lines.append(f"gatorlibrary_color_flips_total {tree['color_flip_count']}")
+        family("tree_height", "gauge", "Current height of the tree.")
+        lines.append(f"gatorlibrary_tree_height {tree['height']}")
+        family("books", "gauge", "Current number of books.")
+        lines.append(f"gatorlibrary_books {tree['books']}")
+        family("reservation_queue_books", "gauge", "Books by the depth of their reservation queue.")
+        for waiting, books in tree["reservation_queue_depths"].items():
+            lines.append(f'gatorlibrary_reservation_queue_books{{depth="{waiting}"}} {books}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, tree, filename, format="json"):
+        """
+        Write the metrics to filename, replacing an earlier dump.
+        """
+        text = self.to_prometheus(tree) if format == "prometheus" else self.to_json(tree)
+        with open(filename, "w") as metrics_file:
+            metrics_file.write(text)
@@ -0,0 +1,137 @@
+"""
+Parallel replay of many independent command files, each against its own copy of one library.
+
+Every input file, or every .txt command file in an input directory, is replayed by a worker
+of a process pool on a library of its own, and its output goes to the usual
+<input_file>_output_file.txt. Workers are forked from the driver and replay one file
+each (maxtasksperchild=1). A file therefore starts either from an empty library or from
+the base catalog given with --base. That snapshot is loaded once by the driver, before the
+pool starts, and every worker inherits it through fork as copy-on-write memory instead of
+loading it again. The driver reports the throughput of every file and of the whole run.
+
+Where fork is not available, each worker loads the base snapshot itself.
+
+Usage: python gatorReplay.py <file or directory> ... [--workers N] [--base SNAPSHOT]
+"""
+import argparse
+import gc
+import glob
+import multiprocessing
+import os
+import sys
+import time
+
+from gatorLibrary import RedBlackTree, build_function_map, execute_commands
+
+# The base library of this process: loaded by the driver before the pool forks, or by
+# _start_worker in a worker that was not forked
+_base = None
+
+
+def input_files(paths):
+    """
+    Return the command files to replay: files as given, and for each directory the .txt
+    files in it, except outputs of earlier runs, in name order.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(filename for filename in glob.glob(os.path.join(path, "*.txt"))
+                                if not filename.endswith("_output_file.txt")))
+        else:
+            files.append(path)
+    return files
+
+
+def _start_worker(base_filename):
+    global _base
+    if _base is None and base_filename is not None:
+        from gatorSnapshot import load_snapshot
+        _base = load_snapshot(base_filename)
+
+
+def replay_file(input_filename):
+    """
+    Worker: replay one command file on this worker's copy of the base library, or on an
+    empty one, and return its measurements.
+    """
+    tree = _base if _base is not None else RedBlackTree()
+    output_filename = f"{os.path.splitext(input_filename)[0]}_output_file.txt"
+    try:
+        with open(input_filename, "r") as input_file, open(output_filename, "w") as output_file:
+            start = time.perf_counter()
+            executed = execute_commands(build_function_map(tree), input_file, output_file)
+            elapsed = time.perf_counter() - start
+    except Exception as error:
+        # Any failure belongs to this file; the pool and the other files carry on
+        return {"file": input_filename, "error": f"{type(error).__name__}: {error}"}
+    return {"file": input_filename, "commands": executed, "seconds": elapsed, "pid": os.getpid()}
+
+
+def replay_files(files, workers=None, base_filename=None):
+    """
+    Replay command files in parallel and yield the result of each as it finishes.
+
+    Parameters:
+    - files: The command files.
+    - workers: The number of worker processes, os.cpu_count() when None.
+    - base_filename: A snapshot every file starts from, or None to start from an empty library.
+    """
+    global _base
+    frozen = False
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        if base_filename is not None:
+            from gatorSnapshot import load_snapshot
+            _base = load_snapshot(base_filename)
+            # Keep the collector away from the base so the forked copies stay shared
+            gc.freeze()
+            frozen = True
+    else:
+        context = multiprocessing.get_context()
+    try:
+        with context.Pool(workers, initializer=_start_worker, initargs=(base_filename,), maxtasksperchild=1) as pool:
+            yield from pool.imap_unordered(replay_file, files)
+    finally:
+        # The next call must not fork from this call's base
+        _base = None
+        if frozen:
+            gc.unfreeze()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GatorLibrary: replay many command files in parallel.")
+    parser.add_argument("paths", nargs="+", help="command files, or directories of .txt command files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    parser.add_argument("--base", metavar="SNAPSHOT", help="start every file from the library saved in SNAPSHOT")
+    args = parser.parse_args()
+
+    files = input_files(args.paths)
+    if not files:
+        parser.error("no command files found")
+    start = time.perf_counter()
+    results = list(replay_files(files, args.workers, args.base))
+    wall = time.perf_counter() - start
+
+    failed = 0
+    commands = 0
+    busy = 0.0
+    width = max(len(result["file"]) for result in results)
+    print(f"{'file':<{width}} {'commands':>9} {'seconds':>9} {'commands/s':>11}")
+    for result in sorted(results, key=lambda result: result["file"]):
+        if "error" in result:
+            failed += 1
+            print(f"{result['file']:<{width}}  failed: {result['error']}")
+            continue
+        commands += result["commands"]
+        busy += result["seconds"]
+        rate = result["commands"] / result["seconds"] if result["seconds"] > 0 else float("inf")
+        print(f"{result['file']:<{width}} {result['commands']:>9} {result['seconds']:>9.3f} {rate:>11.0f}")
+    print(f"{len(results) - failed} files, {commands} commands in {wall:.3f} s: {commands / wall:.0f} commands/s "
+          f"with {args.workers} workers ({busy:.3f} s of replay)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+asyncio TCP front end that serves the GatorLibrary commands to concurrent clients.
+
+Clients send commands in the input file syntax, one per line, and may pipeline as many as
+they like without waiting for answers. Every command gets one response frame, in the order
+the connection sent its commands:
+
+    <payload length in bytes>\n<payload>
+
+where the payload is exactly what the command would write to the output file.
+
+All connections feed one queue that a single executor task drains, so commands run one at a
+time against the single-threaded RedBlackTree and mutations are serialized. With
+batch_reads, consecutive PrintBook requests taken from the queue together (from any
+connection) are answered with one SearchBookNodes pass.
+
+Usage: python gatorServer.py [--host 127.0.0.1] [--port 7650] [--restore SNAPSHOT] [--batch-reads]
+"""
+import argparse
+import asyncio
+
+from gatorLibrary import RedBlackTree, build_function_map, parse_command
+
+TERMINATED = "Program Terminated!!"
+
+
+def encode_frame(payload):
+    data = payload.encode("utf-8")
+    return b"%d\n" % len(data) + data
+
+
+class LibraryServer:
+    """
+    Serves one RedBlackTree over TCP.
+    """
+
+    def __init__(self, tree, batch_reads=False):
+        self.tree = tree
+        self.batch_reads = batch_reads
+        self.function_map = build_function_map(tree)
+        self.commands = 0
+        self._queue = asyncio.Queue()
+
+    def _perform(self, function, parameters):
+        """
+        Run one command and return its complete output.
+        """
+        try:
+            perform = self.function_map[function]
+        except KeyError:
+            return f"Unknown command: {function}\n\n"
+        try:
+            op = perform(*parameters)
+            return op if isinstance(op, str) else "".join(op)
+        except (TypeError, ValueError) as error:
+            return f"Error: {error}\n\n"
+        except Exception as error:
+            # Any other failure is answered too: raising here would end the executor task and
+            # leave every client waiting
+            return f"Error: {type(error).__name__}: {error}\n\n"
+
+    async def execute(self):
+        """
+        Executor task: run the queued commands one at a time.
+        """
+        queue = self._queue
+        while True:
+            requests = [await queue.get()]
+            if self.batch_reads:
+                while not queue.empty():
+                    requests.append(queue.get_nowait())
+            index = 0
+            while index < len(requests):
+                function, parameters, future = requests[index]
+                if self.batch_reads and function == "PrintBook" and len(parameters) == 1:
+                    end = index + 1
+                    while end < len(requests) and requests[end][0] == "PrintBook" and len(requests[end][1]) == 1:
+                        end += 1
+                    self._print_books(requests[index:end])
+                    index = end
+                    continue
+                if not future.cancelled():
+                    future.set_result(self._perform(function, parameters))
+                self.commands += 1
+                index += 1
+
+    def _print_books(self, requests):
+        """
+        Answer a run of PrintBook requests with one shared search.
+        """
+        try:
+            nodes = self.tree.SearchBookNodes(parameters[0] for _, parameters, _ in requests)
+        except ValueError:
+            for function, parameters, future in requests:
+                if not future.cancelled():
+                    future.set_result(self._perform(function, parameters))
+            self.commands += len(requests)
+            return
+        NULL = self.tree.NULL
+        for _, parameters, future in requests:
+            node = nodes[int(parameters[0])]
+            if not future.cancelled():
+                future.set_result(str(node.book) if node is not NULL else f"Book {parameters[0]} not found in the Library\n\n")
+        self.commands += len(requests)
+
+    async def handle(self, reader, writer):
+        """
+        Connection handler: queue every command line and write the answers back in order.
+        """
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue()
+
+        async def respond():
+            while True:
+                future = await pending.get()
+                if future is None:
+                    break
+                payload = await future
+                writer.write(encode_frame(payload))
+                if pending.empty():
+                    await writer.drain()
+                if payload == TERMINATED:
+                    break
+
+        responder = asyncio.create_task(respond())
+        try:
+            while not responder.done():
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    parsed = parse_command(line.decode("utf-8"))
+                except ValueError as error:
+                    future = loop.create_future()
+                    future.set_result(f"Error: {error}\n\n")
+                    await pending.put(future)
+                    continue
+                if parsed is None:
+                    continue
+                function, parameters = parsed
+                future = loop.create_future()
+                await pending.put(future)
+                await self._queue.put((function, parameters, future))
+                if function == "Quit":
+                    break
+            await pending.put(None)
+            await responder
+        except ConnectionError:
+            responder.cancel()
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host, port):
+        executor = asyncio.create_task(self.execute())
+        server = await asyncio.start_server(self.handle, host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"GatorLibrary serving on {addresses}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            executor.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve GatorLibrary commands over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7650)
+    parser.add_argument("--restore", metavar="SNAPSHOT", help="start from the library state saved in SNAPSHOT")
+    parser.add_argument("--batch-reads", action="store_true", help="answer runs of queued PrintBook requests together")
+    args = parser.parse_args()
+
+    if args.restore:
+        from gatorSnapshot import load_snapshot
+        tree = load_snapshot(args.restore)
+    else:
+        tree = RedBlackTree()
+    try:
+        asyncio.run(LibraryServer(tree, args.batch_reads).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
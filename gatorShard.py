@@ -0,0 +1,300 @@
+"""
+Sharded library: the BookId space is split into ranges, each owned by a worker process with
+its own RedBlackTree.
+
+A router reads the commands and sends each command that names one book (PrintBook,
+InsertBook, DeleteBook, BorrowBook, ReturnBook, AddCopies and the batch forms, which are
+split per book) to the shard that owns the ID. These are collected into one batch per shard and the
+shards run their batches in parallel. A command that needs more than one shard is a barrier:
+the pending batches are finished first and then
+- PrintBooks gathers the rendered books of every overlapping shard in shard order,
+- FindClosestBook asks the owning shard for its floor and ceiling and only asks the
+  neighbouring shards when one of them is missing,
+- ColorFlipCount reports the sum of the color flip counts of the shard trees.
+
+Every shard keeps its own tree, so the aggregate color flip count is the one of the shard
+trees and differs from the count of a single tree that holds every book. All other output
+is the same as that of gatorLibrary.
+
+Usage: python gatorShard.py <input_file> [--workers N] [--max-book-id M]
+"""
+import argparse
+import multiprocessing
+import os
+from bisect import bisect_right
+from collections import namedtuple
+
+from gatorLibrary import RedBlackTree, build_function_map, parse_command
+
+# Most single-shard commands the router collects before it runs the batches
+BATCH_SIZE = 4096
+
+# For each single-book command, the position of its book ID among the parameters
+BOOK_ID_PARAMETER = {
+    "PrintBook": 0,
+    "InsertBook": 0,
+    "DeleteBook": 0,
+    "BorrowBook": 1,
+    "ReturnBook": 1,
+    "AddCopies": 0,
+}
+
+# What a worker sends back instead of the outputs of a batch when one of its commands raises
+ShardFailure = namedtuple("ShardFailure", ["function", "parameters", "error"])
+
+
+def shard_worker(connection):
+    """
+    Worker process: run every batch of (function, parameters) commands received on
+    connection against its own tree and send back the list of outputs. A command that raises
+    ends its batch, and the worker sends back a ShardFailure instead and waits for the next
+    batch. None stops the worker.
+    """
+    tree = RedBlackTree()
+    function_map = build_function_map(tree)
+    function_map["_RangeBooks"] = lambda book_id1, book_id2: [str(book) for book in tree.IterBooksInRange(book_id1, book_id2)]
+    function_map["_FloorCeiling"] = lambda target_id: shard_floor_ceiling(tree, target_id)
+    function_map["_ColorFlipCount"] = lambda: tree.color_flip_count
+    while True:
+        batch = connection.recv()
+        if batch is None:
+            break
+        outputs = []
+        for function, parameters in batch:
+            try:
+                outputs.append(function_map[function](*parameters))
+            except Exception as error:
+                outputs = ShardFailure(function, parameters, error)
+                break
+        connection.send(outputs)
+    connection.close()
+
+
+def shard_floor_ceiling(tree, target_id):
+    """
+    Return (floor ID, floor text, ceiling ID, ceiling text) of target_id in one shard, with
+    None for a side that has no book.
+    """
+    floor, ceiling = tree.FloorCeilingNodes(target_id)
+    NULL = tree.NULL
+    return (None if floor is NULL else floor.book.BookId, None if floor is NULL else str(floor.book),
+            None if ceiling is NULL else ceiling.book.BookId, None if ceiling is NULL else str(ceiling.book))
+
+
+def even_boundaries(workers, max_book_id):
+    """
+    Split the IDs 1..max_book_id into workers ranges of about the same size. Shard i owns
+    the IDs from boundaries[i - 1] up to but not including boundaries[i]; the first and last
+    shards also own every ID below and above the given span.
+    """
+    return sorted({1 + max_book_id * shard // workers for shard in range(1, workers)})
+
+
+def quantile_boundaries(workers, book_ids):
+    """
+    Split the given book IDs into workers ranges that hold about the same number of them.
+    """
+    book_ids = sorted({int(book_id) for book_id in book_ids})
+    if not book_ids:
+        return []
+    return sorted({book_ids[len(book_ids) * shard // workers] for shard in range(1, workers)})
+
+
+class ShardedLibrary:
+    """
+    Router over one worker process per BookId range.
+    """
+
+    def __init__(self, boundaries):
+        """
+        Start one worker per range.
+
+        Parameters:
+        - boundaries: The sorted first IDs of every shard after the first, see even_boundaries.
+        """
+        self.boundaries = list(boundaries)
+        self._connections = []
+        self._workers = []
+        for _ in range(len(self.boundaries) + 1):
+            router_end, worker_end = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=shard_worker, args=(worker_end,), daemon=True)
+            worker.start()
+            worker_end.close()
+            self._connections.append(router_end)
+            self._workers.append(worker)
+
+    def shard_of(self, book_id):
+        return bisect_right(self.boundaries, int(book_id))
+
+    def _run(self, batches):
+        """
+        Send each shard its batch, then wait for all of them.
+
+        Parameters:
+        - batches: A dict from shard number to a list of (function, parameters) commands.
+
+        Returns:
+        - outputs: A dict from shard number to the list of outputs of its batch.
+
+        Raises:
+        - RuntimeError: Naming the command that failed in a shard, caused by its exception.
+        """
+        for shard, batch in batches.items():
+            self._connections[shard].send(batch)
+        # Every shard answers before a failure is raised, so no reply is left in a pipe
+        outputs = {shard: self._connections[shard].recv() for shard in batches}
+        for shard, output in outputs.items():
+            if isinstance(output, ShardFailure):
+                arguments = ",".join(str(parameter) for parameter in output.parameters)
+                raise RuntimeError(f"{output.function}({arguments}) failed in shard {shard}: "
+                                   f"{type(output.error).__name__}: {output.error}") from output.error
+        return outputs
+
+    def _ask(self, shard, function, *parameters):
+        return self._run({shard: [(function, parameters)]})[shard][0]
+
+    def split(self, function, parameters):
+        """
+        Split a command into the single-book commands that perform it, as (shard, function,
+        parameters) parts, or return None if it needs more than one shard at once.
+        """
+        if function in BOOK_ID_PARAMETER:
+            return [(self.shard_of(parameters[BOOK_ID_PARAMETER[function]]), function, parameters)]
+        if function == "PrintBookBatch":
+            return [(self.shard_of(book_id), "PrintBook", (book_id,)) for book_id in parameters]
+        if function == "BorrowBookBatch":
+            patron_id, patron_priority = parameters[:2]
+            return [(self.shard_of(book_id), "BorrowBook", (patron_id, book_id, patron_priority)) for book_id in parameters[2:]]
+        if function == "InsertBookBatch":
+            if len(parameters) % 3:
+                raise ValueError("InsertBookBatch takes (book_id, book_name, author_name) triples")
+            # In ID order, the order RedBlackTree.BulkInsert inserts a batch in
+            triples = sorted((parameters[index:index + 3] for index in range(0, len(parameters), 3)),
+                             key=lambda triple: int(triple[0]))
+            return [(self.shard_of(triple[0]), "InsertBook", tuple(triple)) for triple in triples]
+        return None
+
+    def PrintBooks(self, book_id1, book_id2):
+        book_id1, book_id2 = int(book_id1), int(book_id2)
+        shards = range(self.shard_of(book_id1), self.shard_of(book_id2) + 1)
+        outputs = self._run({shard: [("_RangeBooks", (book_id1, book_id2))] for shard in shards})
+        books = [text for shard in shards for text in outputs[shard][0]]
+        return "".join(books) if books else "No Books found in the given range."
+
+    def FindClosestBook(self, target_id):
+        target_id = int(target_id)
+        owner = self.shard_of(target_id)
+        floor_id, floor, ceiling_id, ceiling = self._ask(owner, "_FloorCeiling", target_id)
+        shard = owner
+        while floor is None and shard > 0:
+            shard -= 1
+            floor_id, floor = self._ask(shard, "_FloorCeiling", target_id)[:2]
+        shard = owner
+        while ceiling is None and shard < len(self.boundaries):
+            shard += 1
+            ceiling_id, ceiling = self._ask(shard, "_FloorCeiling", target_id)[2:]
+        if floor is None and ceiling is None:
+            return "No books in the Library.\n\n"
+        if floor_id == ceiling_id or ceiling is None:
+            return floor
+        if floor is None:
+            return ceiling
+        floor_distance = target_id - floor_id
+        ceiling_distance = ceiling_id - target_id
+        if floor_distance < ceiling_distance:
+            return floor
+        elif ceiling_distance < floor_distance:
+            return ceiling
+        else:
+            return floor + ceiling
+
+    def ColorFlipCount(self):
+        outputs = self._run({shard: [("_ColorFlipCount", ())] for shard in range(len(self._connections))})
+        return f"Color Flip Count: {sum(output[0] for output in outputs.values())}\n\n"
+
+    def execute(self, commands):
+        """
+        Run (function, parameters) commands and yield their outputs in command order. Runs
+        of single-book commands are batched per shard and run in parallel.
+        """
+        cross_shard = {"PrintBooks": self.PrintBooks, "FindClosestBook": self.FindClosestBook,
+                       "ColorFlipCount": self.ColorFlipCount}
+        batches = {}
+        # For every pending command, the (shard, index in batch) of each of its parts
+        pending = []
+        for function, parameters in commands:
+            if function == "Quit":
+                yield from self._finish(batches, pending)
+                yield "Program Terminated!!"
+                return
+            parts = self.split(function, parameters)
+            if parts is None:
+                if function not in cross_shard:
+                    raise ValueError(f"{function} is not supported in sharded mode")
+                yield from self._finish(batches, pending)
+                batches, pending = {}, []
+                yield cross_shard[function](*parameters)
+                continue
+            places = []
+            for shard, part_function, part_parameters in parts:
+                batch = batches.setdefault(shard, [])
+                places.append((shard, len(batch)))
+                batch.append((part_function, part_parameters))
+            pending.append(places)
+            if len(pending) >= BATCH_SIZE:
+                yield from self._finish(batches, pending)
+                batches, pending = {}, []
+        yield from self._finish(batches, pending)
+
+    def _finish(self, batches, pending):
+        """
+        Run the collected batches and yield the output of every pending command.
+        """
+        outputs = self._run(batches) if batches else {}
+        for places in pending:
+            yield "".join(outputs[shard][index] for shard, index in places)
+
+    def close(self):
+        for connection in self._connections:
+            connection.send(None)
+            connection.close()
+        for worker in self._workers:
+            worker.join()
+
+
+def read_commands(filename):
+    """
+    Yield the (function, parameters) commands of an input file.
+    """
+    with open(filename, "r") as input_file:
+        for line in input_file:
+            parsed = parse_command(line)
+            if parsed is not None:
+                yield parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GatorLibrary: run an input file on a library sharded by BookId range.")
+    parser.add_argument("filename", help="the input file of commands")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of shard processes")
+    parser.add_argument("--max-book-id", type=int, metavar="M",
+                        help="split the IDs 1..M evenly; by default the shards split the IDs inserted by the input file")
+    args = parser.parse_args()
+
+    if args.max_book_id is not None:
+        boundaries = even_boundaries(args.workers, args.max_book_id)
+    else:
+        boundaries = quantile_boundaries(args.workers, (parameters[0] for function, parameters in read_commands(args.filename)
+                                                        if function == "InsertBook"))
+    output_filename = f"{args.filename.split('.')[0]}_output_file.txt"
+    library = ShardedLibrary(boundaries)
+    try:
+        with open(output_filename, "w") as output_file:
+            for output in library.execute(read_commands(args.filename)):
+                output_file.write(output)
+    finally:
+        library.close()
+
+
+if __name__ == "__main__":
+    main()
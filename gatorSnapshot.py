@@ -0,0 +1,222 @@
+"""
+Snapshot and restore of the full library state in a compact binary file.
+
+A snapshot holds every book in ID order with its borrow status, its copies, its reservation
+queue in service order and the depth and color of its tree node, plus the color flip count. A restart rebuilds
+the library in one linear pass through RedBlackTree.LoadShaped instead of replaying the
+command history, and the restored tree has the same shape and colors as the saved one, so
+later color flip counts match an uninterrupted run.
+
+File layout (little endian):
+- Header: magic, format version, number of books, color flip count, current function ID and
+  the log sequence number of the last write-ahead log record the snapshot includes.
+- For each book: the fixed size BOOK record, then the UTF-8 title, author and borrower, then
+  for a title with several copies one LOAN record per borrowed copy and one FREE_COPY record
+  per copy on the shelf in stack order, then one RESERVATION record per reservation in service
+  order.
+
+Version 2 snapshots, written before books could have several copies, are still read.
+"""
+import gc
+import mmap
+import os
+import struct
+
+from gatorLibrary import BLACK, RED, Book, CopyInventory, RedBlackTree, ReservationQueue
+
+MAGIC = b"GATORLIB"
+VERSION = 3
+
+# magic, version, book count, color flip count, current function ID, log sequence number
+HEADER = struct.Struct("<8sIQqqQ")
+# book ID, flags, node depth, title length, author length, borrower length, reservation count,
+# next reservation sequence, number of copies (0 for a book with a single copy), loan count
+BOOK = struct.Struct("<qBBIIIIQII")
+# The BOOK record of version 2, without the copy and loan counts
+BOOK_V2 = struct.Struct("<qBBIIIIQ")
+# patron ID, copy number
+LOAN = struct.Struct("<qI")
+# copy number
+FREE_COPY = struct.Struct("<I")
+# patron ID, priority number, time of reservation, sequence
+RESERVATION = struct.Struct("<qqdQ")
+
+AVAILABLE = 1
+HAS_BORROWER = 2
+RED_NODE = 4
+
+# Number of encoded books collected before each write
+WRITE_BATCH = 4096
+
+
+def encode_book(book, depth, color):
+    """
+    Return the snapshot record of one book and the depth and color of its node as bytes.
+    """
+    title = book.BookName.encode("utf-8")
+    author = book.AuthorName.encode("utf-8")
+    flags = AVAILABLE if book.AvailabilityStatus else 0
+    if color == RED:
+        flags |= RED_NODE
+    if book.BorrowedBy is not None:
+        flags |= HAS_BORROWER
+        borrower = str(book.BorrowedBy).encode("utf-8")
+    else:
+        borrower = b""
+    if book.ReservationHeap:
+        entries, next_sequence = book.ReservationHeap.entries()
+    else:
+        entries, next_sequence = [], 0
+    copies = book.Copies
+    loans = [(patron_id, copy) for patron_id, held in copies.loans.items() for copy in held] if copies is not None else []
+    parts = [BOOK.pack(book.BookId, flags, depth, len(title), len(author), len(borrower), len(entries), next_sequence,
+                       copies.count if copies is not None else 0, len(loans)),
+             title, author, borrower]
+    if copies is not None:
+        parts.extend(LOAN.pack(patron_id, copy) for patron_id, copy in loans)
+        parts.extend(FREE_COPY.pack(copy) for copy in copies.free)
+    for priority_number, time_of_reservation, sequence, patron_id in entries:
+        parts.append(RESERVATION.pack(int(patron_id), priority_number, time_of_reservation, sequence))
+    return b"".join(parts)
+
+
+def save_snapshot(tree, filename, lsn=0):
+    """
+    Write the state of the tree to filename. The snapshot is written to a temporary file
+    first and then moved into place, so an interrupted save never leaves a partial snapshot.
+
+    Parameters:
+    - tree: The RedBlackTree to save.
+    - filename: The snapshot file to write.
+    - lsn: The log sequence number of the last write-ahead log record applied to the tree.
+
+    Returns:
+    - count: The number of books written.
+    """
+    temporary = f"{filename}.tmp"
+    count = 0
+    with open(temporary, "wb") as snapshot_file:
+        # The book count is patched in once the tree has been walked
+        snapshot_file.write(HEADER.pack(MAGIC, VERSION, 0, tree.color_flip_count, tree.currentFunctionId, lsn))
+        pending = []
+        for book, depth, color in tree.IterShape():
+            pending.append(encode_book(book, depth, color))
+            count += 1
+            if len(pending) >= WRITE_BATCH:
+                snapshot_file.write(b"".join(pending))
+                pending.clear()
+        snapshot_file.write(b"".join(pending))
+        snapshot_file.seek(0)
+        snapshot_file.write(HEADER.pack(MAGIC, VERSION, count, tree.color_flip_count, tree.currentFunctionId, lsn))
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temporary, filename)
+    return count
+
+
+def decode_books(buffer, count, offset, version=VERSION):
+    """
+    Yield (book, depth, color) for the books stored in buffer, starting at offset.
+    """
+    book_record = BOOK if version >= 3 else BOOK_V2
+    unpack_book = book_record.unpack_from
+    unpack_reservation = RESERVATION.unpack_from
+    unpack_loan = LOAN.unpack_from
+    unpack_free_copy = FREE_COPY.unpack_from
+    book_size = book_record.size
+    reservation_size = RESERVATION.size
+    copies = loans = 0
+    for _ in range(count):
+        if version >= 3:
+            book_id, flags, depth, title_length, author_length, borrower_length, reservations, next_sequence, copies, loans = \
+                unpack_book(buffer, offset)
+        else:
+            book_id, flags, depth, title_length, author_length, borrower_length, reservations, next_sequence = unpack_book(buffer, offset)
+        offset += book_size
+        title = str(buffer[offset:offset + title_length], "utf-8")
+        offset += title_length
+        author = str(buffer[offset:offset + author_length], "utf-8")
+        offset += author_length
+        if flags & HAS_BORROWER:
+            borrower = str(buffer[offset:offset + borrower_length], "utf-8")
+        else:
+            borrower = None
+        offset += borrower_length
+
+        book = Book(book_id, title, author, bool(flags & AVAILABLE), borrower)
+        if copies:
+            loaned = []
+            for _ in range(loans):
+                loaned.append(unpack_loan(buffer, offset))
+                offset += LOAN.size
+            free = []
+            for _ in range(copies - loans):
+                free.append(unpack_free_copy(buffer, offset)[0])
+                offset += FREE_COPY.size
+            book.Copies = CopyInventory.from_entries(copies, loaned, free)
+        if reservations:
+            entries = []
+            for _ in range(reservations):
+                patron_id, priority_number, time_of_reservation, sequence = unpack_reservation(buffer, offset)
+                offset += reservation_size
+                entries.append((priority_number, time_of_reservation, sequence, patron_id))
+            book.ReservationHeap = ReservationQueue.from_entries(entries, next_sequence)
+        yield book, depth, RED if flags & RED_NODE else BLACK
+
+
+def read_header(buffer, filename):
+    """
+    Validate the snapshot header in buffer and return its
+    (count, color_flip_count, current_function_id, lsn, version) fields.
+    """
+    if len(buffer) < HEADER.size:
+        raise ValueError(f"{filename} is not a GatorLibrary snapshot")
+    magic, version, count, color_flip_count, current_function_id, lsn = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a GatorLibrary snapshot")
+    if version not in (2, VERSION):
+        raise ValueError(f"Unsupported snapshot version {version} in {filename}")
+    return count, color_flip_count, current_function_id, lsn, version
+
+
+def snapshot_lsn(filename):
+    """
+    Return the log sequence number recorded in the snapshot header, without loading the books.
+    """
+    with open(filename, "rb") as snapshot_file:
+        return read_header(snapshot_file.read(HEADER.size), filename)[3]
+
+
+def load_snapshot(filename, use_mmap=True, trace=None):
+    """
+    Restore a RedBlackTree from a snapshot in one linear pass.
+
+    Parameters:
+    - filename: The snapshot file to read.
+    - use_mmap: Map the file into memory instead of reading it into a bytes object.
+    - trace: An optional color flip trace sink for the restored tree.
+
+    Returns:
+    - tree: The restored RedBlackTree.
+    """
+    with open(filename, "rb") as snapshot_file:
+        if use_mmap and os.fstat(snapshot_file.fileno()).st_size > 0:
+            buffer = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = snapshot_file.read()
+    # Restoring allocates millions of linked objects and none of them are garbage, so the
+    # cyclic collector would only rescan them over and over
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        count, color_flip_count, current_function_id, _, version = read_header(buffer, filename)
+        tree = RedBlackTree(trace)
+        tree.LoadShaped(decode_books(buffer, count, HEADER.size, version))
+    finally:
+        if collecting:
+            gc.enable()
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+    tree.color_flip_count = color_flip_count
+    tree.currentFunctionId = current_function_id
+    return tree
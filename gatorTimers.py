@@ -0,0 +1,337 @@
+"""
+Loan due dates and reservation expiry, driven by an injectable clock and a timing wheel.
+
+Off by default: a RedBlackTree only schedules timers once a LibraryTimers object is attached
+to its timers attribute. Every loan then gets a due date loan_period seconds after it starts,
+and every reservation expires hold_period seconds after it was made unless the patron got
+the book first. Due timers fire before the next command runs: an overdue loan produces a
+notice and an expired reservation is cancelled, which moves the patrons behind it up the
+queue. The notices are written ahead of the command's own output.
+
+Times come from the tree's clock, time.time by default. With a ManualClock, time only moves
+with the AdvanceClock(seconds) command, so a replay is deterministic and can jump ahead by
+days at once. The timers are not part of snapshots or the write-ahead log: only loans and
+reservations made while the timers are attached get due dates.
+"""
+import math
+
+# Slots per timing wheel level, as a power of two
+SLOT_BITS = 6
+
+
+class ManualClock:
+    """
+    A clock that only moves when advanced, for deterministic and fast-forwarded replays.
+    """
+    __slots__ = ("now",)
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        if seconds < 0:
+            raise ValueError("The clock cannot move backwards")
+        self.now += seconds
+
+
+class Timer:
+    """
+    One scheduled action. The wheel slot and level holding the timer are kept so it can be
+    cancelled in O(1).
+    """
+    __slots__ = ("deadline", "tick", "sequence", "action", "slot", "level")
+
+    def __init__(self, deadline, tick, sequence, action):
+        self.deadline = deadline
+        self.tick = tick
+        self.sequence = sequence
+        self.action = action
+        self.slot = None
+        self.level = None
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel with levels of 2 ** SLOT_BITS slots.
+
+    Level 0 holds the timers due within the next 2 ** SLOT_BITS ticks, one slot per tick, and
+    every further level covers 2 ** SLOT_BITS times the span of the one below. Scheduling and
+    cancelling are O(1). A timer moves down one level each time the wheel below it wraps around,
+    so it is touched at most once per level before it fires. Advancing jumps from one non-empty
+    slot to the next instead of stepping through every tick, so fast-forwarding by days costs
+    about as much as the timers it fires.
+    """
+
+    def __init__(self, now=0.0, resolution=1.0, levels=4):
+        """
+        Parameters:
+        - now: The current time in seconds.
+        - resolution: The length of one tick in seconds. Timers fire within one tick after their deadline.
+        - levels: The number of wheel levels. Timers beyond their span wait in the top level.
+        """
+        if resolution <= 0:
+            raise ValueError("The timing wheel resolution must be positive")
+        self.resolution = resolution
+        self.tick = math.floor(now / resolution)
+        self.levels = [[{} for _ in range(1 << SLOT_BITS)] for _ in range(levels)]
+        # Number of timers in each level
+        self.counts = [0] * levels
+        # Timers already due when they were scheduled
+        self.due = {}
+        self.sequence = 0
+
+    def __len__(self):
+        return sum(self.counts) + len(self.due)
+
+    def schedule(self, deadline, action):
+        """
+        Call action() once the wheel has advanced to deadline (in seconds).
+
+        Returns:
+        - timer: A handle for cancel.
+        """
+        tick = math.ceil(deadline / self.resolution)
+        timer = Timer(deadline, tick, self.sequence, action)
+        self.sequence += 1
+        self._place(timer)
+        return timer
+
+    def _place(self, timer):
+        delta = timer.tick - self.tick
+        if delta <= 0:
+            slot = self.due
+            level = None
+        else:
+            level = (delta.bit_length() - 1) // SLOT_BITS
+            tick = timer.tick
+            top = len(self.levels) - 1
+            if level > top:
+                # A timer beyond the span of the wheel waits in the top level slot that is
+                # reached last and is placed again when that slot comes up
+                level = top
+                tick = self.tick + (1 << (SLOT_BITS * (top + 1))) - 1
+            slot = self.levels[level][(tick >> (SLOT_BITS * level)) & ((1 << SLOT_BITS) - 1)]
+            self.counts[level] += 1
+        slot[timer] = None
+        timer.slot = slot
+        timer.level = level
+
+    def _take(self, slot):
+        """
+        Remove and return all timers of a slot.
+        """
+        timers = list(slot)
+        slot.clear()
+        for timer in timers:
+            timer.slot = None
+        return timers
+
+    def cancel(self, timer):
+        """
+        Cancel a timer that has not fired yet; cancelling it again does nothing.
+        """
+        slot = timer.slot
+        if slot is None:
+            return
+        del slot[timer]
+        timer.slot = None
+        if timer.level is not None:
+            self.counts[timer.level] -= 1
+
+    def advance(self, now):
+        """
+        Move the wheel forward to the time now and fire every timer that has become due, in
+        the order of their deadlines and then of scheduling. An action may schedule or
+        cancel timers.
+
+        Returns:
+        - fired: The number of timers fired.
+        """
+        target = math.floor(now / self.resolution)
+        fired = self._fire(self._take(self.due)) if self.due else 0
+        mask = (1 << SLOT_BITS) - 1
+        while self.tick < target:
+            # Jump to the next tick at which the lowest non-empty level has a non-empty slot
+            # to run, or wraps around and higher levels cascade
+            level = 0
+            while level < len(self.levels) and not self.counts[level]:
+                level += 1
+            if level == len(self.levels):
+                self.tick = target
+                break
+            shift = SLOT_BITS * level
+            slots = self.levels[level]
+            index = (self.tick >> shift) & mask
+            while index < mask and not slots[index + 1]:
+                index += 1
+            base = self.tick >> (shift + SLOT_BITS) << (shift + SLOT_BITS)
+            following = base + ((index + 1) << shift)
+            if following > target:
+                self.tick = target
+                break
+            self.tick = following
+            # Cascade every level whose slot index wrapped around to zero, top down
+            cascade = 1
+            while cascade < len(self.levels) and not (self.tick >> (SLOT_BITS * cascade - SLOT_BITS)) & mask:
+                cascade += 1
+            for upper in range(cascade - 1, 0, -1):
+                slot = self.levels[upper][(self.tick >> (SLOT_BITS * upper)) & mask]
+                if slot:
+                    timers = self._take(slot)
+                    self.counts[upper] -= len(timers)
+                    for timer in timers:
+                        self._place(timer)
+            slot = self.levels[0][self.tick & mask]
+            if slot:
+                timers = self._take(slot)
+                self.counts[0] -= len(timers)
+                due = []
+                for timer in timers:
+                    # Only a one level wheel holds timers beyond its span in level 0
+                    if timer.tick > self.tick:
+                        self._place(timer)
+                    else:
+                        due.append(timer)
+                fired += self._fire(due + self._take(self.due))
+            if self.due:
+                fired += self._fire(self._take(self.due))
+        return fired
+
+    def _fire(self, timers):
+        timers.sort(key=lambda timer: (timer.deadline, timer.sequence))
+        for timer in timers:
+            timer.action()
+        return len(timers)
+
+
+class LibraryTimers:
+    """
+    Due dates of loans and expiry of reservations for one RedBlackTree. The tree calls
+    loan_started, loan_ended, hold_placed, hold_ended and book_removed as loans and
+    reservations come and go; see the module docstring.
+    """
+
+    def __init__(self, tree, loan_period=None, hold_period=None, resolution=1.0):
+        """
+        Parameters:
+        - tree: The RedBlackTree, whose clock is used.
+        - loan_period: Seconds until a loan is due, or None for no due dates.
+        - hold_period: Seconds until a reservation expires, or None for no expiry.
+        - resolution: The tick length of the timing wheel in seconds.
+        """
+        self.tree = tree
+        self.loan_period = loan_period
+        self.hold_period = hold_period
+        self.wheel = TimingWheel(tree.clock(), resolution)
+        # (book ID, patron ID) to the due date timers of the patron's loans of the book,
+        # in the order of the book's CopyInventory loans
+        self.loans = {}
+        # (book ID, patron ID) to the expiry timer of the patron's reservation of the book
+        self.holds = {}
+        self.notices = []
+
+    def loan_started(self, book, patron_id):
+        if self.loan_period is None:
+            return
+        key = (book.BookId, int(patron_id))
+        timer = self.wheel.schedule(self.tree.clock() + self.loan_period, lambda: self._overdue(book, key))
+        timers = self.loans.get(key)
+        if timers is None:
+            self.loans[key] = [timer]
+        else:
+            timers.append(timer)
+
+    def loan_ended(self, book, patron_id):
+        """
+        Cancel the due date of the patron's most recent loan of the book.
+        """
+        key = (book.BookId, int(patron_id))
+        timers = self.loans.get(key)
+        if timers:
+            self.wheel.cancel(timers.pop())
+            if not timers:
+                del self.loans[key]
+
+    def hold_placed(self, book, patron_id):
+        """
+        Start the expiry of a reservation. A patron renewing a reservation keeps its original
+        place in the queue, and its original expiry.
+        """
+        key = (book.BookId, int(patron_id))
+        if self.hold_period is None or key in self.holds:
+            return
+        self.holds[key] = self.wheel.schedule(self.tree.clock() + self.hold_period, lambda: self._expire(book, key))
+
+    def hold_ended(self, book, patron_id):
+        timer = self.holds.pop((book.BookId, int(patron_id)), None)
+        if timer is not None:
+            self.wheel.cancel(timer)
+
+    def book_removed(self, book):
+        for patron_id in book.get_borrowers():
+            for timer in self.loans.pop((book.BookId, int(patron_id)), ()):
+                self.wheel.cancel(timer)
+        for patron_id in book.get_reservation_list():
+            self.hold_ended(book, patron_id)
+
+    def _overdue(self, book, key):
+        timers = self.loans[key]
+        timers.remove(next(timer for timer in timers if timer.slot is None))
+        if not timers:
+            del self.loans[key]
+        self.notices.append(f"Book {book.BookId} is overdue, borrowed by Patron {key[1]}\n\n")
+
+    def _expire(self, book, key):
+        del self.holds[key]
+        self.tree.CancelReservation(book, key[1])
+        self.notices.append(f"Reservation made by Patron {key[1]} for Book {book.BookId} has expired\n\n")
+
+    def run_due(self):
+        """
+        Fire every timer that is due at the tree's current time and return the notices.
+        """
+        self.wheel.advance(self.tree.clock())
+        if not self.notices:
+            return ""
+        notices = "".join(self.notices)
+        self.notices.clear()
+        return notices
+
+    def AdvanceClock(self, seconds):
+        """
+        This function moves a ManualClock forward and fires the timers that become due.
+        """
+        clock = self.tree.clock
+        if not isinstance(clock, ManualClock):
+            raise ValueError("AdvanceClock needs the manual clock")
+        clock.advance(float(seconds))
+        return self.run_due()
+
+    def scheduled_function_map(self, function_map):
+        """
+        Return a copy of function_map in which every command first fires the due timers and
+        returns their notices ahead of its own output, plus the AdvanceClock command. Quit is
+        left as it is, since execute_commands recognizes it by its exact output.
+        """
+        def scheduled(perform):
+            def perform_scheduled(*parameters):
+                notices = self.run_due()
+                op = perform(*parameters)
+                if not notices:
+                    return op
+                if isinstance(op, str):
+                    return notices + op
+                return prefixed_stream(notices, op)
+            return perform_scheduled
+
+        def prefixed_stream(notices, op):
+            yield notices
+            yield from op
+
+        scheduled_map = {function: scheduled(perform) if function != "Quit" else perform
+                         for function, perform in function_map.items()}
+        scheduled_map["AdvanceClock"] = self.AdvanceClock
+        return scheduled_map
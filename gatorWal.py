@@ -0,0 +1,234 @@
+"""
+Write-ahead log with group commit for the commands that change the library.
+
+Every InsertBook, InsertBookBatch, DeleteBook, BorrowBook, BorrowBookBatch, ReturnBook and
+AddCopies is appended to an append-only log once it has run. A command that raises is not
+logged, so the log only holds commands that completed. Each record is one line holding its
+log sequence number (LSN), a CRC32 of the command and the command itself in the input file
+syntax:
+
+    <lsn>\t<crc32 as 8 hex digits>\t<command>\n
+
+Records are buffered and made durable with one fsync per group: after every sync_every
+records, and at the latest sync_interval seconds after the first unsynced record. An op
+therefore costs an fsync only when sync_every is 1. Records that were not yet synced when
+the process crashed are lost, which is the usual price of group commit.
+
+Recovery loads the most recent checkpoint (a gatorSnapshot file that records the LSN it
+includes) and replays the log records after that LSN. A torn record at the end of the log is
+discarded, and a record whose command raises is skipped with a warning. A checkpoint saves a
+snapshot and then empties the log.
+"""
+import io
+import os
+import sys
+import threading
+import time
+import zlib
+
+from gatorLibrary import MUTATING_COMMANDS, RedBlackTree, build_function_map, parse_command
+from gatorSnapshot import load_snapshot, save_snapshot, snapshot_lsn
+
+
+def format_command(function, parameters):
+    """
+    Return the command line that makes parse_command produce exactly the given parameters.
+    Every parameter is quoted, so commas and surrounding spaces survive the round trip.
+    """
+    quoted = ",".join('"' + str(parameter) + '"' for parameter in parameters)
+    return f"{function}({quoted})"
+
+
+def read_records(filename):
+    """
+    Read the valid records of a log.
+
+    Returns:
+    - records: A list of (lsn, command) tuples in log order.
+    - valid_size: The size in bytes of the valid prefix of the log.
+    """
+    records = []
+    valid_size = 0
+    if not os.path.exists(filename):
+        return records, valid_size
+    with open(filename, "rb") as log_file:
+        for raw in log_file:
+            if not raw.endswith(b"\n"):
+                break
+            fields = raw[:-1].split(b"\t", 2)
+            if len(fields) != 3:
+                break
+            lsn, checksum, command = fields
+            try:
+                lsn = int(lsn)
+                checksum = int(checksum, 16)
+            except ValueError:
+                break
+            if zlib.crc32(command) != checksum:
+                break
+            records.append((lsn, command.decode("utf-8")))
+            valid_size += len(raw)
+    return records, valid_size
+
+
+class WriteAheadLog:
+    """
+    Append-only log of mutating commands with configurable group commit.
+    """
+
+    def __init__(self, filename, sync_every=1, sync_interval=None, first_lsn=1):
+        """
+        Open the log for appending. A torn record left at the end of the log by a crash is
+        truncated away.
+
+        Parameters:
+        - filename: The log file.
+        - sync_every: Commit after this many records. 0 never forces a commit by count.
+        - sync_interval: Commit at most this many seconds after the first unsynced record, or
+          None to commit by count only. A background thread enforces the interval.
+        - first_lsn: The lowest LSN the next record may get, usually one past the checkpoint.
+        """
+        records, valid_size = read_records(filename)
+        if os.path.exists(filename) and os.path.getsize(filename) != valid_size:
+            with open(filename, "r+b") as log_file:
+                log_file.truncate(valid_size)
+        self.filename = filename
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.next_lsn = max(first_lsn, records[-1][0] + 1 if records else 1)
+        self.synced_lsn = self.next_lsn - 1
+        self.commits = 0
+        self._file = open(filename, "ab")
+        self._buffer = io.BytesIO()
+        self._pending = 0
+        self._first_pending_time = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = None
+        if sync_interval is not None:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="wal-flusher", daemon=True)
+            self._flusher.start()
+
+    def append(self, function, parameters):
+        """
+        Append a command to the log and commit the group if it is full or old enough.
+
+        Returns:
+        - lsn: The log sequence number given to the record.
+        """
+        command = format_command(function, parameters).encode("utf-8")
+        with self._lock:
+            lsn = self.next_lsn
+            self.next_lsn += 1
+            self._buffer.write(b"%d\t%08x\t%s\n" % (lsn, zlib.crc32(command), command))
+            self._pending += 1
+            if self._first_pending_time is None:
+                self._first_pending_time = time.monotonic()
+            if (self.sync_every and self._pending >= self.sync_every) or (
+                    self.sync_interval is not None and time.monotonic() - self._first_pending_time >= self.sync_interval):
+                self._commit()
+        return lsn
+
+    def commit(self):
+        """
+        Write and fsync every buffered record.
+        """
+        with self._lock:
+            self._commit()
+
+    def _commit(self):
+        if not self._pending:
+            return
+        self._file.write(self._buffer.getbuffer())
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._buffer = io.BytesIO()
+        self._pending = 0
+        self._first_pending_time = None
+        self.synced_lsn = self.next_lsn - 1
+        self.commits += 1
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.sync_interval):
+            with self._lock:
+                if self._pending and time.monotonic() - self._first_pending_time >= self.sync_interval:
+                    self._commit()
+
+    def truncate(self):
+        """
+        Commit and then empty the log. LSNs keep increasing from where they were.
+        """
+        with self._lock:
+            self._commit()
+            self._file.truncate(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """
+        Commit the buffered records and close the log.
+        """
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            self._commit()
+            self._file.close()
+
+
+def logged_function_map(function_map, wal):
+    """
+    Return a copy of function_map in which every mutating command is appended to wal after
+    it has run. A command that raises is not logged, so recovery never replays it.
+    """
+    def logged(function, perform):
+        def perform_logged(*parameters):
+            op = perform(*parameters)
+            wal.append(function, parameters)
+            return op
+        return perform_logged
+
+    return {function: logged(function, perform) if function in MUTATING_COMMANDS else perform
+            for function, perform in function_map.items()}
+
+
+def recover(wal_filename, checkpoint_filename=None, trace=None):
+    """
+    Rebuild the library from the latest checkpoint and the log records written after it.
+    A record whose command raises is reported on stderr and skipped.
+
+    Parameters:
+    - wal_filename: The write-ahead log.
+    - checkpoint_filename: The checkpoint snapshot, if any.
+    - trace: An optional color flip trace sink for the recovered tree.
+
+    Returns:
+    - tree: The recovered RedBlackTree.
+    - lsn: The LSN of the last change the tree includes.
+    """
+    if checkpoint_filename and os.path.exists(checkpoint_filename):
+        tree = load_snapshot(checkpoint_filename, trace=trace)
+        lsn = snapshot_lsn(checkpoint_filename)
+    else:
+        tree = RedBlackTree(trace)
+        lsn = 0
+    function_map = build_function_map(tree)
+    for record_lsn, command in read_records(wal_filename)[0]:
+        if record_lsn <= lsn:
+            continue
+        try:
+            function, parameters = parse_command(command)
+            function_map[function](*parameters)
+        except Exception as error:
+            print(f"Skipped log record {record_lsn} {command}: {type(error).__name__}: {error}", file=sys.stderr)
+        lsn = record_lsn
+    return tree, lsn
+
+
+def checkpoint(tree, wal, checkpoint_filename):
+    """
+    Save a snapshot of the tree that includes every logged change, then empty the log.
+    """
+    wal.commit()
+    save_snapshot(tree, checkpoint_filename, wal.next_lsn - 1)
+    wal.truncate()
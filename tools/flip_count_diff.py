@@ -0,0 +1,118 @@
+"""
+Differential test of the color flip count: change-set bookkeeping against per-node stamps.
+
+RedBlackTree counts flips by recording the original color of every node an operation
+recolors and committing the nodes whose color differs once the operation ends. This script
+replays randomized insert and delete workloads on it and on a reference tree that counts
+the way the tree used to: every node is stamped with the ID of the operation that last
+changed its color, a change counts +1 unless the node was already changed in the same
+operation, in which case it counts -1 and clears the stamp.
+
+After every operation the two color flip counts must agree, and every --shape-every
+operations the two trees must have the same shape and colors. The first disagreement is
+printed with the operation that caused it and the script exits with status 1.
+
+Usage: python tools/flip_count_diff.py [--trials 50] [--ops 5000] [--keys 2000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import RedBlackTree
+
+
+class StampedRedBlackTree(RedBlackTree):
+    """
+    Reference tree with the per-node function ID stamp accounting. The stamps are kept in a
+    dict because tree nodes no longer have a field for them.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.stamps = {}
+
+    def ChangeNodeColor(self, node, new_color):
+        if node.color != new_color:
+            if self.stamps.get(node, 0) != self.currentFunctionId:
+                self.color_flip_count += 1
+                self.stamps[node] = self.currentFunctionId
+            else:
+                self.color_flip_count -= 1
+                self.stamps[node] = 0
+        node.color = new_color
+
+    def CommitColorChanges(self):
+        pass
+
+
+def operations(rng, ops, keys):
+    """
+    Yield random ("InsertBook", book_id) and ("DeleteBook", book_id) operations in one of
+    several mixes: sequential inserts, random inserts, delete-heavy and balanced.
+    """
+    mix = rng.choice(("sequential", "random", "delete-heavy", "balanced"))
+    present = set()
+    next_id = 1
+    for _ in range(ops):
+        if mix == "sequential" and next_id <= keys and rng.random() < 0.8:
+            book_id = next_id
+            next_id += 1
+        else:
+            book_id = rng.randint(1, keys)
+        delete_share = {"sequential": 0.2, "random": 0.1, "delete-heavy": 0.6, "balanced": 0.5}[mix]
+        if present and rng.random() < delete_share:
+            if book_id not in present:
+                book_id = rng.choice(tuple(present)) if len(present) < 64 else next(iter(present))
+            present.discard(book_id)
+            yield "DeleteBook", book_id
+        elif book_id not in present:
+            present.add(book_id)
+            yield "InsertBook", book_id
+
+
+def run_trial(seed, ops, keys, shape_every):
+    """
+    Replay one random workload on both trees and return None, or a description of the first
+    disagreement.
+    """
+    rng = random.Random(seed)
+    tree = RedBlackTree()
+    reference = StampedRedBlackTree()
+    for index, (function, book_id) in enumerate(operations(rng, ops, keys)):
+        for target in (tree, reference):
+            if function == "InsertBook":
+                target.InsertBook(book_id, f"Title {book_id}", "Author")
+            else:
+                target.DeleteBook(book_id)
+        if tree.color_flip_count != reference.color_flip_count:
+            return (f"after operation {index} {function}({book_id}): color flip count {tree.color_flip_count}, "
+                    f"reference {reference.color_flip_count}")
+        if index % shape_every == 0 and [(book.BookId, depth, color) for book, depth, color in tree.IterShape()] != \
+                [(book.BookId, depth, color) for book, depth, color in reference.IterShape()]:
+            return f"after operation {index} {function}({book_id}): the trees differ in shape or colors"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--ops", type=int, default=5000, help="operations per trial")
+    parser.add_argument("--keys", type=int, default=2000, help="size of the book ID space")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shape-every", type=int, default=100, help="operations between shape comparisons")
+    args = parser.parse_args()
+
+    for trial in range(args.trials):
+        seed = args.seed + trial
+        failure = run_trial(seed, args.ops, args.keys, args.shape_every)
+        if failure is not None:
+            print(f"seed {seed}: {failure}")
+            sys.exit(1)
+    print(f"{args.trials} trials of {args.ops} operations: color flip counts agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Randomized differential fuzzer of the RedBlackTree engine against a sorted-list reference model.
+
+Every trial generates a random command sequence in one of several mixes (growing, churn,
+shrinking and loan-heavy) and replays it through build_function_map on a RedBlackTree and
+on ReferenceLibrary, which keeps the books in a dict and their IDs in a sorted list. The
+outputs of every command must agree, and RedBlackTree.CheckInvariants runs every
+--check-every commands and after the last one. Both list reservations in service order,
+so the patron lists are compared exactly. ColorFlipCount has no reference here;
+tools/flip_count_diff.py covers it.
+
+Both engines are timed per command, outside the invariant checks, so a change to the tree
+is checked for correctness and measured in the same run. The first disagreement, broken
+invariant or exception of the tree is printed with the command that caused it, the commands
+up to it are written to --dump as an input file that gatorLibrary.py can replay, and the
+script exits with status 1.
+
+Usage: python tools/fuzz_tree.py [--trials 20] [--ops 20000] [--keys 5000] [--seed 0] [--check-every 500] [--dump FILE]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from bisect import bisect_left, bisect_right, insort
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gatorLibrary import RedBlackTree, build_function_map
+
+COMMANDS = ("InsertBook", "DeleteBook", "PrintBook", "PrintBooks", "BorrowBook", "ReturnBook", "FindClosestBook",
+            "CountBooksInRange", "CountAvailableBooks", "BookRank", "SelectBook")
+
+# Relative weights of the commands in each mix, in the order of COMMANDS
+MIXES = {
+    "growing":   (8, 1, 2, 1, 2, 1, 2, 1, 1, 1, 1),
+    "churn":     (5, 5, 2, 1, 2, 1, 2, 1, 1, 1, 1),
+    "shrinking": (2, 6, 2, 1, 1, 1, 2, 1, 1, 1, 1),
+    "loans":     (2, 1, 2, 1, 8, 6, 1, 1, 2, 1, 1),
+}
+
+
+class ReferenceLibrary:
+    """
+    The library as a dict from book ID to book and a sorted list of the IDs, with the output
+    format of RedBlackTree. Reservations are a list of [priority, sequence, patron] entries
+    and the smallest one is allotted first.
+    """
+
+    def __init__(self):
+        self.books = {}
+        self.ids = []
+        self.sequence = 0
+
+    def _render(self, book_id):
+        title, author, available, borrowed_by, reservations = self.books[book_id]
+        patrons = [patron_id for _, _, patron_id in sorted(reservations)]
+        return f"BookID = {book_id}\nTitle = \"{title}\"\nAuthor = \"{author}\"\n" \
+               f"Availability = \"{'Yes' if available else 'No'}\"\n" \
+               f"BorrowedBy = {borrowed_by if not available else 'None'}\n" \
+               f"Reservations = {patrons}\n\n"
+
+    def InsertBook(self, book_id, book_name, author_name):
+        self.books[book_id] = [book_name, author_name, True, None, []]
+        insort(self.ids, book_id)
+        return ""
+
+    def DeleteBook(self, book_id):
+        if book_id not in self.books:
+            return f"Book {book_id} not found in the Library\n\n"
+        reservation = [str(patron_id) for _, _, patron_id in sorted(self.books.pop(book_id)[4])]
+        del self.ids[bisect_left(self.ids, book_id)]
+        if len(reservation) > 1:
+            return f"Book {book_id} is no longer available. Reservations made by Patrons {', '.join(reservation)} have been cancelled!\n\n"
+        elif len(reservation) == 1:
+            return f"Book {book_id} is no longer available. Reservation made by Patron {reservation[0]} has been cancelled!\n\n"
+        return f"Book {book_id} is no longer available.\n\n"
+
+    def PrintBook(self, book_id):
+        if book_id not in self.books:
+            return f"Book {book_id} not found in the Library\n\n"
+        return self._render(book_id)
+
+    def PrintBooks(self, book_id1, book_id2):
+        ids = self.ids[bisect_left(self.ids, book_id1):bisect_right(self.ids, book_id2)]
+        if not ids:
+            return "No Books found in the given range."
+        return "".join(self._render(book_id) for book_id in ids)
+
+    def BorrowBook(self, patron_id, book_id, patron_priority):
+        book = self.books.get(book_id)
+        if book is None:
+            return f"Book {book_id} not found in the Library\n\n"
+        if book[2]:
+            book[2] = False
+            book[3] = patron_id
+            return f"Book {book_id} Borrowed by Patron {patron_id}\n\n"
+        for entry in book[4]:
+            if entry[2] == patron_id:
+                # A patron who reserves again keeps their place and gets the new priority
+                entry[0] = patron_priority
+                break
+        else:
+            book[4].append([patron_priority, self.sequence, patron_id])
+            self.sequence += 1
+        return f"Book {book_id} Reserved by Patron {patron_id}\n\n"
+
+    def ReturnBook(self, patron_id, book_id):
+        book = self.books.get(book_id)
+        if book is None or book[2]:
+            return f"Book {book_id} not found in the Library or not borrowed by Patron {patron_id}\n\n"
+        opmssg = f"Book {book_id} Returned by Patron {patron_id}\n\n"
+        if book[4]:
+            entry = min(book[4])
+            book[4].remove(entry)
+            book[3] = entry[2]
+            opmssg += f"Book {book_id} Allotted to Patron {entry[2]}\n\n"
+        else:
+            book[2] = True
+            book[3] = None
+        return opmssg
+
+    def FindClosestBook(self, target_id):
+        ids = self.ids
+        if not ids:
+            return "No books in the Library.\n\n"
+        ceiling = bisect_left(ids, target_id)
+        if ceiling < len(ids) and ids[ceiling] == target_id:
+            return self._render(target_id)
+        candidates = [ids[index] for index in (ceiling - 1, ceiling) if 0 <= index < len(ids)]
+        distance = min(abs(book_id - target_id) for book_id in candidates)
+        return "".join(self._render(book_id) for book_id in candidates if abs(book_id - target_id) == distance)
+
+    def CountBooksInRange(self, book_id1, book_id2):
+        count = max(0, bisect_right(self.ids, book_id2) - bisect_left(self.ids, book_id1))
+        return f"Books in range [{book_id1}, {book_id2}] = {count}\n\n"
+
+    def CountAvailableBooks(self, book_id1, book_id2):
+        ids = self.ids[bisect_left(self.ids, book_id1):bisect_right(self.ids, book_id2)]
+        available = sum(1 for book_id in ids if self.books[book_id][2])
+        return f"{available} of {len(ids)} books in the given range are available\n\n"
+
+    def BookRank(self, book_id):
+        if book_id not in self.books:
+            return f"Book {book_id} not found in the Library\n\n"
+        return f"Book {book_id} has Rank {bisect_left(self.ids, book_id) + 1}\n\n"
+
+    def SelectBook(self, rank):
+        if not 1 <= rank <= len(self.ids):
+            return f"No Book with Rank {rank}\n\n"
+        return self._render(self.ids[rank - 1])
+
+    def build_function_map(self):
+        return {command: getattr(self, command) for command in COMMANDS}
+
+
+def commands(rng, ops, keys):
+    """
+    Return a random list of (command, parameters) in one of the MIXES. Book IDs are drawn
+    from [1, keys]; inserts only use IDs that are not in the library, and most other commands
+    name a book that is.
+    """
+    mix = rng.choice(tuple(MIXES))
+    present = []
+    positions = {}
+    sequence = []
+    for command in rng.choices(COMMANDS, MIXES[mix], k=ops):
+        book_id = present[rng.randrange(len(present))] if present and rng.random() < 0.9 else rng.randint(1, keys)
+        if command == "InsertBook":
+            book_id = rng.randint(1, keys)
+            if book_id in positions:
+                continue
+            positions[book_id] = len(present)
+            present.append(book_id)
+            parameters = (book_id, f"Title {book_id}", f"Author {book_id % 97}")
+        elif command == "DeleteBook":
+            index = positions.pop(book_id, None)
+            if index is not None:
+                # Swap the last ID into the freed place so deleting stays O(1)
+                last = present.pop()
+                if last != book_id:
+                    present[index] = last
+                    positions[last] = index
+            parameters = (book_id,)
+        elif command in ("PrintBooks", "CountBooksInRange", "CountAvailableBooks"):
+            parameters = (book_id - rng.randint(0, 20), book_id + rng.randint(0, 20))
+        elif command == "BorrowBook":
+            parameters = (rng.randint(1, 50), book_id, rng.randint(1, 5))
+        elif command == "ReturnBook":
+            parameters = (rng.randint(1, 50), book_id)
+        elif command == "FindClosestBook":
+            parameters = (book_id + rng.randint(-10, 10),)
+        elif command == "SelectBook":
+            parameters = (rng.randint(0, len(present) + 1),)
+        else:
+            parameters = (book_id,)
+        sequence.append((command, parameters))
+    return mix, sequence
+
+
+def replay(function_map, sequence, timings, check=None, check_every=0):
+    """
+    Yield the output of every command, adding the time each takes to timings.
+    check is called every check_every commands and is not timed.
+    """
+    perf_counter = time.perf_counter
+    for index, (command, parameters) in enumerate(sequence):
+        start = perf_counter()
+        op = function_map[command](*parameters)
+        if not isinstance(op, str):
+            op = "".join(op)
+        timings[command] += perf_counter() - start
+        if check is not None and (index + 1) % check_every == 0:
+            check()
+        yield op
+
+
+def dump(filename, sequence):
+    with open(filename, "w") as dump_file:
+        for command, parameters in sequence:
+            arguments = ", ".join(f'"{parameter}"' if isinstance(parameter, str) else str(parameter) for parameter in parameters)
+            dump_file.write(f"{command}({arguments})\n")
+        dump_file.write("Quit()\n")
+
+
+def run_trial(seed, ops, keys, check_every, tree_timings, reference_timings, counts):
+    """
+    Replay one random command sequence on both engines and return None, or the failing
+    command index and a description of the failure.
+    """
+    mix, sequence = commands(random.Random(seed), ops, keys)
+    for command, _ in sequence:
+        counts[command] += 1
+    reference = ReferenceLibrary()
+    expected = list(replay(reference.build_function_map(), sequence, reference_timings))
+    tree = RedBlackTree(clock=lambda: 0.0)
+    index = -1
+    try:
+        for index, output in enumerate(replay(build_function_map(tree), sequence, tree_timings, tree.CheckInvariants, check_every)):
+            if output != expected[index]:
+                return index, f"{mix} mix: the outputs differ\ntree:\n{output}\nreference:\n{expected[index]}"
+        count = tree.CheckInvariants()
+    except AssertionError as error:
+        return index + 1, f"{mix} mix: invariant violated: {error}"
+    except Exception as error:
+        return index + 1, f"{mix} mix: the tree raised {type(error).__name__}: {error}"
+    if [book.BookId for book in tree.IterBooks()] != reference.ids or count != len(reference.ids):
+        return len(sequence) - 1, f"{mix} mix: the engines hold different books"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--ops", type=int, default=20000, help="commands per trial")
+    parser.add_argument("--keys", type=int, default=5000, help="size of the book ID space")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check-every", type=int, default=500, help="commands between invariant checks")
+    parser.add_argument("--dump", metavar="FILE", help="write the commands up to the first failure to FILE")
+    args = parser.parse_args()
+
+    tree_timings = dict.fromkeys(COMMANDS, 0.0)
+    reference_timings = dict.fromkeys(COMMANDS, 0.0)
+    counts = dict.fromkeys(COMMANDS, 0)
+    for trial in range(args.trials):
+        seed = args.seed + trial
+        failure = run_trial(seed, args.ops, args.keys, args.check_every, tree_timings, reference_timings, counts)
+        if failure is not None:
+            index, description = failure
+            sequence = commands(random.Random(seed), args.ops, args.keys)[1]
+            command, parameters = sequence[min(index, len(sequence) - 1)]
+            print(f"seed {seed}, command {index} {command}{parameters}: {description}")
+            if args.dump:
+                dump(args.dump, sequence[:index + 1])
+                print(f"Commands up to the failure written to {args.dump}")
+            sys.exit(1)
+
+    print(f"{args.trials} trials of {args.ops} commands: outputs agree and invariants hold")
+    print(f"{'command':>20} {'count':>8} {'tree us/op':>11} {'reference us/op':>16}")
+    for command in COMMANDS:
+        if counts[command]:
+            print(f"{command:>20} {counts[command]:>8} {tree_timings[command] / counts[command] * 1e6:>11.2f} "
+                  f"{reference_timings[command] / counts[command] * 1e6:>16.2f}")
+    total = sum(counts.values())
+    print(f"{'all':>20} {total:>8} {sum(tree_timings.values()) / total * 1e6:>11.2f} "
+          f"{sum(reference_timings.values()) / total * 1e6:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Check that a command that fails in the middle of a --wal run leaves the log recoverable.
+
+For every failing command below, runs python gatorLibrary.py --wal on a file that inserts
+and borrows a book, sends the failing command and would then insert a second book. The run
+must fail, and a second run on the same log must recover the first book as borrowed and
+none of the commands from the failing one on. Then appends a failing record straight to a
+log, the way commands were logged before they ran, followed by a good record, and checks
+that recover() skips the first and applies the second.
+
+Usage: python tools/wal_recovery_check.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gatorWal import WriteAheadLog, recover
+
+FAILING_COMMANDS = (
+    'AddCopies(1, 0)',
+    'BorrowBook(patron, 1, 1)',
+    'InsertBookBatch(3, "C")',
+    'PrintBook()',
+)
+
+
+def run(directory, name, commands, log):
+    """
+    Run gatorLibrary.py --wal log on the given commands and return the process and its output.
+    """
+    input_filename = os.path.join(directory, f"{name}.txt")
+    with open(input_filename, "w") as input_file:
+        input_file.write("\n".join(commands) + "\n")
+    completed = subprocess.run([sys.executable, os.path.join(ROOT, "gatorLibrary.py"), input_filename, "--wal", log],
+                               capture_output=True, text=True)
+    output_filename = os.path.join(directory, f"{name}_output_file.txt")
+    output = open(output_filename).read() if os.path.exists(output_filename) else ""
+    return completed, output
+
+
+def check_failing_command(directory, index, failing_command):
+    log = os.path.join(directory, f"failing{index}.log")
+    completed, _ = run(directory, f"failing{index}", ['InsertBook(1, "A", "B")', 'BorrowBook(7, 1, 1)', failing_command,
+                                                      'InsertBook(2, "C", "D")', 'Quit()'], log)
+    if completed.returncode == 0:
+        sys.exit(f"{failing_command} did not fail")
+    completed, output = run(directory, f"recovered{index}", ['PrintBook(1)', 'PrintBook(2)', 'Quit()'], log)
+    if completed.returncode != 0:
+        sys.exit(f"After {failing_command} the log cannot be recovered:\n{completed.stderr}")
+    if 'BorrowedBy = 7' not in output or 'Book 2 not found in the Library' not in output:
+        sys.exit(f"After {failing_command} the log recovered the wrong library:\n{output}")
+    print(f"{failing_command}: the run fails, the log recovers")
+
+
+def check_failing_record(directory):
+    log = os.path.join(directory, "records.log")
+    wal = WriteAheadLog(log)
+    wal.append("InsertBook", ["1", "A", "B"])
+    wal.append("AddCopies", ["1", "0"])
+    wal.append("InsertBook", ["2", "C", "D"])
+    wal.close()
+    tree, lsn = recover(log)
+    if [book.BookId for book in tree.IterBooks()] != [1, 2] or lsn != 3:
+        sys.exit("recover() did not skip the failing record and apply the records after it")
+    print("A failing record in the log: skipped, the records after it recover")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for index, failing_command in enumerate(FAILING_COMMANDS):
+            check_failing_command(directory, index, failing_command)
+        check_failing_record(directory)
+
+
+if __name__ == "__main__":
+    main()